@@ -11,6 +11,7 @@ from .routes.readers import bp as reader_bp, init_reader_db
 from .routes.editor import bp as editor_bp, init_editor_db, bootstrap_super_admin
 from .services.initialize_db import init_all_search_tables
 from .utils.assets import get_asset_version, APP_VERSION
+from .utils.etag import request_etag
 import os, time
 from werkzeug.security import generate_password_hash
 
@@ -69,6 +70,10 @@ def create_app(config_name='default'):
     app.register_blueprint(reader_bp)
     app.register_blueprint(editor_bp)
 
+    # `flask rebuild …` / `flask cleanup` offline build commands
+    from .utils.index_builder import register_cli
+    register_cli(app)
+
     # Template filter
     @app.template_filter('is_numbered')
     def is_numbered(text):
@@ -96,15 +101,15 @@ def create_app(config_name='default'):
 
     @app.teardown_appcontext
     def teardown_db(exception=None):
-        # Close epitaka.db connection
-        db = g.pop('db', None)
+        # Close the epitaka.db writer (readers are pooled per-thread and stay open)
+        db = g.pop('db_rw', None)
         if db is not None:
             db.close()
         # Close webdata.db connection
         wdb = g.pop('webdata_db', None)
         if wdb is not None:
             wdb.close()
-        # Clean up translation DB connections (stored as g.trans_db_{lang})
+        # Clean up translation DB writers (stored as g.trans_db_{lang})
         for key in list(g.__dict__.keys()):
             if key.startswith('trans_db_'):
                 try:
@@ -121,8 +126,10 @@ def create_app(config_name='default'):
     # ── HTTP caching headers ────────────────────────────────────────────────
     # These endpoints render the same output for every visitor (no per-user
     # content — auth is API-only), so they can be cached by Cloudflare,
-    # nginx proxy_cache, and the client. Short TTLs keep stale content to
-    # at most a few minutes after a deploy.
+    # nginx proxy_cache, and the client. Each response also carries a strong
+    # ETag derived from the source DBs + deployed code (utils/etag.py), so
+    # once max-age runs out a revalidation is a 304 answered before any DB
+    # work — which is what lets the TTL be longer than a few minutes.
     _CACHEABLE_ENDPOINTS = {
         # Server-rendered HTML pages
         # (index_redirect = the bare `/` home page — must be listed too or
@@ -137,9 +144,37 @@ def create_app(config_name='default'):
         'main.bold_suggest', 'main.bold_definition',
         'api.api_book_section', 'api.api_book_sections', 'api.book_links',
         'api.book_link_section', 'api.get_related_para',
-        'dictionary.api_dictionary', 'api.fts_search',
+        'dictionary.api_dictionary', 'dictionary.api_dictionary_usages', 'api.fts_search',
     }
 
+    _CACHE_CONTROL = f'public, max-age={Config.HTTP_CACHE_MAX_AGE}'
+
+    @app.before_request
+    def answer_not_modified():
+        if request.endpoint not in _CACHEABLE_ENDPOINTS or request.method not in ('GET', 'HEAD'):
+            return None
+        etag, last_modified = request_etag()
+        g.etag = etag
+        g.last_modified = last_modified
+        # If-None-Match wins over If-Modified-Since when both are sent.
+        # Pre-compressed bodies tag each encoding (add_cache_headers).
+        if request.if_none_match:
+            matched = [t for t in (etag, etag + '-br', etag + '-gzip')
+                       if request.if_none_match.contains(t)]
+            fresh = bool(matched)
+            if fresh:
+                etag = matched[0]
+        else:
+            since = request.if_modified_since
+            fresh = since is not None and int(last_modified) <= since.timestamp()
+        if not fresh:
+            return None
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = _CACHE_CONTROL
+        return response
+
     @app.after_request
     def add_cache_headers(response):
         ep = request.endpoint or ''
@@ -147,8 +182,16 @@ def create_app(config_name='default'):
             # Static files already carry Flask's long expiry
             # (SEND_FILE_MAX_AGE_DEFAULT = 7 days).
             return response
-        if ep in _CACHEABLE_ENDPOINTS and 'Cache-Control' not in response.headers:
-            response.headers['Cache-Control'] = 'public, max-age=300'
+        if ep in _CACHEABLE_ENDPOINTS:
+            if 'Cache-Control' not in response.headers:
+                response.headers['Cache-Control'] = _CACHE_CONTROL
+            etag = g.get('etag')
+            if etag and response.status_code == 200 and 'ETag' not in response.headers:
+                # A strong ETag names one representation: br / gzip bodies
+                # get their own tag.
+                encoding = response.headers.get('Content-Encoding')
+                response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+                response.last_modified = g.last_modified
         return response
 
     return app
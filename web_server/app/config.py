@@ -22,6 +22,32 @@ class Config:
     DPD_DICTIONARY_DB = os.path.join(DATA_DIR, 'dpd-dictionary.db')
     WEBDATA_DB = os.path.join(DATA_DIR, 'webdata.db')       # web-only FTS indexes, separate from mobile DB
 
+    # Rendered pages / sections shared by every gunicorn worker (a pure
+    # cache file — safe to delete at any time). CACHE_BACKEND=local keeps
+    # every cache in-process only (e.g. when DATA_DIR is read-only).
+    SHARED_CACHE_DB = os.environ.get('SHARED_CACHE_DB') or os.path.join(DATA_DIR, 'cache', 'shared_cache.db')
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite').lower()
+
+    # Pre-rendered section blobs built offline by `flask rebuild sections`
+    # (app/services/section_store.py). Optional — absent means live render.
+    SECTION_STORE_DB = os.environ.get('SECTION_STORE_DB') or os.path.join(DATA_DIR, 'section_store.db')
+
+    # Static book pages / section JSON / outlines written by `flask prerender`
+    # (app/services/prerender.py) and served by nginx ahead of gunicorn.
+    PRERENDER_DIR = os.environ.get('PRERENDER_DIR') or os.path.join(DATA_DIR, 'prerendered')
+
+    # Open the pooled epitaka.db readers with `immutable=1` (no locking, no
+    # change detection inside SQLite). Off by default: the change-tracking
+    # triggers and `flask rebuild fts --incremental` write into epitaka.db
+    # while the app is serving, and an immutable reader can then see torn
+    # pages. Set DB_IMMUTABLE=1 only on hosts where epitaka.db is never
+    # written in place (replaced by a deploy, nothing else).
+    DB_IMMUTABLE = os.environ.get('DB_IMMUTABLE', '0') in ('1', 'true', 'yes')
+
+    # max-age of the public read-only pages / APIs (app/__init__.py). Clients
+    # revalidate with the ETag afterwards, which is a cheap 304.
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', '1800'))
+
     BASE_URL = os.environ.get('BASE_URL', '')
     DEFAULT_LANG = 'en'
 
@@ -3,19 +3,26 @@
 REST API routes for book content, cross-references, and related-paragraph lookup.
 Updated for new schema: pali column, level column, separate translation DBs.
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
 
 from ..utils.db   import get_db, get_translation_db
 from ..utils.text import markdown_to_html
+from ..utils.cache import make_cache
+from ..utils.compress import Precompressed
 from ..services.books import load_hierarchy
-from ..services.toc   import get_section_sentences
-from ..services.links import load_section_book_links
+from ..services.toc   import get_section_sentences, iter_sections
+from ..services.section_store import load_section_json
+from ..services.links import load_section_book_links, load_ref_links
 from .fts_search import register_search_route
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 register_search_route(bp)
 
+# Serialised + compressed /api/book/<id>/section/<pid> bodies (the mobile app
+# and the reader fetch the same sections over and over).
+_SECTION_JSON_CACHE = make_cache('section_json', max_size=1024, ttl=300, shared=True)
+
 
 # ── Section content ────────────────────────────────────────────────────────────
 
@@ -23,14 +30,31 @@ register_search_route(bp)
 def api_book_section(book_id, para_id):
     book_id = book_id.replace('_chunks', '')
     lang = request.args.get('lang', '')
-    with get_db() as conn:
-        section_data = get_section_sentences(book_id, para_id, conn, lang_code=lang or None)
-    return jsonify({
-        'para_id': para_id,
-        'sentences': section_data['sentences'],
-        'heading_translation': section_data['heading_translation'],
-        'has_content': section_data['has_content'],
-    })
+    cache_key = (book_id, para_id, lang)
+    cached = _SECTION_JSON_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.to_response()
+
+    stored = load_section_json(book_id, para_id, lang or None)
+    if stored is not None:
+        # Pre-rendered blob (flask rebuild sections): splice para_id into the
+        # stored key-sorted JSON instead of decoding and re-serialising it.
+        # ',"sentences":' cannot occur inside a string value (quotes are escaped).
+        head, _, tail = stored.partition(',"sentences":')
+        body = Precompressed.from_text(
+            '%s,"para_id":%d,"sentences":%s\n' % (head, para_id, tail),
+            mimetype='application/json')
+    else:
+        with get_db() as conn:
+            section_data = get_section_sentences(book_id, para_id, conn, lang_code=lang or None)
+        body = Precompressed.from_response(jsonify({
+            'para_id': para_id,
+            'sentences': section_data['sentences'],
+            'heading_translation': section_data['heading_translation'],
+            'has_content': section_data['has_content'],
+        }))
+    _SECTION_JSON_CACHE.set(cache_key, body)
+    return body.to_response()
 
 
 @bp.route('/book/<book_id>/sections')
@@ -43,12 +67,29 @@ def api_book_sections(book_id):
     except ValueError:
         return jsonify({'error': 'Invalid para_ids'}), 400
 
-    result = {}
-    with get_db() as conn:
-        for pid in para_ids:
-            section_data = get_section_sentences(book_id, pid, conn, lang_code=lang or None)
-            result[pid] = section_data
-    return jsonify(result)
+    # Streamed, one section at a time: the client gets the first section
+    # before the last one is rendered. Default body is the same JSON object
+    # as before ({para_id: section}); ?format=ndjson sends one
+    # {"para_id": ..., ...section} object per line instead.
+    ndjson = request.args.get('format') == 'ndjson'
+    dumps = current_app.json.dumps
+
+    def generate():
+        with get_db() as conn:
+            sections = iter_sections(book_id, para_ids, conn, lang_code=lang or None)
+            if ndjson:
+                for pid, section in sections:
+                    yield dumps(dict(section, para_id=pid), separators=(',', ':')) + '\n'
+                return
+            sep = '{'
+            for pid, section in sections:
+                yield '%s"%d":%s' % (sep, pid, dumps(section, separators=(',', ':')))
+                sep = ','
+            yield '{}\n' if sep == '{' else '}\n'
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if ndjson else 'application/json')
 
 
 # ── Related-paragraph lookup ───────────────────────────────────────────────────
@@ -56,43 +97,29 @@ def api_book_sections(book_id):
 @bp.route('/get_related_para/<book_id>/<para_id>')
 def get_related_para(book_id, para_id):
     book_id = book_id.replace('_chunks', '')
+    response = {'att_para_id': None, 'tik_para_id': None, 'mul_para_id': None}
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT title FROM headings
+            SELECT para_id FROM headings
             WHERE book_id = ? AND para_id <= ? AND level = 10
             ORDER BY para_id DESC LIMIT 1
         ''', (book_id, para_id))
         result = cursor.fetchone()
         if not result:
-            return jsonify({'att_para_id': None, 'tik_para_id': None, 'mul_para_id': None})
-
-        heading_title = result[0]
-        book_type = (
-            'mul' if book_id.endswith('.mul') else
-            'att' if book_id.endswith('.att') else
-            'tik' if book_id.endswith('.tik') else None
-        )
-        if not book_type:
-            return jsonify({'att_para_id': None, 'tik_para_id': None, 'mul_para_id': None})
-
-        base_id = book_id[:-5]
-        targets = {
-            'mul': [(f'{base_id}a.att', 'att_para_id'), (f'{base_id}t.tik', 'tik_para_id')],
-            'att': [(f'{base_id}m.mul', 'mul_para_id'), (f'{base_id}t.tik', 'tik_para_id')],
-            'tik': [(f'{base_id}m.mul', 'mul_para_id'), (f'{base_id}a.att', 'att_para_id')],
-        }.get(book_type, {})
-
-        response = {'att_para_id': None, 'tik_para_id': None, 'mul_para_id': None}
-        for target_book, key in targets.items():
-            cursor.execute('''
-                SELECT para_id FROM headings
-                WHERE book_id = ? AND title = ? AND level = 10
-                ORDER BY ABS(para_id - ?) LIMIT 1
-            ''', (target_book, heading_title, para_id))
-            found = cursor.fetchone()
-            if found:
-                response[key] = found[0]
+            return jsonify(response)
+
+        num_pid = result[0]
+        entry = load_ref_links(conn, book_id, load_hierarchy(), src_para_id=num_pid).get(num_pid, {})
+
+    # First related book of each other kind (mūla / aṭṭhakathā / ṭīkā)
+    keys = {'.mul': 'mul_para_id', '.att': 'att_para_id', '.tik': 'tik_para_id'}
+    keys.pop(book_id[-4:], None)
+    for refs in entry.values():
+        for ref in refs:
+            key = keys.get(ref['book_id'][-4:])
+            if key and response[key] is None:
+                response[key] = ref['para_id']
 
     return jsonify(response)
 
@@ -1,15 +1,39 @@
 # app/routes/dictionary.py
 from flask import Blueprint, request, jsonify
-from ..services.dictionary import search_auto
+from ..services.dictionary import search_auto, usage_page
 from ..config import Config
 from ..utils.ratelimit import rate_limit
 
 bp = Blueprint('dictionary', __name__)
 
 
+def _requested_lang():
+    """?lang= if it names a deployed translation, else None (unknown values
+    would each miss the dictionary cache and add an entry to it)."""
+    lang = request.args.get('lang', '').strip()
+    return lang if lang in Config.get_available_languages() else None
+
+
 @bp.route('/api/dictionary')
 @rate_limit(30, 60)
 def api_dictionary():
     word = request.args.get('word', '').strip()
-    results = search_auto(word)
+    lang = _requested_lang()
+    results = search_auto(word, lang=lang)
     return jsonify(results)
+
+
+@bp.route('/api/dictionary/usages')
+@rate_limit(30, 60)
+def api_dictionary_usages():
+    """Every usage of a stem, paged: ?stem=&lang=&cursor=&limit= (max 200)."""
+    stem = request.args.get('stem', '').strip()
+    if not stem:
+        return jsonify({'error': 'stem required'}), 400
+    lang = _requested_lang()
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    after = request.args.get('cursor', 0, type=int)
+    page = usage_page(stem, lang, after, limit)
+    if page is None:
+        return jsonify({'error': 'Usage concordance not built'}), 404
+    return jsonify(page)
@@ -33,9 +33,11 @@ from ..services.dictionary import search_auto
 _HASH_METHOD = 'pbkdf2:sha256'
 
 from ..utils.db import get_db, get_webdata_db, get_translation_db, get_translation_db_path
+from ..utils.cache import cache_stats
 from ..config import Config
 from ..services.books import load_hierarchy, organize_hierarchy
 from ..services.toc import get_book_toc
+from ..services.headings import get_book_headings, memory_report
 
 bp = Blueprint('editor', __name__, url_prefix='/editor/api')
 
@@ -165,7 +167,7 @@ def _open_trans_db(lang):
     path = get_translation_db_path(lang)
     if not path:
         return None
-    conn = get_translation_db(lang)
+    conn = get_translation_db(lang, writable=True)
     if conn is None:
         return None
     ensure_remark_schema(conn, path)
@@ -714,6 +716,15 @@ def api_delete_editor(editor, eid):
     return jsonify({'deleted': eid})
 
 
+@bp.route('/cache_stats')
+@require_super
+def api_cache_stats(editor):
+    """Hit / miss / eviction counters of the public read caches (this worker),
+    plus the memory held by the loaded per-book heading indexes."""
+    return jsonify({'pid': os.getpid(), 'caches': cache_stats(),
+                    'heading_index': memory_report()})
+
+
 # ══════════════════════════════════════════════════════════════════════════
 # EDITOR WORKSPACE
 # ══════════════════════════════════════════════════════════════════════════
@@ -763,12 +774,7 @@ def api_editor_toc(editor, lang, book_id):
 def _section_para_range(book_id, para_id):
     """Return (start_para, end_para) for a TOC section."""
     with get_db() as conn:
-        row = conn.execute(
-            'SELECT COALESCE(MIN(para_id), 999999) FROM headings '
-            'WHERE book_id = ? AND para_id > ? AND level <= 6',
-            (book_id, para_id)
-        ).fetchone()
-    return para_id, (row[0] if row else 999999)
+        return para_id, get_book_headings(conn, book_id).section_end(para_id)
 
 
 @bp.route('/<lang>/book/<book_id>/section/<int:para_id>')
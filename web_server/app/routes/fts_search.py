@@ -18,46 +18,21 @@ Architecture:
   Only matched lines are returned (no context lines).
 """
 from flask import Blueprint, jsonify, request
-from collections import defaultdict, Counter
+from array import array
+from collections import defaultdict
+import json
 import re
-from ..utils.db import get_db, get_webdata_db, get_translation_db
-from ..utils.text import markdown_to_html, normalize_pali, highlight_text
-from ..utils.cache import TTLCache
+import sqlite3
+from ..utils.db import get_db, get_search_db, get_translation_db, index_generation, lines_by_key
+from ..utils.text import markdown_to_html_batch, normalize_pali, get_highlighter
+from ..utils.cache import make_cache
+from ..utils.index_builder import LINE_ROWID_STRIDE
 from ..utils.ratelimit import rate_limit
-from ..services.loadtocs import load_hierarchy
+from ..services.books import hierarchy_snapshot
 from ..services.toc import build_slug_map
 from ..config import Config
 
 
-# ── Helper: build allowed book_id set from filter params ──────────────────
-def _get_allowed_books(hierarchy, pitakas_param, layers_param):
-    PITAKA_MATCH = {
-        'suttanta':   lambda m: 'Sutta'      in (m.get('nikaya') or ''),
-        'vinaya':     lambda m: 'Vinaya'     in (m.get('nikaya') or ''),
-        'abhidhamma': lambda m: 'Abhidhamma' in (m.get('nikaya') or ''),
-        'anna':       lambda m: m.get('category') == 'A\u00f1\u00f1a',
-    }
-    LAYER_MATCH = {
-        'mula':  lambda m: m.get('category') == 'M\u016bla',
-        'attha': lambda m: m.get('category') == 'A\u1e6d\u1e6dhakath\u0101',
-        'tika':  lambda m: m.get('category') == '\u1e6c\u012bk\u0101',
-    }
-
-    pitakas = [p.strip() for p in pitakas_param.split(',') if p.strip()] if pitakas_param else []
-    layers  = [l.strip() for l in layers_param.split(',')  if l.strip()] if layers_param  else []
-
-    if not pitakas and not layers:
-        return None
-
-    allowed = set()
-    for book_id, meta in hierarchy.items():
-        pass_p = (not pitakas) or any(PITAKA_MATCH[p](meta) for p in pitakas if p in PITAKA_MATCH)
-        pass_l = (not layers)  or any(LAYER_MATCH[l](meta)  for l in layers  if l in LAYER_MATCH)
-        if pass_p and pass_l:
-            allowed.add(book_id)
-    return frozenset(allowed)
-
-
 # ── Helper: normalise query → list of words ───────────────────────────────
 def _normalise_query(query):
     clean = re.sub(r'[^\w\s]', ' ', query)
@@ -99,22 +74,6 @@ def _book_filter_clause(allowed_books, alias='p'):
     return f' AND {alias}.book_id IN ({placeholders})', list(allowed_books)
 
 
-# ── Helper: highlight search words in HTML text ───────────────────────────
-def _highlight_words(html_text: str, words: list) -> str:
-    """Highlight search words, matching Pāli diacritics-insensitively
-    (e.g. 'anuruddhattheraga' highlights 'anuruddhattheragāthā')."""
-    if not html_text or not words:
-        return html_text
-    parts = re.split(r'(<[^>]+>)', html_text)
-    result = []
-    for part in parts:
-        if part.startswith('<'):
-            result.append(part)
-        else:
-            result.append(highlight_text(part, words))
-    return ''.join(result)
-
-
 # ── Helper: determine which lines match the search words ─────────────────
 def _find_matching_lines(lines: list, words: list) -> set:
     """Match lines diacritics-insensitively so results found by the
@@ -132,14 +91,15 @@ def _find_matching_lines(lines: list, words: list) -> set:
 # Cached (query + filters → matching paragraphs) because crawler bots hammer
 # the same junk queries, and each miss would otherwise trigger a full-table
 # LIKE scan — the single most expensive thing this server can do on 1 vCPU.
-_FALLBACK_CACHE = TTLCache(max_size=128, ttl=60)
+_FALLBACK_CACHE = make_cache('fts_fallback', max_size=128, ttl=60)
 
 
 def _fallback_paragraph_matches(conn, words, allowed_books=None, limit=5000):
     """
     Fallback search against the authoritative `sentences` table (epitaka.db).
 
-    Used when the FTS index returns no matches — e.g. the index is stale and
+    Only used while paragraphs_trigram has not been built (see
+    _trigram_paragraph_matches). Used when the FTS index returns no matches — e.g. the index is stale and
     missing recently-added paragraphs, or the server's SQLite can't match
     diacritic query terms. Returns up to `limit` (book_id, para_id) tuples
     whose paragraph text contains ALL of the search words.
@@ -195,20 +155,116 @@ def _fallback_paragraph_matches(conn, words, allowed_books=None, limit=5000):
     return result
 
 
-# ── Helper: load book ordering from books table ───────────────────────────
-def _load_book_order():
-    """Return a dict {book_id: sort_order} ordered by books.id."""
+# ── Helper: substring search on the trigram index ─────────────────────────
+def _trigram_paragraph_matches(conn, words, allowed_books=None, limit=5000):
+    """
+    Substring search on paragraphs_trigram (webdata.db, built by
+    `flask rebuild fts` / scripts/rebuild_fts.py) — the indexed replacement
+    for the LIKE scan in _fallback_paragraph_matches.
+
+    Words of 3+ characters are matched through the trigram index; shorter
+    fragments (which a trigram index cannot look up) are checked with
+    instr() on the rows the long words already selected. A query made only
+    of 1–2 char fragments has nothing to narrow on and scans the (diacritic
+    stripped, paragraph-level) table, stopping at `limit` hits.
+
+    Returns up to `limit` sorted (book_id, para_id) tuples, or None when the
+    index has not been built (caller falls back to the LIKE scan).
+    """
+    norm = [n for n in (normalize_pali(w).lower() for w in words) if n]
+    if not norm:
+        return []
+    cache_key = ('trigram', index_generation(), '|'.join(norm),
+                 tuple(sorted(allowed_books)) if allowed_books else '')
+    cached = _FALLBACK_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    long_words  = [w for w in norm if len(w) >= 3]
+    short_words = [w for w in norm if len(w) < 3]
+    bf_sql, bf_params = _book_filter_clause(allowed_books, alias='t')
+
+    where, params = [], []
+    if long_words:
+        where.append('t.paragraphs_trigram MATCH ?')
+        params.append(' AND '.join(f'"{w}"' for w in long_words))
+    for w in short_words:
+        where.append('instr(t.plain_text, ?) > 0')
+        params.append(w)
+    # With an indexed word the full hit set is cheap to sort; without one,
+    # stop the scan at `limit` rather than reading the whole table.
+    order_sql = 'ORDER BY t.book_id, t.para_id' if long_words else ''
+
     try:
+        rows = conn.execute(f'''
+            SELECT t.book_id, t.para_id
+            FROM paragraphs_trigram t
+            WHERE {' AND '.join(where)}{bf_sql}
+            {order_sql}
+            LIMIT ?
+        ''', params + bf_params + [limit]).fetchall()
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            return None
+        raise
+
+    result = sorted((r['book_id'], r['para_id']) for r in rows)
+    _FALLBACK_CACHE.set(cache_key, result)
+    return result
+
+
+# ── Heading search (/api/search_headings) ─────────────────────────────────
+# headings_fts rows are stored ranked (level, book order, para_id), so the
+# first `limit` hits in rowid order are the answer.
+_HEADINGS_CACHE = make_cache('headings_search', max_size=512, ttl=300)
+
+
+def search_headings(query, allowed_books=None, limit=10):
+    """[(book_id, para_id, title)] of headings whose title words start with
+    the query words (diacritic-insensitive), best-ranked first."""
+    words = _normalise_query(query)
+    if not words:
+        return []
+    generation = index_generation()
+    cache_key = (tuple(words), allowed_books, limit, generation)
+    cached = _HEADINGS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    bf_sql, bf_params = _book_filter_clause(allowed_books, alias='headings_fts')
+    try:
+        with get_search_db() as conn:
+            rows = conn.execute(f"""
+                SELECT book_id, para_id, title FROM headings_fts
+                WHERE headings_fts MATCH ?{bf_sql}
+                ORDER BY rowid LIMIT ?
+            """, [_build_fts_query(words)] + bf_params + [limit]).fetchall()
+    except sqlite3.OperationalError:
+        # headings_fts not built yet (`flask rebuild headings`).
+        bf_sql, bf_params = _book_filter_clause(allowed_books, alias='headings')
         with get_db() as conn:
-            rows = conn.execute(
-                'SELECT book_id, id FROM books ORDER BY id'
-            ).fetchall()
-            return {row['book_id']: row['id'] for row in rows}
-    except Exception:
-        return {}
+            rows = conn.execute(f"""
+                SELECT book_id, para_id, title FROM headings
+                WHERE title LIKE ?{bf_sql} LIMIT ?
+            """, [f'%{query}%'] + bf_params + [limit]).fetchall()
+
+    result = [(r['book_id'], r['para_id'], r['title']) for r in rows]
+    _HEADINGS_CACHE.set(cache_key, result)
+    return result
+
 
+# ── Index generation ──────────────────────────────────────────────────────
+# Every search cache key includes index_generation() (utils/db.py): the token
+# `flask rebuild fts` and the incremental updater stamp into webdata.db, so
+# hits / responses / rowids of one index generation are never served
+# against another.
 
 
+# Whole /api/fts_search responses. Crawlers and the mobile app repeat the
+# same queries; a hit skips the hit list, line loading, translations, slug
+# resolution and highlighting. Shared across workers; hit rate is reported
+# under 'fts_response' at /editor/api/cache_stats.
+_RESPONSE_CACHE = make_cache('fts_response', max_size=256, ttl=300, shared=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -235,8 +291,10 @@ def register_search_route(bp):
           lang     — language code for translation lookup (e.g. 'en')
           pitakas  — comma-separated pitaka filters
           layers   — comma-separated layer filters
+          sort     — 'relevance' ranks by layer-weighted bm25 (default: text order)
         """
-        hierarchy    = load_hierarchy()
+        snapshot     = hierarchy_snapshot()
+        hierarchy    = snapshot.books
         query        = request.args.get('q', '').strip()
         raw_book_id   = request.args.get('book_id', '').strip()
         book_id       = raw_book_id if raw_book_id and raw_book_id != 'undefined' else None
@@ -245,6 +303,7 @@ def register_search_route(bp):
         pitakas      = request.args.get('pitakas', '').strip()
         layers       = request.args.get('layers',  '').strip()
         lang         = request.args.get('lang', '').strip()
+        sort         = request.args.get('sort', '').strip() or None
 
         if not query:
             return jsonify({'books': [], 'results': [], 'total': 0, 'page': page, 'pages': 0})
@@ -253,253 +312,407 @@ def register_search_route(bp):
         if not words:
             return jsonify({'books': [], 'results': [], 'total': 0, 'page': page, 'pages': 0})
 
-        allowed_books = _get_allowed_books(hierarchy, pitakas, layers)
+        allowed_books = snapshot.allowed_books(pitakas, layers)
 
-        with get_webdata_db() as wconn:
-            wcursor = wconn.cursor()
+        generation = index_generation()
+        cache_key = (tuple(words), pitakas, layers, book_id, page, limit, lang, sort, generation)
+        cached = _RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+        # Responses degraded by an error (locked DB, missing index, …) are
+        # returned but not cached.
+        cacheable = True
 
-            # ── Step 1: Get book-level counts (always fast) ─────────────
+        with get_search_db() as wconn:
+            # ── Step 1: Evaluate the MATCH once (cached hit list) ───────
             try:
-                books_data, total = _get_book_counts(wcursor, words, allowed_books)
+                hits = _search_hits(wconn.cursor(), words, allowed_books, sort, hierarchy, generation)
             except Exception as e:
                 # Missing / corrupt FTS index (e.g. webdata.db not built) —
                 # degrade to the substring fallback below instead of 500ing.
-                print(f"[fts_search] book counts error: {e}")
-                books_data, total = [], 0
-
-            # Fallback: if the FTS index found nothing (stale index missing
-            # recently-added content, or an older SQLite that can't match
-            # diacritic query terms), search the authoritative sentences
-            # table directly so searches still return results.
-            use_fallback   = False
-            fallback_pairs = []
-            if total == 0:
-                try:
+                print(f"[fts_search] hit list error: {e}")
+                hits = _HitList(())
+                cacheable = False
+
+        # Fallback: if the FTS index found nothing (stale index missing
+        # recently-added content, or an older SQLite that can't match
+        # diacritic query terms), search the authoritative sentences
+        # table directly so searches still return results.
+        if hits.total == 0:
+            try:
+                with get_search_db() as wconn:
+                    fallback_pairs = _trigram_paragraph_matches(wconn, words, allowed_books)
+                if fallback_pairs is None:
+                    # Trigram index not built yet — LIKE scan of epitaka.db.
                     with get_db() as epi_conn:
                         fallback_pairs = _fallback_paragraph_matches(epi_conn, words, allowed_books)
-                except Exception as e:
-                    print(f"[fts_search] fallback error: {e}")
-                    fallback_pairs = []
-                if fallback_pairs:
-                    use_fallback = True
-                    counts = Counter(p[0] for p in fallback_pairs)
-                    books_data = [{'book_id': bid, 'count': cnt} for bid, cnt in counts.items()]
-                    total = len(fallback_pairs)
-
-            # Look up book names and sort by books.id
-            book_order = _load_book_order()
-            books = []
-            for b in books_data:
-                bid = b['book_id']
-                books.append({
-                    'book_id':   bid,
-                    'book_name': hierarchy.get(bid, {}).get('book_name', bid),
-                    'count':     b['count'],
-                })
-            books.sort(key=lambda b: book_order.get(b['book_id'], 9999))
-
-            # ── Step 2: Fetch results ──────────────────────────────────
-            results = []
-            if book_id:
-                # Per-book paginated detail
-                try:
-                    if use_fallback:
-                        filtered    = [p for p in fallback_pairs if p[0] == book_id]
-                        book_total  = len(filtered)
-                        start       = (page - 1) * limit
-                        rows        = _fetch_line_details(filtered[start:start + limit], words, lang)
-                    else:
-                        rows, book_total = _search_book_lines(
-                            wcursor, words, allowed_books, book_id, page, limit, lang
-                        )
-                    results = _build_results_grouped(rows, hierarchy, words, lang)
-                    display_total = book_total
-                except Exception as e:
-                    print(f"[fts_search] book detail error: {e}")
-                    results = []
-                    display_total = 0
-
-            elif total <= 30:
-                # Small result set — return everything directly
-                try:
-                    if use_fallback:
-                        rows = _fetch_line_details(fallback_pairs, words, lang)
-                    else:
-                        # NOTE: _search_all_lines returns a plain list — do NOT
-                        # unpack it as a (rows, total) tuple here.
-                        rows = _search_all_lines(
-                            wcursor, words, allowed_books, lang
-                        )
-                    results = _build_results_grouped(rows, hierarchy, words, lang)
-                    display_total = total
-                except Exception as e:
-                    print(f"[fts_search] full results error: {e}")
-                    results = []
-                    display_total = 0
+            except Exception as e:
+                print(f"[fts_search] fallback error: {e}")
+                fallback_pairs = []
+                cacheable = False
+            if fallback_pairs:
+                hits = _HitList(fallback_pairs)
+        total = hits.total
+
+        # Look up book names and sort by books.id
+        book_order = snapshot.order
+        books = []
+        for b in hits.book_counts():
+            bid = b['book_id']
+            books.append({
+                'book_id':   bid,
+                'book_name': hierarchy.get(bid, {}).get('book_name', bid),
+                'count':     b['count'],
+            })
+        books.sort(key=lambda b: book_order.get(b['book_id'], 9999))
+
+        # ── Step 2: Fetch results (slices of the hit list) ──────────────
+        results = []
+        if book_id:
+            # Per-book paginated detail
+            try:
+                display_total = hits.book_total(book_id)
+                rows = _hit_line_details(hits.book_page(book_id, page, limit), words, lang)
+                results = _build_results_grouped(rows, hierarchy, words, lang)
+            except Exception as e:
+                print(f"[fts_search] book detail error: {e}")
+                results = []
+                display_total = 0
+                cacheable = False
 
-            else:
-                # total > 30 and no book_id — just show book summary
+        elif total <= 30:
+            # Small result set — return everything directly
+            try:
+                rows = _hit_line_details(hits.pairs(), words, lang)
+                results = _build_results_grouped(rows, hierarchy, words, lang)
                 display_total = total
+            except Exception as e:
+                print(f"[fts_search] full results error: {e}")
+                results = []
+                display_total = 0
+                cacheable = False
+
+        else:
+            # total > 30 and no book_id — just show book summary
+            display_total = total
 
         pages = (display_total + limit - 1) // limit if display_total else 0
 
-        return jsonify({
+        response = {
             'books':   books,
             'results': results,
             'total':   display_total,
             'page':    page,
             'pages':   pages,
             'words':   words,
-        })
+        }
+        if cacheable:
+            _RESPONSE_CACHE.set(cache_key, response)
+        return jsonify(response)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-#  Book-level counts (fast, single GROUP BY)
+#  Search executor — one FTS MATCH per (query, filters)
 # ═══════════════════════════════════════════════════════════════════════════
-
-def _get_book_counts(cursor, words, allowed_books):
+# The book summary, the small-result listing and every per-book page used to
+# run their own MATCH (GROUP BY for counts, then COUNT + LIMIT/OFFSET per
+# page). Instead the MATCH is evaluated once, its (book_id, para_id) hits are
+# kept sorted per book in a bounded cache, and counts / pages are slices of
+# that list — a deep page costs the same as page 1.
+
+class _HitList:
+    """FTS hits of one (query, filters, sort): book_id → para_ids (array).
+
+    Each hit keeps its paragraphs_fts rowid (so a page can fetch its FTS5
+    highlight() by rowid) and, in relevance mode, its weighted bm25 score.
+    Fallback hits (no FTS row) carry rowid 0.
     """
-    Get per-book match counts from paragraphs_fts.
-    Returns (list_of_dicts, total_count).
+
+    __slots__ = ('by_book', 'rowids', 'scores', 'total')
+
+    def __init__(self, rows, ranked=False):
+        grouped = defaultdict(list)
+        for row in rows:
+            bid, pid = row[0], row[1]
+            grouped[bid].append((row[2] if len(row) > 2 else 0,   # rank / score
+                                 pid,
+                                 row[3] if len(row) > 3 else 0))  # rowid
+        # book_id order (as the old ORDER BY book_id, para_id); within a book
+        # by para_id, or by score in relevance mode. Compact arrays keep a
+        # 100k-hit common word at a few megabytes.
+        self.by_book, self.rowids, self.scores = {}, {}, ({} if ranked else None)
+        for bid in sorted(grouped):
+            hits = sorted(grouped[bid], key=(lambda h: (h[0], h[1])) if ranked else (lambda h: h[1]))
+            self.by_book[bid] = array('l', [h[1] for h in hits])
+            self.rowids[bid]  = array('q', [h[2] for h in hits])
+            if ranked:
+                self.scores[bid] = array('d', [h[0] for h in hits])
+        self.total = sum(len(pids) for pids in self.by_book.values())
+
+    def book_counts(self):
+        return [{'book_id': bid, 'count': len(pids)} for bid, pids in self.by_book.items()]
+
+    def book_total(self, book_id):
+        return len(self.by_book.get(book_id, ()))
+
+    def book_page(self, book_id, page, limit):
+        """(book_id, para_id, rowid) hits of one page of one book."""
+        start = (page - 1) * limit
+        pids = self.by_book.get(book_id, ())[start:start + limit]
+        rowids = self.rowids.get(book_id, ())[start:start + limit]
+        return [(book_id, pid, rid) for pid, rid in zip(pids, rowids)]
+
+    def pairs(self):
+        """Every (book_id, para_id, rowid) hit — best first in relevance mode."""
+        hits = [(bid, pid, rid)
+                for bid, pids in self.by_book.items()
+                for pid, rid in zip(pids, self.rowids[bid])]
+        if self.scores is not None:
+            scores = [sc for bid in self.by_book for sc in self.scores[bid]]
+            hits = [h for _, h in sorted(zip(scores, hits), key=lambda t: t[0])]
+        return hits
+
+
+# Entries are small (see _HitList) — a few hundred distinct queries per TTL
+# covers crawler paging through every book of a popular word.
+_HITS_CACHE = make_cache('fts_hits', max_size=256, ttl=300)
+
+# sort=relevance: bm25() is multiplied by a per-layer weight so a canonical
+# (Mūla) passage outranks a commentary paragraph of the same bm25 score.
+# bm25() is negative (more negative = better), so a larger weight ranks higher.
+_LAYER_WEIGHTS = {
+    'M\u016bla':                         1.0,
+    'A\u1e6d\u1e6dhakath\u0101':            0.85,
+    '\u1e6c\u012bk\u0101':                    0.7,
+}
+_DEFAULT_LAYER_WEIGHT = 0.7
+
+
+def _book_weight(hierarchy, book_id):
+    category = hierarchy.get(book_id, {}).get('category')
+    return _LAYER_WEIGHTS.get(category, _DEFAULT_LAYER_WEIGHT)
+
+
+def _search_hits(cursor, words, allowed_books, sort=None, hierarchy=None, generation=''):
+    """Evaluate the FTS MATCH once and return a cached _HitList.
+
+    sort='relevance' ranks hits by layer-weighted bm25 instead of para_id.
     """
-    fts_query         = _build_fts_query(words)
-    bf_sql, bf_params = _book_filter_clause(allowed_books)
+    fts_query = _build_fts_query(words)
+    ranked    = sort == 'relevance'
+    cache_key = (fts_query, tuple(sorted(allowed_books)) if allowed_books is not None else None,
+                 ranked, generation)
+    hits = _HITS_CACHE.get(cache_key)
+    if hits is not None:
+        return hits
 
+    bf_sql, bf_params = _book_filter_clause(allowed_books)
+    rank_sql = 'bm25(paragraphs_fts)' if ranked else '0'
     sql = f'''
-        SELECT p.book_id, COUNT(*) as count
+        SELECT p.book_id, p.para_id, {rank_sql} AS score, p.rowid
         FROM paragraphs_fts p
         WHERE p.paragraphs_fts MATCH ?{bf_sql}
           AND p.book_id IS NOT NULL AND p.book_id != ''
-        GROUP BY p.book_id
     '''
-    rows = cursor.execute(sql, [fts_query] + bf_params).fetchall()
-    books = [{'book_id': r['book_id'], 'count': r['count']} for r in rows]
-    total = sum(r['count'] for r in rows)
-    return books, total
-
-
-# ═══════════════════════════════════════════════════════════════════════════
-#  Full results (all books, no pagination — for small result sets)
-# ═══════════════════════════════════════════════════════════════════════════
-
-def _search_all_lines(cursor, words, allowed_books, lang=None):
-    """Fetch ALL matching paragraphs (used when total <= 30)."""
-    fts_query         = _build_fts_query(words)
-    bf_sql, bf_params = _book_filter_clause(allowed_books)
+    rows = cursor.execute(sql, [fts_query] + bf_params)
+    if ranked:
+        hierarchy = hierarchy or {}
+        weights = {}
+        def weighted(row):
+            bid = row[0]
+            if bid not in weights:
+                weights[bid] = _book_weight(hierarchy, bid)
+            return (bid, row[1], row[2] * weights[bid], row[3])
+        rows = map(weighted, rows)
+    hits = _HitList(rows, ranked=ranked)
+    _HITS_CACHE.set(cache_key, hits)
+    return hits
+
+
+# ── Matched lines from FTS5 highlight() ───────────────────────────────────
+# highlight() marks the tokens FTS5 actually matched. paragraphs_fts stores a
+# paragraph as its lines joined with '\n', so the marked segments tell which
+# lines matched without re-normalising every line in Python.
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+def _fts_highlights(cursor, words, rowids):
+    """rowid → highlight()-marked paragraph text for the given FTS rows."""
+    rowids = [r for r in rowids if r]
+    if not rowids:
+        return {}
+    placeholders = ','.join('?' * len(rowids))
+    rows = cursor.execute(f'''
+        SELECT rowid, highlight(paragraphs_fts, 2, ?, ?)
+        FROM paragraphs_fts
+        WHERE paragraphs_fts MATCH ? AND rowid IN ({placeholders})
+    ''', [_MARK_OPEN, _MARK_CLOSE, _build_fts_query(words)] + rowids).fetchall()
+    return {r[0]: r[1] for r in rows}
 
-    data_sql = f'''
-        SELECT p.book_id, p.para_id
-        FROM paragraphs_fts p
-        WHERE p.paragraphs_fts MATCH ?{bf_sql}
-          AND p.book_id IS NOT NULL AND p.book_id != ''
-        ORDER BY p.book_id, p.para_id
-    '''
-    para_hits = cursor.execute(data_sql, [fts_query] + bf_params).fetchall()
-    if not para_hits:
-        return []
 
-    book_para_pairs = [(r['book_id'], r['para_id']) for r in para_hits]
-    return _fetch_line_details(book_para_pairs, words, lang)
+def _marked_line_ids(marked, lines):
+    """
+    Map a highlight()-marked paragraph back to the line_ids whose text
+    contains a marked token. Returns None when the indexed paragraph no
+    longer lines up with the sentences (stale index) — caller re-detects.
+    """
+    segments = marked.split('\n')
+    # The builder (index_builder._tokenise_chunk, also behind
+    # scripts/rebuild_fts.py and the incremental update) joins the lines
+    # with '\n' and keeps newlines inside a line (e.g. '# heading\n…'), so
+    # a line spans its own newline count + 1 segments.
+    spans = [(line['pali'] or '').count('\n') + 1 for line in lines]
+    if sum(spans) != len(segments):
+        return None
+    matched, i = set(), 0
+    for line, n in zip(lines, spans):
+        if any(_MARK_OPEN in seg for seg in segments[i:i + n]):
+            matched.add(line['line_id'])
+        i += n
+    return matched
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-#  Per-book paginated results
+#  Common: load lines, detect matches, load translations
 # ═══════════════════════════════════════════════════════════════════════════
 
-def _search_book_lines(cursor, words, allowed_books, book_id, page, limit, lang=None):
-    """Fetch paginated results for a single book."""
-    fts_query         = _build_fts_query(words)
-    bf_sql, bf_params = _book_filter_clause(allowed_books)
+# ── Matched lines from the line-level index (lines_fts) ───────────────────
+# lines_fts holds one row per sentence line. Its rowid is
+# paragraphs_fts.rowid * LINE_ROWID_STRIDE + line position, so the matched
+# lines of a whole page of hits come from one MATCH over the page's rowid
+# range, bucketed back to their paragraph by rowid // LINE_ROWID_STRIDE.
 
-    # Count
-    count_sql = f'''
-        SELECT COUNT(*)
-        FROM paragraphs_fts p
-        WHERE p.paragraphs_fts MATCH ?{bf_sql}
-          AND p.book_id = ?
-          AND p.book_id IS NOT NULL AND p.book_id != ''
-    '''
-    total = cursor.execute(count_sql, [fts_query] + bf_params + [book_id]).fetchone()[0]
-    if total == 0:
-        return [], 0
-
-    # Fetch page
-    offset = (page - 1) * limit
-    data_sql = f'''
-        SELECT p.book_id, p.para_id
-        FROM paragraphs_fts p
-        WHERE p.paragraphs_fts MATCH ?{bf_sql}
-          AND p.book_id = ?
-          AND p.book_id IS NOT NULL AND p.book_id != ''
-        ORDER BY p.para_id
-        LIMIT ? OFFSET ?
-    '''
-    para_hits = cursor.execute(data_sql, [fts_query] + bf_params + [book_id, limit, offset]).fetchall()
-    if not para_hits:
-        return [], total
 
-    book_para_pairs = [(book_id, r['para_id']) for r in para_hits]
-    return _fetch_line_details(book_para_pairs, words, lang), total
+def _fts_matched_lines(cursor, words, hits):
+    """
+    (book_id, para_id) → matched line_ids for (book_id, para_id, rowid)
+    FTS hits, from lines_fts. A line matches when it contains any query
+    word (as a token prefix). Returns None when lines_fts is not built.
+    """
+    norm = [n for n in (normalize_pali(w).lower() for w in words) if n] or words
+    line_query = ' OR '.join(f'"{w}"*' for w in norm)
+    by_rowid = {rid: (bid, pid) for bid, pid, rid in hits}
+    matched = {key: [] for key in by_rowid.values()}
+    if not by_rowid:
+        return matched
+    try:
+        rows = cursor.execute('''
+            SELECT rowid, line_id FROM lines_fts
+            WHERE lines_fts MATCH ? AND rowid >= ? AND rowid < ?
+            ORDER BY rowid
+        ''', (line_query, min(by_rowid) * LINE_ROWID_STRIDE,
+              (max(by_rowid) + 1) * LINE_ROWID_STRIDE))
+        for rowid, line_id in rows:
+            key = by_rowid.get(rowid // LINE_ROWID_STRIDE)
+            if key is not None:
+                matched[key].append(line_id)
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            return None
+        raise
+    return matched
 
 
-# ═══════════════════════════════════════════════════════════════════════════
-#  Common: load lines, detect matches, load translations
-# ═══════════════════════════════════════════════════════════════════════════
+def _hit_line_details(hits, words, lang=None):
+    """
+    _fetch_line_details for (book_id, para_id, rowid) hits of a _HitList.
 
-def _fetch_line_details(book_para_pairs, words, lang=None):
+    Matched lines come from the line-level index (lines_fts) when it has
+    been built, else from FTS5 highlight(); only fallback hits (no FTS row)
+    are re-detected in Python by _find_matching_lines.
+    """
+    marked, matched = {}, {}
+    fts_hits = [(bid, pid, rid) for bid, pid, rid in hits if rid]
+    if fts_hits:
+        try:
+            with get_search_db() as wconn:
+                cursor = wconn.cursor()
+                found = _fts_matched_lines(cursor, words, fts_hits)
+                if found is not None:
+                    matched = found
+                else:
+                    by_rowid = {rid: (bid, pid) for bid, pid, rid in fts_hits}
+                    for rid, text in _fts_highlights(cursor, words, list(by_rowid)).items():
+                        marked[by_rowid[rid]] = text
+        except Exception as e:
+            print(f"[fts_search] matched lines error: {e}")
+    return _fetch_line_details([(bid, pid) for bid, pid, _ in hits], words, lang, marked, matched)
+
+
+# Whole paragraphs by (book_id, para_id) keys, joined through json_each()
+# like utils.db.lines_by_key.
+_LINES_BY_PARA_SQL = '''
+    SELECT s.book_id, s.para_id, s.line_id, s.pali
+    FROM json_each(?) AS k
+    CROSS JOIN sentences s
+      ON  s.book_id = json_extract(k.value, '$[0]')
+      AND s.para_id = json_extract(k.value, '$[1]')
+    ORDER BY s.book_id, s.para_id, s.line_id
+'''
+
+
+def _fetch_line_details(book_para_pairs, words, lang=None, marked=None, matched=None):
     """
-    Given a list of (book_id, para_id) pairs, load all lines,
-    detect matched lines, and look up translations.
+    Given a list of (book_id, para_id) pairs, load the matched lines and
+    look up their translations.
+
+    `matched` optionally maps (book_id, para_id) → matched line_ids (from
+    lines_fts): only those lines are loaded. Other paragraphs are loaded
+    whole and their matches detected from `marked` (highlight()-marked FTS
+    text) or, failing that, by _find_matching_lines.
 
     Returns a list of dicts:
         { 'book_id': .., 'para_id': .., 'lines': [{line_id, pali, translation, matched}, ...] }
     """
     if not book_para_pairs:
         return []
+    marked  = marked or {}
+    matched = matched or {}
 
-    placeholders = ' OR '.join('(book_id = ? AND para_id = ?)' for _ in book_para_pairs)
-    params = [v for pair in book_para_pairs for v in pair]
+    line_keys = [[b, p, lid] for b, p in book_para_pairs if (b, p) in matched for lid in matched[(b, p)]]
+    para_keys = [[b, p] for b, p in book_para_pairs if (b, p) not in matched]
 
     # ── Load lines from epitaka.db ──────────────────────────────────────
     with get_db() as epi_conn:
-        all_lines = epi_conn.execute(f'''
-            SELECT book_id, para_id, line_id, pali
-            FROM sentences
-            WHERE {placeholders}
-            ORDER BY book_id, para_id, line_id
-        ''', params).fetchall()
-
         lines_by_key = defaultdict(list)
-        for line in all_lines:
-            lines_by_key[(line['book_id'], line['para_id'])].append(line)
-
-        # ── Load translations ───────────────────────────────────────────
+        if line_keys:
+            rows = lines_by_key(epi_conn, line_keys)
+            for line in sorted(rows, key=lambda r: (r['book_id'], r['para_id'], r['line_id'])):
+                lines_by_key[(line['book_id'], line['para_id'])].append(line)
+        if para_keys:
+            for line in epi_conn.execute(_LINES_BY_PARA_SQL, (json.dumps(para_keys),)):
+                lines_by_key[(line['book_id'], line['para_id'])].append(line)
+
+        # ── Select matched lines ────────────────────────────────────────
+        selected = []
+        for book_id, para_id in book_para_pairs:
+            lines = lines_by_key.get((book_id, para_id), [])
+            if (book_id, para_id) in matched:
+                kept = lines  # only matched lines were loaded
+            else:
+                matched_line_ids = None
+                if (book_id, para_id) in marked:
+                    matched_line_ids = _marked_line_ids(marked[(book_id, para_id)], lines)
+                if matched_line_ids is None:
+                    matched_line_ids = _find_matching_lines(lines, words)
+                kept = [line for line in lines if line['line_id'] in matched_line_ids]
+            selected.append((book_id, para_id, kept))
+
+        # ── Load translations (matched lines only) ──────────────────────
         trans_map = {}
         if lang:
             trans_db = get_translation_db(lang)
-            if trans_db:
-                trans_cursor = trans_db.cursor()
-                trans_cursor.execute(f'''
-                    SELECT book_id, para_id, line_id, translation
-                    FROM sentences
-                    WHERE {placeholders}
-                    ORDER BY book_id, para_id, line_id
-                ''', params)
-                for tr in trans_cursor.fetchall():
+            keys = [[b, p, line['line_id']] for b, p, kept in selected for line in kept]
+            if trans_db and keys:
+                for tr in lines_by_key(trans_db, keys, 'translation'):
                     trans_map[(tr['book_id'], tr['para_id'], tr['line_id'])] = tr['translation']
 
         # ── Build results (matched lines only) ──────────────────────────
         results = []
-        for book_id, para_id in book_para_pairs:
-            lines = lines_by_key.get((book_id, para_id), [])
-            matched_line_ids = _find_matching_lines(lines, words)
-
+        for book_id, para_id, kept in selected:
             line_results = []
-            for line in lines:
+            for line in kept:
                 lid = line['line_id']
-                if lid not in matched_line_ids:
-                    continue  # skip non-matched lines
-
                 pali_text = line['pali'] or ''
                 translation = trans_map.get((book_id, para_id, lid), '') or ''
                 line_results.append({
@@ -525,7 +738,7 @@ def _fetch_line_details(book_para_pairs, words, lang=None):
 
 def _build_results_grouped(rows, hierarchy, words, lang=None):
     """
-    Take the raw results from _fetch_line_details / _search_all_lines
+    Take the raw results from _fetch_line_details
     and group them by book, adding book names, slugs, and highlighting.
 
     Slugs are resolved with one batched query instead of one per result.
@@ -539,6 +752,12 @@ def _build_results_grouped(rows, hierarchy, words, lang=None):
         with get_db() as conn:
             slug_map = build_slug_map(conn, pairs)
 
+    # ── Render + highlight every matched line in one batch ──────────────
+    all_lines = [lr for row in rows for lr in row.get('lines', []) if lr['pali']]
+    highlighter = get_highlighter(tuple(words))
+    for lr, html in zip(all_lines, markdown_to_html_batch([lr['pali'] for lr in all_lines])):
+        lr['pali'] = highlighter.html(html)
+
     for row in rows:
         bid = row['book_id']
         if not grouped[bid]['book_id']:
@@ -548,12 +767,6 @@ def _build_results_grouped(rows, hierarchy, words, lang=None):
         slug = slug_map.get((bid, row['para_id']), '')
 
         lines = row.get('lines', [])
-        # Highlight Pali in matched lines
-        for lr in lines:
-            if lr['pali']:
-                lr['pali'] = markdown_to_html(lr['pali'])
-                lr['pali'] = _highlight_words(lr['pali'], words)
-
         grouped[bid]['items'].append({
             'book_id': bid,
             'para_id': row['para_id'],
@@ -10,22 +10,25 @@ Supports multi-language URL routing:
 """
 from flask import Blueprint, render_template, request, redirect, jsonify, abort, send_from_directory, make_response
 
-from ..utils.db   import get_db, get_translation_db
+from ..utils.db   import get_db, get_translation_db, get_webdata_db, lines_by_key
 from ..utils.text import normalize_pali, markdown_to_html
-from ..utils.cache import TTLCache
+from ..utils.cache import make_cache
+from ..utils.compress import Precompressed
 from ..utils.ratelimit import rate_limit
 from ..utils.assets import get_asset_version
 from ..utils import seo
-from ..services.books import load_hierarchy, organize_hierarchy
+from ..services.books import load_hierarchy, hierarchy_snapshot
 from ..services.toc   import get_book_toc, resolve_split_book, get_section_sentences, build_slug_map
-from ..services.links import load_section_book_links
+from ..services.links import load_section_book_links, load_ref_links
+from ..services.headings import get_book_headings
 from ..services import summaries as summaries_svc
 from ..config import Config
+from .fts_search import search_headings
 
 import os
 import json
-import bisect
-from collections import defaultdict
+import sqlite3
+from urllib.parse import urlencode
 
 _SHARE_LINK_REDIRECT_TEMPLATE = 'app_redirect.html'
 
@@ -43,17 +46,19 @@ bp = Blueprint('main', __name__)
 # Rendered book-page HTML cache. The book page is the most expensive route
 # (TOC + ref_links bulk queries + Jinja render of a long TOC) and crawlers
 # re-hit the same URLs constantly. Bounded LRU so memory stays flat on the
-# small VPS; strings are cached (not Response objects) so each request gets
-# a fresh response to finalize.
-_BOOK_PAGE_CACHE = TTLCache(max_size=24, ttl=300)
+# small VPS; pre-compressed bodies are cached (utils/compress.py — not
+# Response objects) so each request gets a fresh response to finalize, and a
+# page costs ~1/8 of its HTML size. The shared tier lets every gunicorn
+# worker reuse a page rendered by any of them.
+_BOOK_PAGE_CACHE = make_cache('book_page', max_size=96, ttl=300, shared=True)
 # Study-guide and outline pages are English-only content served at /en/…;
 # cached like the book page (crawlers re-hit the same URLs constantly).
-_STUDY_PAGE_CACHE   = TTLCache(max_size=64, ttl=300)
-_OUTLINE_PAGE_CACHE = TTLCache(max_size=32, ttl=300)
+_STUDY_PAGE_CACHE   = make_cache('study_page', max_size=64, ttl=300)
+_OUTLINE_PAGE_CACHE = make_cache('outline_page', max_size=32, ttl=300)
 # The home page: crawlers hammer `/` and `/<lang>/` constantly, and the
 # rendered output is identical for every visitor — cache it like the
 # book page (keyed on asset version so deploys bust the cache).
-_INDEX_PAGE_CACHE   = TTLCache(max_size=32, ttl=300)
+_INDEX_PAGE_CACHE   = make_cache('index_page', max_size=32, ttl=300, shared=True)
 
 
 def get_lang_info(lang_code):
@@ -110,14 +115,13 @@ def index(lang):
             abort(404)
         # If the default language itself is not found, render anyway
         # with empty available_langs to avoid redirect loop
-        hierarchy = load_hierarchy()
         print(f"WARNING: Language '{lang}' not found in translations at {Config.DATA_DIR}")
         return render_template(
             'index.html',
             base_url=Config.BASE_URL,
             site_url=seo.site_base(),
             home_url=seo.absolute(f'/{lang}/'),
-            menu=organize_hierarchy(hierarchy),
+            menu=hierarchy_snapshot().menu,
             lang=lang,
             lang_info={'code': lang, 'english_name': lang.upper(), 'native_name': lang.upper()},
             available_langs=[],
@@ -130,11 +134,10 @@ def index(lang):
     # `/<lang>/` constantly. Keyed on asset version too, so a deploy can
     # never serve pages pointing at old bundles beyond the TTL.
     cache_key = (lang, get_asset_version())
-    cached_html = _INDEX_PAGE_CACHE.get(cache_key)
-    if cached_html is not None:
-        return make_response(cached_html)
+    cached = _INDEX_PAGE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.to_response()
 
-    hierarchy = load_hierarchy()
     lang_info = translations[lang]
     available = [translations[code] for code in sorted(translations.keys())]
 
@@ -143,7 +146,7 @@ def index(lang):
         base_url=Config.BASE_URL,
         site_url=seo.site_base(),
         home_url=seo.absolute(f'/{lang}/'),
-        menu=organize_hierarchy(hierarchy),
+        menu=hierarchy_snapshot().menu,
         lang=lang,
         lang_info=lang_info,
         available_langs=available,
@@ -151,8 +154,9 @@ def index(lang):
         popular_books=seo.popular_books(lang),
         website_jsonld=seo.website_jsonld(lang),
     )
-    _INDEX_PAGE_CACHE.set(cache_key, html)
-    return html
+    body = Precompressed.from_text(html)
+    _INDEX_PAGE_CACHE.set(cache_key, body)
+    return body.to_response()
 
 
 # ── Translation editor console ────────────────────────────────────────────
@@ -407,7 +411,7 @@ def study_guide(lang, book_id, slug):
     cache_key = ('study', book_id, slug, get_asset_version())
     cached = _STUDY_PAGE_CACHE.get(cache_key)
     if cached is not None:
-        return make_response(cached)
+        return cached.to_response()
 
     # Resolve slug → summary (slugs end with -{section_id}; verify, else scan).
     target = None
@@ -521,8 +525,9 @@ def study_guide(lang, book_id, slug):
         lang_info=lang_info,
         available_langs=[translations[code] for code in sorted(translations.keys())],
     )
-    _STUDY_PAGE_CACHE.set(cache_key, html)
-    return make_response(html)
+    body = Precompressed.from_text(html)
+    _STUDY_PAGE_CACHE.set(cache_key, body)
+    return body.to_response()
 
 
 # ── Outline helpers (shared by the outline page route, the sidebar JSON
@@ -541,48 +546,15 @@ def _book_outline_items(conn, book_id):
     where vagga (level 2) / sutta (level 4) are resolved via the parent
     chain (a level-2/4 heading is its own group when no ancestor exists).
     """
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT para_id, level, title, parent FROM headings
-        WHERE book_id = ? AND level = 10
-        ORDER BY para_id
-    ''', (book_id,))
-    items = cursor.fetchall()
-    if not items:
-        cursor.execute('''
-            SELECT para_id, level, title, parent FROM headings
-            WHERE book_id = ? AND level BETWEEN 2 AND 6
-            ORDER BY para_id
-        ''', (book_id,))
-        items = cursor.fetchall()
-    if not items:
-        return []
-
-    cursor.execute('''
-        SELECT para_id, level, title, parent FROM headings
-        WHERE book_id = ? AND level < 10
-    ''', (book_id,))
-    parents = {r['para_id']: r for r in cursor.fetchall()}
-
-    def _ancestor_titles(pid, target_levels):
-        """Walk the parent chain, collecting the title of each target level."""
-        found = {}
-        seen = set()
-        while pid and pid not in seen and pid in parents:
-            seen.add(pid)
-            h = parents[pid]
-            if h['level'] in target_levels:
-                found[h['level']] = h['title'] or ''
-            pid = h['parent']
-        return found
+    index = get_book_headings(conn, book_id)
+    items = index.numbered_rows() or index.level_rows(2, 6)
 
     out = []
-    for it in items:
-        level = it['level']
-        own = it['title'] or ''
-        anc = _ancestor_titles(it['parent'], (2, 4))
+    for para_id, level, title, parent in items:
+        own = title or ''
+        anc = index.ancestor_titles(parent, (2, 4))
         out.append({
-            'para_id':     it['para_id'],
+            'para_id':     para_id,
             'title':       own,
             'level':       level,
             # A level-2/4 heading acts as its own vagga/sutta group; deeper
@@ -659,7 +631,7 @@ def outline(lang, book_id):
     cache_key = ('outline', book_id, get_asset_version())
     cached = _OUTLINE_PAGE_CACHE.get(cache_key)
     if cached is not None:
-        return make_response(cached)
+        return cached.to_response()
 
     with get_db() as conn:
         cursor = conn.cursor()
@@ -698,8 +670,9 @@ def outline(lang, book_id):
         lang_info=translations[Config.DEFAULT_LANG],
         available_langs=[translations[code] for code in sorted(translations.keys())],
     )
-    _OUTLINE_PAGE_CACHE.set(cache_key, html)
-    return make_response(html)
+    body = Precompressed.from_text(html)
+    _OUTLINE_PAGE_CACHE.set(cache_key, body)
+    return body.to_response()
 
 
 @bp.route('/api/outline/<book_id>')
@@ -776,9 +749,9 @@ def book(lang, book_id, section_path=None):
     # deep section links). Keyed on asset version too, so a deploy can never
     # serve pages pointing at old bundles beyond the TTL.
     cache_key = (lang, book_id, section_path, get_asset_version())
-    cached_html = _BOOK_PAGE_CACHE.get(cache_key)
-    if cached_html is not None:
-        return make_response(cached_html)
+    cached = _BOOK_PAGE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.to_response()
 
     lang_info = translations[lang]
     hierarchy = load_hierarchy()
@@ -836,114 +809,21 @@ def book(lang, book_id, section_path=None):
             book_links_html = _render_book_links(book_id, active_para_id, hierarchy, conn, lang_code=lang)
             book_links_by_line = group_book_links_by_line(book_links_html, lang)
 
-        # ── Pre-compute ref_links: map each numbered paragraph (level=10)
-        #    in the current book to matching paragraphs in related books ────
+        # ── ref_links: map each numbered paragraph (level=10) in the
+        #    current book to matching paragraphs in related books ────
         #    Structure:
         #      {src_num_para_id: {ref_type: [{book_id, para_id, slug, num_title}]}}
-        #    Where src_num_para_id is the para_id of a level-10 numbered item
-        #    (like "1", "2", "3") within a section, and slug is from the parent
-        #    level<10 heading in the related book.
-        bookinfo = hierarchy.get(book_id, {})
-        ref_types = {
-            'mula_ref':  bookinfo.get('mula_ref',  []),
-            'attha_ref': bookinfo.get('attha_ref', []),
-            'tika_ref':  bookinfo.get('tika_ref',  []),
-        }
-        # ── Query all level=10 numbered items directly (user's requirement:
-        #    "query level=10 inside headings under current section")
-        #    and match them by title with related books.
-        #    NOTE: get_book_toc() returns only level<=6 — we query level=10
-        #    directly from headings table.
-        #
-        #    Batched: instead of running 2 queries per numbered item per
-        #    related book (thousands of round-trips), load every related
-        #    book's headings in two bulk queries and match in memory.
-        cursor.execute('''
-            SELECT title, para_id FROM headings
-            WHERE book_id = ? AND level = 10
-            ORDER BY para_id
-        ''', (book_id,))
-        numbered_items = cursor.fetchall()
-
-        ref_book_ids = sorted({bid for ids in ref_types.values() for bid in ids})
-
-        # Bulk index: (book_id, num_title) -> first para_id for level-10 items
-        level10_index = defaultdict(list)
-        # Bulk index: book_id -> [(para_id, title)] for parent slug lookup
-        parent_index = defaultdict(list)
-        if ref_book_ids:
-            placeholders = ','.join('?' * len(ref_book_ids))
-            cursor.execute(f'''
-                SELECT book_id, title, para_id FROM headings
-                WHERE book_id IN ({placeholders}) AND level = 10
-                ORDER BY book_id, title, para_id
-            ''', ref_book_ids)
-            for r in cursor.fetchall():
-                level10_index[(r['book_id'], r['title'])].append(r['para_id'])
-
-            cursor.execute(f'''
-                SELECT book_id, para_id, title FROM headings
-                WHERE book_id IN ({placeholders}) AND level < 10
-                ORDER BY book_id, para_id
-            ''', ref_book_ids)
-            for r in cursor.fetchall():
-                parent_index[r['book_id']].append((r['para_id'], r['title']))
-
-        # Precompute sorted parent para lists once per related book
-        parent_paras = {bid: [p for p, _ in parents] for bid, parents in parent_index.items()}
-
-        ref_links = {}
-        for ni in numbered_items:
-            num_title = ni['title']
-            num_pid   = ni['para_id']
-            if not num_title:
-                continue
-            entry = {}
-            for rtype, book_ids in ref_types.items():
-                refs = []
-                for bid in book_ids:
-                    matches = level10_index.get((bid, num_title))
-                    if not matches:
-                        continue
-                    dst_pid = matches[0]
-                    # Find parent level<10 heading for section slug (bisect)
-                    parents = parent_index.get(bid, [])
-                    para_list = parent_paras.get(bid, [])
-                    idx = bisect.bisect_right(para_list, dst_pid) - 1
-                    if idx >= 0 and parents[idx][1]:
-                        dst_slug = parents[idx][1].lower().replace(' ', '-') + '-' + str(parents[idx][0])
-                    else:
-                        dst_slug = ''
-                    info = hierarchy.get(bid, {})
-                    refs.append({
-                        'book_id':   bid,
-                        'book_name': info.get('book_name', bid),
-                        'para_id':   dst_pid,
-                        'num_title': num_title,
-                        'slug':      dst_slug,
-                    })
-                if refs:
-                    entry[rtype] = refs
+        #    Prebuilt by `flask rebuild reflinks` (see services/links.py).
+        ref_links = load_ref_links(conn, book_id, hierarchy)
+
         # ── Inline section outline: the level-10 numbered items inside the
         #    active section, listed at the top of its content so readers can
         #    see (and jump to) the section's structure ──
         section_outline_rows = []
         if active_para_id:
-            cursor.execute('''
-                SELECT COALESCE(
-                    (SELECT MIN(para_id) FROM headings
-                     WHERE book_id = ? AND para_id > ? AND level <= 6),
-                    999999999
-                ) AS end_para
-            ''', (book_id, active_para_id))
-            end_para = cursor.fetchone()['end_para']
-            cursor.execute('''
-                SELECT para_id, title FROM headings
-                WHERE book_id = ? AND level = 10
-                  AND para_id >= ? AND para_id < ?
-                ORDER BY para_id
-            ''', (book_id, active_para_id, end_para))
-            section_outline_rows = cursor.fetchall()
+            index = get_book_headings(conn, book_id)
+            section_outline_rows = index.numbered_rows(
+                active_para_id, index.section_end(active_para_id, 999999999))
 
     if not book_exists:
         # Unknown book_id (bots probing junk paths) — 404 immediately
@@ -1065,11 +945,11 @@ def book(lang, book_id, section_path=None):
     # study-guide link when one exists). Anchored to the para-group ids the
     # template renders, so the browser jumps to the item natively.
     section_outline = []
-    for r in section_outline_rows:
-        sm = summary_map.get(r['para_id'])
+    for para_id, _, title, _ in section_outline_rows:
+        sm = summary_map.get(para_id)
         section_outline.append({
-            'para_id':     r['para_id'],
-            'title':       r['title'] or '',
+            'para_id':     para_id,
+            'title':       title or '',
             'study_url':   seo.absolute(f'/{Config.DEFAULT_LANG}' + sm['url_path']) if sm else None,
             'study_title': sm['title'] if sm else '',
         })
@@ -1107,8 +987,9 @@ def book(lang, book_id, section_path=None):
         section_outline=section_outline,
         firebase_config=Config.FIREBASE_CONFIG,
     )
-    _BOOK_PAGE_CACHE.set(cache_key, html)
-    return make_response(html)
+    body = Precompressed.from_text(html)
+    _BOOK_PAGE_CACHE.set(cache_key, body)
+    return body.to_response()
 
 
 # ── Book link rendering ────────────────────────────────────────────────────
@@ -1215,20 +1096,8 @@ def book_ref(lang, book_id):
 
 @bp.route('/api/menu')
 def api_menu():
-    hierarchy = load_hierarchy()
-    return jsonify({
-        'menu': organize_hierarchy(hierarchy),
-        # Flat map used by the search filter (pitaka / layer chips):
-        #   {book_id: {nikaya, category, book_name}}
-        'hierarchy': {
-            bid: {
-                'nikaya':    h.get('nikaya'),
-                'category':  h.get('category'),
-                'book_name': h.get('book_name'),
-            }
-            for bid, h in hierarchy.items()
-        },
-    })
+    # Serialised + compressed once per epitaka.db (services/books.py).
+    return hierarchy_snapshot().menu_body.to_response()
 
 
 # ── Suggest / search API ───────────────────────────────────────────────────
@@ -1247,24 +1116,22 @@ def suggest_word():
 @bp.route('/api/search_headings')
 @rate_limit(60, 60)
 def search_headings_suggest():
-    hierarchy = load_hierarchy()
     query = request.args.get('q', '').strip()
     if not query:
         return jsonify([])
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT book_id, para_id, title FROM headings WHERE title LIKE ? LIMIT 10',
-            (f'%{query}%',),
-        )
-        results = cursor.fetchall()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    snapshot = hierarchy_snapshot()
+    hierarchy = snapshot.books
+    allowed_books = snapshot.allowed_books(request.args.get('pitakas', '').strip(),
+                                           request.args.get('layers', '').strip())
+    results = search_headings(query, allowed_books, limit)
     return jsonify([{
-        'book_id':   r['book_id'],
-        'book_name': hierarchy.get(r['book_id'], {}).get('book_name', 'Unknown'),
-        'para_id':   r['para_id'],
-        'title':     r['title'],
-        'slug':      (r['title'].lower().replace(' ', '-') + '-' + str(r['para_id'])) if r['title'] else '',
-    } for r in results])
+        'book_id':   book_id,
+        'book_name': hierarchy.get(book_id, {}).get('book_name', 'Unknown'),
+        'para_id':   para_id,
+        'title':     title,
+        'slug':      (title.lower().replace(' ', '-') + '-' + str(para_id)) if title else '',
+    } for book_id, para_id, title in results])
 
 
 @bp.route('/api/bold_suggest')
@@ -1301,68 +1168,163 @@ def bold_suggest():
     return jsonify(output)
 
 
+# /api/bold_definition pages, serialised + compressed, keyed on
+# (word, lang, cursor, limit). The first page of the most-requested words
+# is served from here; shared so every worker reuses it.
+_BOLD_DEF_CACHE = make_cache('bold_definition', max_size=512, ttl=300, shared=True)
+_BOLD_DEF_LIMIT = 100
+_BOLD_DEF_MAX_LIMIT = 500
+
+
+def _parse_bold_cursor(raw):
+    """'<books.id>-<para_id>-<line_id>-<rowid>' → tuple of ints (None if absent)."""
+    if not raw:
+        return None
+    parts = raw.split('-')
+    if len(parts) != 4:
+        raise ValueError(raw)
+    return tuple(int(p) for p in parts)
+
+
 @bp.route('/api/bold_definition')
 @rate_limit(60, 60)
 def bold_definition():
+    """
+    Sentences defining a bold-marked term, in book order.
+
+    Paged by keyset once the request has a ``cursor`` parameter (empty for
+    the first page): ``limit`` rows (default 100, max 500) after it. The body
+    is a JSON list; when more rows follow, the cursor of the next page is
+    sent in ``X-Next-Cursor`` (and a ``Link: rel=next``). Without ``cursor``
+    every row is returned and ``limit`` is ignored, as before paging — the
+    built bundles still call it that way.
+    """
     hierarchy = load_hierarchy()
     query = request.args.get('q', '').strip()
     lang_code = request.args.get('lang', '').strip() or None
     if not query:
         return jsonify([])
-
-    # ── Translation DB (if requested) ──
-    trans_cursor = None
-    if lang_code:
+    limit = after = None
+    if 'cursor' in request.args:
+        limit = max(1, min(request.args.get('limit', _BOLD_DEF_LIMIT, type=int), _BOLD_DEF_MAX_LIMIT))
         try:
-            trans_db = get_translation_db(lang_code)
-            if trans_db:
-                trans_cursor = trans_db.cursor()
-        except Exception:
-            pass
+            after = _parse_bold_cursor(request.args.get('cursor', '').strip())
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    plain = normalize_pali(query)
+    cache_key = (plain, lang_code, after, limit)
+    cached = _BOLD_DEF_CACHE.get(cache_key)
+    if cached is None:
+        cached = _bold_definition_page(hierarchy, plain, lang_code, after, limit)
+        _BOLD_DEF_CACHE.set(cache_key, cached)
+    body, next_cursor = cached
+
+    response = body.to_response()
+    if next_cursor:
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=limit)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
+
+
+def _bold_definition_rows(plain, after, limit):
+    """
+    Up to ``limit`` + 1 rows (book_order, def_rowid, book_id, para_id,
+    line_id, word) of pali_definition matching ``plain``, after keyset
+    ``after``; every row when ``limit`` is None.
+
+    Read from bold_definitions in webdata.db (`flask rebuild definitions`),
+    where a page is one index range however many rows match. Until that is
+    built, from a live join that sorts every match on each page.
+    """
+    # `plain LIKE ?` as before; with no wildcard that is an ASCII case-
+    # insensitive equality, which the NOCASE key of bold_definitions seeks.
+    match = 'LIKE' if '%' in plain or '_' in plain else '='
+    keyset = after is not None
+    params = [plain] + (list(after) if keyset else []) + [-1 if limit is None else limit + 1]
+    try:
+        with get_webdata_db() as wconn:
+            return wconn.execute(f'''
+                SELECT book_order, def_rowid, book_id, para_id, line_id, word
+                FROM bold_definitions
+                WHERE plain {match} ?
+                  {'AND (book_order, para_id, line_id, def_rowid) > (?, ?, ?, ?)' if keyset else ''}
+                ORDER BY book_order, para_id, line_id, def_rowid
+                LIMIT ?
+            ''', params).fetchall()
+    except sqlite3.OperationalError:
+        pass  # bold_definitions not built yet
 
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT d.book_id, d.para_id, d.line_id, d.word,
-                   s.pali
+        return conn.execute(f'''
+            SELECT b.id AS book_order, d.rowid AS def_rowid,
+                   d.book_id, d.para_id, d.line_id, d.word
             FROM pali_definition d
             JOIN books     b ON d.book_id = b.book_id
             JOIN sentences s ON d.book_id = s.book_id
                              AND d.para_id = s.para_id
                              AND d.line_id = s.line_id
             WHERE d.plain LIKE ?
-            ORDER BY b.id, d.para_id
-        ''', (normalize_pali(query),))
-        results = cursor.fetchall()
+              {'AND (b.id, d.para_id, d.line_id, d.rowid) > (?, ?, ?, ?)' if keyset else ''}
+            ORDER BY b.id, d.para_id, d.line_id, d.rowid
+            LIMIT ?
+        ''', params).fetchall()
+
+
+def _bold_definition_page(hierarchy, plain, lang_code, after, limit):
+    """(Precompressed JSON list, next cursor or None) for one page (limit
+    None: all rows)."""
+    # One row past the page tells whether another page follows.
+    rows = _bold_definition_rows(plain, after, limit)
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if more:
+        last = rows[-1]
+        next_cursor = '%d-%d-%d-%d' % (last['book_order'], last['para_id'],
+                                       last['line_id'], last['def_rowid'])
+
+    with get_db() as conn:
+        pali_map = {(r['book_id'], r['para_id'], r['line_id']): r['pali']
+                    for r in lines_by_key(conn, [(r['book_id'], r['para_id'], r['line_id'])
+                                                 for r in rows])}
+        # A bold_definitions row whose sentence is gone (stale table) is skipped.
+        rows = [r for r in rows if (r['book_id'], r['para_id'], r['line_id']) in pali_map]
 
         # ── Pre-compute slugs with one batched query ──
-        slug_map = build_slug_map(conn, [(r['book_id'], r['para_id']) for r in results])
-        output = []
-        for r in results:
-            entry = {
-                'book_id':         r['book_id'],
-                'book_name':       hierarchy.get(r['book_id'], {}).get('book_name', 'Unknown'),
-                'para_id':         r['para_id'],
-                'line_id':         r['line_id'],
-                'title':           r['word'],
-                'slug':            slug_map.get((r['book_id'], r['para_id']), ''),
-                'definition_pali': markdown_to_html(r['pali']),
-            }
-            # Look up translation for this sentence
-            if trans_cursor:
-                try:
-                    trans_cursor.execute('''
-                        SELECT translation FROM sentences
-                        WHERE book_id = ? AND para_id = ? AND line_id = ?
-                    ''', (r['book_id'], r['para_id'], r['line_id']))
-                    trans_row = trans_cursor.fetchone()
-                    if trans_row and trans_row['translation']:
-                        entry['definition_en'] = markdown_to_html(trans_row['translation'])
-                except Exception:
-                    pass
-            output.append(entry)
+        slug_map = build_slug_map(conn, [(r['book_id'], r['para_id']) for r in rows])
 
-    return jsonify(output)
+    # ── Translations of the whole page in one query ──
+    trans_map = {}
+    if lang_code and rows:
+        try:
+            trans_db = get_translation_db(lang_code)
+            if trans_db:
+                keys = [(r['book_id'], r['para_id'], r['line_id']) for r in rows]
+                for tr in lines_by_key(trans_db, keys, 'translation'):
+                    trans_map[(tr['book_id'], tr['para_id'], tr['line_id'])] = tr['translation']
+        except Exception:
+            pass
+
+    output = []
+    for r in rows:
+        entry = {
+            'book_id':         r['book_id'],
+            'book_name':       hierarchy.get(r['book_id'], {}).get('book_name', 'Unknown'),
+            'para_id':         r['para_id'],
+            'line_id':         r['line_id'],
+            'title':           r['word'],
+            'slug':            slug_map.get((r['book_id'], r['para_id']), ''),
+            'definition_pali': markdown_to_html(pali_map[(r['book_id'], r['para_id'], r['line_id'])]),
+        }
+        translation = trans_map.get((r['book_id'], r['para_id'], r['line_id']))
+        if translation:
+            entry['definition_en'] = markdown_to_html(translation)
+        output.append(entry)
+
+    return Precompressed.from_response(jsonify(output)), next_cursor
 
 
 # ── About / Translation page ────────────────────────────────────────────
@@ -4,6 +4,7 @@ import time
 from flask import Blueprint, jsonify, request, g
 
 from ..utils.db import get_db, get_webdata_db
+from ..services.headings import get_book_headings
 from .auth import require_auth
 
 bp = Blueprint('reader', __name__)
@@ -60,16 +61,11 @@ def init_reader_db():
 def _get_section_para_range(book_id, para_id):
     """
     Given a heading para_id, return the (start_para, end_para) range for that
-    TOC section by reading the headings table from epitaka.db.
+    TOC section from the book's heading index (epitaka.db).
     This avoids querying epitaka tables from webdata.db connections.
     """
     with get_db() as conn:
-        row = conn.execute(
-            'SELECT COALESCE(MIN(para_id), 999999) FROM headings '
-            'WHERE book_id = ? AND para_id > ? AND level <= 6',
-            (book_id, para_id)
-        ).fetchone()
-        end_para = row[0] if row and row[0] else 999999
+        end_para = get_book_headings(conn, book_id).section_end(para_id)
     return para_id, end_para
 
 
@@ -1,15 +1,30 @@
+import os
 import threading
-import time
+
+from flask import current_app
+
+from ..utils.compress import Precompressed
 from ..utils.db import get_db
 
 # ─────────────────────────────────────────────
 # Database Helpers
 # ─────────────────────────────────────────────
 
-# Books metadata changes only when the database is rebuilt — cache it.
-_HIERARCHY_CACHE = {}
-_HIERARCHY_LOCK = threading.Lock()
-_HIERARCHY_TTL = 60  # seconds
+# Search-filter buckets (`pitakas` / `layers` params of fts_search and
+# search_headings): key → predicate over a book's metadata. A book's single
+# pitaka (concordance counts) is the first key that matches it.
+PITAKA_MATCH = {
+    'anna':       lambda m: m.get('category') == 'A\u00f1\u00f1a',
+    'suttanta':   lambda m: 'Sutta'      in (m.get('nikaya') or ''),
+    'vinaya':     lambda m: 'Vinaya'     in (m.get('nikaya') or ''),
+    'abhidhamma': lambda m: 'Abhidhamma' in (m.get('nikaya') or ''),
+}
+LAYER_MATCH = {
+    'mula':  lambda m: m.get('category') == 'M\u016bla',
+    'attha': lambda m: m.get('category') == 'A\u1e6d\u1e6dhakath\u0101',
+    'tika':  lambda m: m.get('category') == '\u1e6c\u012bk\u0101',
+}
+
 
 def _parse_ref_list(value):
     """
@@ -25,6 +40,126 @@ def _parse_ref_list(value):
     return [p.strip() for p in str(value).split(' ') if p.strip()]
 
 
+class HierarchySnapshot:
+    """
+    Everything derived from the books table, computed once per epitaka.db
+    file identity (a rebuilt / swapped file gets a new snapshot):
+
+      books      {book_id: metadata} — what load_hierarchy() returns
+      order      {book_id: books.id}
+      menu       organize_hierarchy(books)
+      menu_body  the /api/menu JSON, serialised + compressed
+      pitakas    {filter key: frozenset of book_ids}, likewise layers
+      pitaka_of  {book_id: its pitaka key} (books matching none are absent)
+
+    Treat it as read-only: it is shared by every request of the worker.
+    """
+
+    __slots__ = ('identity', 'books', 'order', 'menu', 'menu_body',
+                 'pitakas', 'layers', 'pitaka_of', 'all_books', '_filters', '_lock')
+
+    def __init__(self, rows, identity):
+        self.identity = identity
+        self.books = {}
+        for row in rows:
+            self.books[row['book_id']] = {
+                'id':          row['id'],
+                'category':    row['category'],
+                'nikaya':      row['nikaya'],
+                'sub_nikaya':  row['sub_nikaya'],
+                'book_name':   row['book_name'],
+                'mula_ref':    _parse_ref_list(row['mula_ref']),
+                'attha_ref':   _parse_ref_list(row['attha_ref']),
+                'tika_ref':    _parse_ref_list(row['tika_ref']),
+                # New split-book fields
+                'para_id':     row['para_id'],
+                'chapter_len': row['chapter_len'],
+            }
+        self.order = {bid: meta['id'] for bid, meta in self.books.items()}
+        self.menu = organize_hierarchy(self.books)
+        self.all_books = frozenset(self.books)
+        self.pitakas = {key: frozenset(bid for bid, meta in self.books.items() if match(meta))
+                        for key, match in PITAKA_MATCH.items()}
+        self.layers = {key: frozenset(bid for bid, meta in self.books.items() if match(meta))
+                       for key, match in LAYER_MATCH.items()}
+        self.pitaka_of = {}
+        for key, members in self.pitakas.items():
+            for bid in members:
+                self.pitaka_of.setdefault(bid, key)
+        self.menu_body = Precompressed.from_response(current_app.json.response({
+            'menu': self.menu,
+            # Flat map used by the search filter (pitaka / layer chips):
+            #   {book_id: {nikaya, category, book_name}}
+            'hierarchy': {
+                bid: {
+                    'nikaya':    meta.get('nikaya'),
+                    'category':  meta.get('category'),
+                    'book_name': meta.get('book_name'),
+                }
+                for bid, meta in self.books.items()
+            },
+        }))
+        self._filters = {}
+        self._lock = threading.Lock()
+
+    def allowed_books(self, pitakas_param, layers_param):
+        """frozenset of the book_ids passing the comma-separated pitaka and
+        layer filters (unknown keys match nothing), or None if unfiltered."""
+        key = (pitakas_param or '', layers_param or '')
+        with self._lock:
+            if key in self._filters:
+                return self._filters[key]
+        pitakas = [p.strip() for p in key[0].split(',') if p.strip()]
+        layers  = [l.strip() for l in key[1].split(',') if l.strip()]
+        if not pitakas and not layers:
+            allowed = None
+        else:
+            allowed = self.all_books
+            if pitakas:
+                allowed = allowed & frozenset().union(*(self.pitakas.get(p, ()) for p in pitakas))
+            if layers:
+                allowed = allowed & frozenset().union(*(self.layers.get(l, ()) for l in layers))
+        with self._lock:
+            if len(self._filters) < 256:  # filter combinations are few; bound junk params
+                self._filters[key] = allowed
+        return allowed
+
+
+_SNAPSHOT = {'value': None}
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _db_identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def hierarchy_snapshot(force=False):
+    """The HierarchySnapshot of the current epitaka.db (rebuilt only when
+    the file changes — one stat() per call otherwise)."""
+    identity = _db_identity(current_app.config['DATABASE'])
+    snapshot = _SNAPSHOT['value']
+    if not force and snapshot is not None and snapshot.identity == identity:
+        return snapshot
+    with _SNAPSHOT_LOCK:
+        snapshot = _SNAPSHOT['value']
+        if not force and snapshot is not None and snapshot.identity == identity:
+            return snapshot
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT id, book_id, category, nikaya, sub_nikaya, book_name,
+                       mula_ref, attha_ref, tika_ref,
+                       para_id, chapter_len
+                FROM books
+                ORDER BY id
+            ''').fetchall()
+        snapshot = _SNAPSHOT['value'] = HierarchySnapshot(rows, identity)
+    return snapshot
+
+
 def load_hierarchy(force=False):
     """
     Load all book metadata from the books table in epitaka.db.
@@ -36,47 +171,9 @@ def load_hierarchy(force=False):
     Each entry also exposes the new para_id and chapter_len fields
     introduced when large books were split.
 
-    Results are cached in-memory with a short TTL since the books
-    table is effectively static at runtime.
+    Served from the hierarchy snapshot; shared — do not modify it.
     """
-    now = time.monotonic()
-    with _HIERARCHY_LOCK:
-        cached = _HIERARCHY_CACHE.get('data')
-        if not force and cached is not None and now - _HIERARCHY_CACHE.get('ts', 0) < _HIERARCHY_TTL:
-            return cached
-
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, book_id, category, nikaya, sub_nikaya, book_name,
-                   mula_ref, attha_ref, tika_ref,
-                   para_id, chapter_len
-            FROM books
-            ORDER BY id
-        ''')
-        rows = cursor.fetchall()
-
-    hierarchy = {}
-    for row in rows:
-        hierarchy[row['book_id']] = {
-            'id':          row['id'],
-            'category':    row['category'],
-            'nikaya':      row['nikaya'],
-            'sub_nikaya':  row['sub_nikaya'],
-            'book_name':   row['book_name'],
-            'mula_ref':    _parse_ref_list(row['mula_ref']),
-            'attha_ref':   _parse_ref_list(row['attha_ref']),
-            'tika_ref':    _parse_ref_list(row['tika_ref']),
-            # New split-book fields
-            'para_id':     row['para_id'],
-            'chapter_len': row['chapter_len'],
-        }
-
-    with _HIERARCHY_LOCK:
-        _HIERARCHY_CACHE['data'] = hierarchy
-        _HIERARCHY_CACHE['ts'] = time.monotonic()
-
-    return hierarchy
+    return hierarchy_snapshot(force).books
 
 
 def organize_hierarchy(hierarchy):
@@ -107,3 +204,4 @@ def get_book_name(book_id):
     hierarchy = load_hierarchy()
     info = hierarchy.get(book_id, {})
     return info.get('book_name', book_id)
+
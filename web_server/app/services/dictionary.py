@@ -10,21 +10,40 @@ Pipeline:
   2. Try epitaka.db: dictionary table for the same word
   3. Fall back to dictionary table stem matching
 """
+import gzip
 import json
-from ..utils.db import get_dpd_db, get_db
+import sqlite3
+from collections import Counter
+from urllib.parse import parse_qs
+from ..utils.cache import make_cache
+from ..utils.db import get_dpd_db, get_db, get_translation_db, get_webdata_db, lines_by_key
+from ..utils.etag import content_generation
 from ..services.books import load_hierarchy, get_book_name
+from ..services.suggest import get_suggest_index
 from ..utils.text import normalize_pali, markdown_to_html
 from ..config import Config
 import re
 
 
+# Assembled search_auto() results keyed on (normalised word, content token
+# of the source databases). Shared so `flask warm-dictionary` and every
+# worker fill one cache; the hit rate shows up under 'dictionary' in
+# cache_stats.
+_LOOKUP_CACHE = make_cache('dictionary', max_size=2048, ttl=6 * 3600, shared=True)
+
+# Usages shown in the dictionary popup / pre-rendered per stem.
+USAGE_POPUP = 5
+USAGE_TOP = 20
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
-def search_auto(word: str) -> list:
+def search_auto(word: str, lang: str = None) -> list:
     """
-    Full dictionary lookup pipeline.
+    Full dictionary lookup pipeline. ``lang`` fills the usages' translation
+    (from the concordance — see below).
 
     Returns a list of definition dicts, each shaped like:
     {
@@ -43,14 +62,21 @@ def search_auto(word: str) -> list:
                 "reader_url":   str,
             },
             ...
-        ]
+        ],
+        # only once `flask rebuild concordance` has run:
+        "usage_total":  int,           # all usages of the stem
+        "usage_counts": {"books": {book_id: n}, "pitakas": {pitaka: n}},
     }
     """
-    word = word.strip().lower()
-    word = "".join(c for c in word if c.isalnum())
+    word = _normalise_word(word)
     if not word:
         return []
 
+    cache_key = (word, lang, content_generation()[0])
+    cached = _LOOKUP_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     results = []
 
     # ── Step 1: Try dpd-dictionary.db ────────────────────────────────────
@@ -62,14 +88,29 @@ def search_auto(word: str) -> list:
         dict_results = _search_epitaka_dict(word)
         results.extend(dict_results)
 
-    # ── Attach sentence usages ────────────────────────────────────────────
-    for entry in results:
-        stem = entry.get("stem") or entry.get("word")
-        entry["usages"] = _get_usages_for_stem(stem)
-
+    # ── Attach sentence usages (one query for every entry) ────────────────
+    stems = [entry.get("stem") or entry.get("word") for entry in results]
+    concordance = _read_concordance(stems, lang)
+    if concordance is None:
+        usages = _get_usages_for_stems(stems)
+        for entry, stem in zip(results, stems):
+            entry["usages"] = usages.get(stem, [])
+    else:
+        for entry, stem in zip(results, stems):
+            found = concordance.get(stem)
+            entry["usages"] = found["usages"][:USAGE_POPUP] if found else []
+            entry["usage_total"] = found["total"] if found else 0
+            entry["usage_counts"] = found["counts"] if found else {"books": {}, "pitakas": {}}
+
+    _LOOKUP_CACHE.set(cache_key, results)
     return results
 
 
+def _normalise_word(word: str) -> str:
+    word = word.strip().lower()
+    return "".join(c for c in word if c.isalnum())
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # DPD Dictionary (dpd-dictionary.db)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -226,82 +267,261 @@ def _search_epitaka_dict(word: str) -> list:
 # Sentence usage lookup (from epitaka.db pali_definition table)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _get_usages_for_stem(stem: str, limit: int = 5) -> list:
+# pali_definition.stem is absent from databases built before stems were
+# resolved; probed once per process (the schema only changes on a rebuild,
+# which comes with a deploy / restart).
+_PALIDEF_MATCH_COLUMN = {}
+
+
+def _palidef_match_column(conn) -> str:
+    column = _PALIDEF_MATCH_COLUMN.get('value')
+    if column is None:
+        columns = {col['name'] for col in conn.execute("PRAGMA table_info(pali_definition)")}
+        column = _PALIDEF_MATCH_COLUMN['value'] = 'stem' if 'stem' in columns else 'word'
+    return column
+
+
+def usage_entry(book_id, para_id, line_id, word, ending, pali, translation=None) -> dict:
+    """One usage as served in an entry's "usages" list."""
+    return {
+        "book_name": get_book_name(book_id),
+        "para_id": para_id,
+        "line_id": line_id,
+        "word": word,
+        "ending": ending,
+        "pali": markdown_to_html(pali or ''),
+        "translation": translation,
+        "reader_url": f"/book/{book_id}?para={para_id}",
+    }
+
+
+def _get_usages_for_stems(stems, limit: int = USAGE_POPUP) -> dict:
     """
-    Find sentences in pali_definition where the word matches stem,
-    then join with sentences table to get the full Pali text.
+    Find sentences in pali_definition where the stem (or, on old databases,
+    the word) matches, joined with sentences for the full Pali text — for
+    all stems in one query. Used until the concordance is built.
 
-    Returns up to `limit` usage dicts.
+    Returns {stem: [usage dict, ...]} with up to `limit` usages per stem.
     """
-    if not stem:
-        return []
+    stems = sorted({s for s in stems if s})
+    if not stems:
+        return {}
 
     with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Try matching by stem field first (if it exists)
-        cursor.execute("PRAGMA table_info(pali_definition)")
-        columns = [col['name'] for col in cursor.fetchall()]
-
-        if 'stem' in columns:
-            rows = cursor.execute("""
-                SELECT
-                    pd.book_id,
-                    pd.para_id,
-                    pd.line_id,
-                    pd.word,
-                    pd.ending,
-                    s.pali
-                FROM pali_definition pd
-                JOIN sentences s
-                  ON  s.book_id = pd.book_id
-                  AND s.para_id = pd.para_id
-                  AND s.line_id = pd.line_id
-                WHERE pd.stem = ?
-                ORDER BY pd.book_id, pd.para_id, pd.line_id
-                LIMIT ?
-            """, (stem, limit)).fetchall()
-        else:
-            # Fallback: match by word
-            rows = cursor.execute("""
+        column = _palidef_match_column(conn)
+        rows = conn.execute(f"""
+            SELECT * FROM (
                 SELECT
+                    pd.{column} AS match_key,
                     pd.book_id,
                     pd.para_id,
                     pd.line_id,
                     pd.word,
                     pd.ending,
-                    s.pali
+                    s.pali,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY pd.{column}
+                        ORDER BY pd.book_id, pd.para_id, pd.line_id
+                    ) AS n
                 FROM pali_definition pd
                 JOIN sentences s
                   ON  s.book_id = pd.book_id
                   AND s.para_id = pd.para_id
                   AND s.line_id = pd.line_id
-                WHERE pd.word = ?
-                ORDER BY pd.book_id, pd.para_id, pd.line_id
-                LIMIT ?
-            """, (stem, limit)).fetchall()
-
-        usages = []
-        for row in rows:
-            book_id = row['book_id']
-            para_id = row['para_id']
-            line_id = row['line_id']
-            word = row['word']
-            ending = row['ending']
-            pali = row['pali'] or ''
-
-            usages.append({
-                "book_name": get_book_name(book_id),
-                "para_id": para_id,
-                "line_id": line_id,
-                "word": word,
-                "ending": ending,
-                "pali": markdown_to_html(pali),
-                "translation": None,
-                "reader_url": f"/book/{book_id}?para={para_id}",
-            })
-
-        return usages
+                WHERE pd.{column} IN (SELECT value FROM json_each(?))
+            )
+            WHERE n <= ?
+            ORDER BY match_key, book_id, para_id, line_id
+        """, (json.dumps(stems), limit)).fetchall()
+
+    usages = {stem: [] for stem in stems}
+    for row in rows:
+        usages[row['match_key']].append(usage_entry(
+            row['book_id'], row['para_id'], row['line_id'],
+            row['word'], row['ending'], row['pali']))
+    return usages
+
+
+def _get_usages_for_stem(stem: str, limit: int = USAGE_POPUP) -> list:
+    """Up to `limit` usage dicts for one stem (see _get_usages_for_stems)."""
+    return _get_usages_for_stems([stem], limit).get(stem, [])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Usage concordance (webdata.db, built by `flask rebuild concordance`)
+# ─────────────────────────────────────────────────────────────────────────────
+# stem_usages       one row per stem: usage total, counts per book / pitaka,
+#                   the first USAGE_TOP usages pre-rendered, and their
+#                   translations in every deployed language
+# stem_usage_lines  every usage of every stem, numbered (seq) in the order
+#                   above — the paged /api/dictionary/usages reads it
+# A dictionary popup is one primary-key read per entry.
+
+def create_concordance_tables(conn, suffix: str = '') -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS stem_usages{suffix} (
+            stem          TEXT    NOT NULL PRIMARY KEY,
+            total         INTEGER NOT NULL,
+            book_counts   TEXT    NOT NULL,   -- JSON {{book_id: n}}
+            pitaka_counts TEXT    NOT NULL,   -- JSON {{pitaka: n}}
+            top_usages    TEXT    NOT NULL,   -- JSON [usage dict, ...]
+            translations  TEXT    NOT NULL    -- JSON {{lang: [html | null, ...]}}
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS stem_usage_lines{suffix} (
+            stem     TEXT    NOT NULL,
+            seq      INTEGER NOT NULL,
+            book_id  TEXT    NOT NULL,
+            para_id  INTEGER NOT NULL,
+            line_id  INTEGER NOT NULL,
+            word     TEXT,
+            ending   TEXT,
+            PRIMARY KEY (stem, seq)
+        ) WITHOUT ROWID
+    """)
+
+
+def _read_concordance(stems, lang=None):
+    """{stem: {"usages", "total", "counts"}} from stem_usages, or None when
+    the concordance hasn't been built yet."""
+    stems = sorted({s for s in stems if s})
+    try:
+        with get_webdata_db() as wconn:
+            rows = wconn.execute("""
+                SELECT stem, total, book_counts, pitaka_counts, top_usages, translations
+                FROM stem_usages WHERE stem IN (SELECT value FROM json_each(?))
+            """, (json.dumps(stems),)).fetchall()
+    except sqlite3.OperationalError:
+        return None
+
+    found = {}
+    for row in rows:
+        usages = json.loads(row['top_usages'])
+        if lang:
+            for usage, translation in zip(usages, json.loads(row['translations']).get(lang, [])):
+                usage['translation'] = translation
+        found[row['stem']] = {
+            "usages": usages,
+            "total": row['total'],
+            "counts": {"books": json.loads(row['book_counts']),
+                       "pitakas": json.loads(row['pitaka_counts'])},
+        }
+    return found
+
+
+def usage_page(stem: str, lang: str = None, after: int = 0, limit: int = 50):
+    """
+    One page of every usage of `stem`, in concordance order:
+    {"stem", "total", "usages", "next_cursor"} — or None when the
+    concordance hasn't been built. `after` is the previous page's cursor.
+    """
+    try:
+        with get_webdata_db() as wconn:
+            head = wconn.execute("SELECT total FROM stem_usages WHERE stem = ?", (stem,)).fetchone()
+            lines = wconn.execute("""
+                SELECT seq, book_id, para_id, line_id, word, ending FROM stem_usage_lines
+                WHERE stem = ? AND seq > ? ORDER BY seq LIMIT ?
+            """, (stem, after, limit + 1)).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    more = len(lines) > limit
+    lines = lines[:limit]
+
+    keys = [(r['book_id'], r['para_id'], r['line_id']) for r in lines]
+    with get_db() as conn:
+        pali = {(r[0], r[1], r[2]): r[3] for r in lines_by_key(conn, keys)}
+    translations = {}
+    trans_db = get_translation_db(lang) if lang and lines else None
+    if trans_db is not None:
+        translations = {(r[0], r[1], r[2]): r[3]
+                        for r in lines_by_key(trans_db, keys, 'translation')}
+
+    usages = []
+    for r in lines:
+        key = (r['book_id'], r['para_id'], r['line_id'])
+        translation = translations.get(key)
+        usages.append(usage_entry(*key, r['word'], r['ending'], pali.get(key),
+                                  markdown_to_html(translation) if translation else None))
+    return {
+        "stem": stem,
+        "total": head['total'] if head else 0,
+        "usages": usages,
+        "next_cursor": lines[-1]['seq'] if more else None,
+    }
+
+
+def concordance_rows(grouped_lines, pitaka_of, langs, top: int = USAGE_TOP):
+    """
+    Rows of the concordance for a batch of stems.
+
+    grouped_lines: [(stem, [(book_id, para_id, line_id, word, ending, pali), ...])]
+    with each stem's lines already in concordance order; pitaka_of is
+    HierarchySnapshot.pitaka_of. Returns (stem_usages rows, stem_usage_lines rows).
+    """
+    head_rows, line_rows = [], []
+    keys = [[l[0], l[1], l[2]] for _, lines in grouped_lines for l in lines[:top]]
+    translated = {}
+    for lang in langs:
+        trans_db = get_translation_db(lang)
+        if trans_db is None or not keys:
+            continue
+        translated[lang] = {(r[0], r[1], r[2]): r[3]
+                            for r in lines_by_key(trans_db, keys, 'translation')}
+
+    for stem, lines in grouped_lines:
+        book_counts = Counter(l[0] for l in lines)
+        pitaka_counts = Counter()
+        for book_id, n in book_counts.items():
+            pitaka_counts[pitaka_of.get(book_id, 'other')] += n
+        top_lines = lines[:top]
+        translations = {}
+        for lang, found in translated.items():
+            texts = [found.get((l[0], l[1], l[2])) for l in top_lines]
+            translations[lang] = [markdown_to_html(t) if t else None for t in texts]
+        head_rows.append((
+            stem, len(lines),
+            json.dumps(dict(book_counts), ensure_ascii=False),
+            json.dumps(dict(pitaka_counts), ensure_ascii=False),
+            json.dumps([usage_entry(*l) for l in top_lines], ensure_ascii=False),
+            json.dumps(translations, ensure_ascii=False),
+        ))
+        line_rows.extend((stem, seq, *l[:5]) for seq, l in enumerate(lines, 1))
+    return head_rows, line_rows
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Warm-up from access logs
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LOG_WORD_RE = re.compile(r'GET /api/dictionary\?(\S*)')
+
+
+def top_logged_words(log_paths, top: int = 500) -> list:
+    """The `top` most requested /api/dictionary words in nginx / gunicorn
+    access logs (plain or .gz), most requested first."""
+    counts = Counter()
+    for path in log_paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                m = _LOG_WORD_RE.search(line)
+                if not m:
+                    continue
+                word = parse_qs(m.group(1)).get('word', [''])[0]
+                word = _normalise_word(word)
+                if word:
+                    counts[word] += 1
+    return [word for word, _ in counts.most_common(top)]
+
+
+def warm_dictionary_cache(log_paths, top: int = 500) -> int:
+    """Look up the most requested words so their results sit in the shared
+    lookup cache before traffic asks for them. Returns the number warmed."""
+    words = top_logged_words(log_paths, top)
+    for word in words:
+        search_auto(word)
+    return len(words)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -309,10 +529,16 @@ def _get_usages_for_stem(stem: str, limit: int = 5) -> list:
 # ─────────────────────────────────────────────────────────────────────────────
 
 def suggest_words(query: str) -> list:
-    """Get word suggestions from dpd-dictionary.db lookup keys."""
+    """Word suggestions for a (diacritic-insensitive) prefix, most frequent
+    first, from the in-memory index (services/suggest.py). Until this
+    worker's index is loaded, falls back to dpd-dictionary.db lookup keys."""
     if not query:
         return []
 
+    index = get_suggest_index()
+    if index is not None:
+        return index.lookup(query, Config.MAX_SUGGESTIONS)
+
     dpd_db = get_dpd_db()
     if dpd_db is None:
         return _fallback_suggest(query)
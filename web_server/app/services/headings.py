@@ -0,0 +1,180 @@
+# app/services/headings.py
+"""
+Per-book heading index.
+
+The TOC, slug maps, section ranges, book-link previews and outlines all
+need the same thing — a book's rows from `headings` — and used to query it
+separately, several times per page. `get_book_headings()` loads a book's
+headings ONCE into a compact structure and keeps it in a size-capped cache:
+
+    para_ids / levels / parents   parallel arrays, sorted by para_id
+    titles                        list of str (or None), same order
+    toc / parent / numbered       per-level views (level <= 6, level < 10,
+                                  level == 10): sorted para_id arrays plus
+                                  positions into the arrays above
+    slugs                         precomputed slug of every level < 10 heading
+
+Every lookup is a bisect over one of those arrays, no SQL.
+"""
+import bisect
+import sys
+from array import array
+
+from ..utils.cache import make_cache
+
+# End of a section that runs to the end of the book (matches the
+# COALESCE(..., 999999) the range queries used).
+SECTION_END = 999999
+
+# A few hundred KB for the largest books; the reader touches a handful of
+# books at a time, so a small cap keeps the working set resident.
+_INDEX_CACHE = make_cache('heading_index', max_size=128, ttl=600)
+
+
+def heading_slug(title, para_id):
+    """URL slug of a heading: lower-cased title, spaces → '-', plus para_id."""
+    return title.lower().replace(' ', '-') + '-' + str(para_id)
+
+
+class _LevelView:
+    """Sorted para_ids of the headings matching one level filter, and their
+    positions in the parent BookHeadings arrays."""
+
+    __slots__ = ('paras', 'pos')
+
+    def __init__(self, para_ids, positions):
+        self.pos = array('l', positions)
+        self.paras = array('l', (para_ids[i] for i in positions))
+
+    def next_after(self, para_id, default):
+        """para_id of the first heading strictly after para_id."""
+        i = bisect.bisect_right(self.paras, para_id)
+        return self.paras[i] if i < len(self.paras) else default
+
+    def between(self, lo, hi):
+        """Positions of the headings with lo <= para_id < hi."""
+        return self.pos[bisect.bisect_left(self.paras, lo):bisect.bisect_left(self.paras, hi)]
+
+    def nbytes(self):
+        return sys.getsizeof(self.paras) + sys.getsizeof(self.pos)
+
+
+class BookHeadings:
+    """All headings of one book, in para_id order (see module docstring)."""
+
+    __slots__ = ('book_id', 'para_ids', 'levels', 'parents', 'titles',
+                 'toc', 'parent', 'numbered', 'slugs', '_by_para')
+
+    def __init__(self, book_id, rows):
+        self.book_id = book_id
+        self.para_ids = array('l', (r[0] for r in rows))
+        # A NULL level matches none of the level filters (as in SQL).
+        self.levels = array('b', (127 if r[1] is None else r[1] for r in rows))
+        self.parents = array('l', (r[3] or 0 for r in rows))
+        self.titles = [r[2] for r in rows]
+
+        n = len(rows)
+        levels = self.levels
+        self.toc = _LevelView(self.para_ids, [i for i in range(n) if levels[i] <= 6])
+        self.parent = _LevelView(self.para_ids, [i for i in range(n) if levels[i] < 10])
+        self.numbered = _LevelView(self.para_ids, [i for i in range(n) if levels[i] == 10])
+        self.slugs = [heading_slug(self.titles[i], self.para_ids[i]) if self.titles[i] else ''
+                      for i in self.parent.pos]
+        # para_id → position of the level < 10 heading (parent-chain walks);
+        # the last one wins when two share a para_id.
+        self._by_para = {self.para_ids[i]: i for i in self.parent.pos}
+
+    def __len__(self):
+        return len(self.para_ids)
+
+    # ── Lookups ────────────────────────────────────────────────────────────
+
+    def section_end(self, para_id, default=SECTION_END):
+        """para_id where the TOC section starting at para_id ends (the next
+        level <= 6 heading), or ``default`` at the end of the book."""
+        return self.toc.next_after(para_id, default)
+
+    def parent_section_end(self, para_id, default=SECTION_END):
+        """Like section_end(), but the next level < 10 heading."""
+        return self.parent.next_after(para_id, default)
+
+    def slug_for(self, para_id):
+        """Slug of the nearest level < 10 heading at or before para_id ('' if
+        none or untitled)."""
+        i = bisect.bisect_right(self.parent.paras, para_id) - 1
+        return self.slugs[i] if i >= 0 else ''
+
+    def rows(self, positions):
+        """[(para_id, level, title, parent)] for the given positions."""
+        return [(self.para_ids[i], self.levels[i], self.titles[i], self.parents[i] or None)
+                for i in positions]
+
+    def toc_rows(self):
+        """Level <= 6 headings: [(para_id, level, title, parent)]."""
+        return self.rows(self.toc.pos)
+
+    def numbered_rows(self, lo=0, hi=sys.maxsize):
+        """Level-10 (numbered) headings with lo <= para_id < hi."""
+        return self.rows(self.numbered.between(lo, hi))
+
+    def level_rows(self, min_level, max_level):
+        """Headings with min_level <= level <= max_level, in para_id order."""
+        return self.rows(i for i in range(len(self.levels))
+                         if min_level <= self.levels[i] <= max_level)
+
+    def first_numbered(self):
+        """{title: para_id of its first level-10 heading}."""
+        out = {}
+        for i in self.numbered.pos:
+            out.setdefault(self.titles[i], self.para_ids[i])
+        return out
+
+    def ancestor_titles(self, parent_pid, target_levels):
+        """Walk the parent chain from parent_pid, collecting the title of
+        each level in target_levels."""
+        found = {}
+        seen = set()
+        pid = parent_pid
+        while pid and pid not in seen and pid in self._by_para:
+            seen.add(pid)
+            i = self._by_para[pid]
+            if self.levels[i] in target_levels:
+                found[self.levels[i]] = self.titles[i] or ''
+            pid = self.parents[i]
+        return found
+
+    # ── Memory ─────────────────────────────────────────────────────────────
+
+    def nbytes(self):
+        """Approximate resident size of this index in bytes."""
+        size = (sys.getsizeof(self.para_ids) + sys.getsizeof(self.levels)
+                + sys.getsizeof(self.parents) + sys.getsizeof(self._by_para)
+                + self.toc.nbytes() + self.parent.nbytes() + self.numbered.nbytes())
+        for strings in (self.titles, self.slugs):
+            size += sys.getsizeof(strings) + sum(sys.getsizeof(s) for s in strings if s)
+        return size
+
+
+def get_book_headings(conn, book_id):
+    """The BookHeadings of book_id, loaded from epitaka.db on first use."""
+    index = _INDEX_CACHE.get(book_id)
+    if index is None:
+        rows = conn.execute('''
+            SELECT para_id, level, title, parent
+            FROM headings
+            WHERE book_id = ?
+            ORDER BY para_id, rowid
+        ''', (book_id,)).fetchall()
+        index = BookHeadings(book_id, [tuple(r) for r in rows])
+        _INDEX_CACHE.set(book_id, index)
+    return index
+
+
+def memory_report():
+    """Per-book size of the heading indexes loaded in this worker."""
+    books = {bid: {'headings': len(idx), 'bytes': idx.nbytes()}
+             for bid, idx in _INDEX_CACHE.items()}
+    return {
+        'books': books,
+        'total_bytes': sum(b['bytes'] for b in books.values()),
+    }
@@ -46,7 +46,7 @@ PATTERN_BOLD = re.compile(
 
 def drop_search_tables_if_exist() -> None:
     """Drop fts, words and pali_definition tables if they exist."""
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         conn.execute("DROP TABLE IF EXISTS sentences_fts")
         conn.execute("DROP TABLE IF EXISTS words")
         conn.execute("DROP TABLE IF EXISTS pali_definition")
@@ -55,7 +55,7 @@ def drop_search_tables_if_exist() -> None:
 
 def create_fts_table() -> None:
     """Create sentences_fts virtual table (FTS5)"""
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         conn.execute("""
             CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5(
                 book_id             UNINDEXED,
@@ -71,7 +71,7 @@ def create_fts_table() -> None:
 
 def create_words_table() -> None:
     """Create words frequency / normalization table"""
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS words (
                 word        TEXT COLLATE NOCASE NOT NULL,
@@ -89,7 +89,7 @@ def create_words_table() -> None:
 
 def create_pali_definition_table() -> None:
     """Create table for bold-marked words + endings in Pali sentences"""
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS pali_definition (
                 book_id     TEXT NOT NULL,
@@ -120,7 +120,7 @@ def populate_pali_definition(batch_size: int = 2000) -> None:
     """
     inserted = 0
 
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -5,12 +5,16 @@ Batched book-links loader.
 Rendering a section's book-link previews used to run one query *per link*
 (sentences preview, translation preview, heading slug).  This module loads
 everything for a section with a handful of batched queries instead.
+
+Also home of the numbered-paragraph cross-references (ref_links) between a
+book and its mūla / aṭṭhakathā / ṭīkā counterparts: computed offline into
+webdata.db by `flask rebuild reflinks`, computed live only as a fallback.
 """
-import bisect
-from collections import defaultdict
+import sqlite3
 
-from ..utils.db import get_translation_db
-from ..utils.text import markdown_to_html
+from ..utils.db import get_translation_db, get_webdata_db
+from ..utils.text import markdown_to_html_batch
+from .headings import get_book_headings
 
 _SQLITE_MAX_VARS = 900  # keep comfortably under SQLite's 999 variable limit
 
@@ -27,18 +31,13 @@ def load_section_book_links(conn, book_id, para_id, lang_code=None):
           'preview': [ {para_id, line_id, pali, translation, is_target}, ... ],
         }
 
-    All sentence / heading lookups are batched into a small number of queries.
+    All sentence lookups are batched into a small number of queries; section
+    ranges and slugs come from the per-book heading index.
     """
     cursor = conn.cursor()
 
     # ── Section range ────────────────────────────────────────────────────
-    cursor.execute('''
-        SELECT para_id FROM headings
-        WHERE book_id = ? AND para_id > ? AND level < 10
-        ORDER BY para_id ASC LIMIT 1
-    ''', (book_id, para_id))
-    next_row = cursor.fetchone()
-    end_para = next_row['para_id'] if next_row else 999999999
+    end_para = get_book_headings(conn, book_id).parent_section_end(para_id, 999999999)
 
     # ── Links in this section ────────────────────────────────────────────
     cursor.execute('''
@@ -88,36 +87,13 @@ def load_section_book_links(conn, book_id, para_id, lang_code=None):
                     if tr['translation']:
                         trans_map[(tr['book_id'], tr['para_id'], tr['line_id'])] = tr['translation']
 
-    # ── Batch-fetch parent headings for slugs ────────────────────────────
-    dst_books = sorted({bid for bid, _ in dst_pairs})
-    parents_map = {}
-    if dst_books:
-        placeholders = ','.join('?' * len(dst_books))
-        cursor.execute(f'''
-            SELECT book_id, para_id, title FROM headings
-            WHERE book_id IN ({placeholders}) AND level < 10
-            ORDER BY book_id, para_id
-        ''', dst_books)
-        by_book = defaultdict(list)
-        for r in cursor.fetchall():
-            by_book[r['book_id']].append((r['para_id'], r['title']))
-        parents_map = by_book
-
-    slug_cache = {}
-
+    # ── Slugs from the destination books' heading indexes ────────────────
     def _get_slug(bid, pid):
-        key = (bid, pid)
-        if key in slug_cache:
-            return slug_cache[key]
-        plist = parents_map.get(bid, [])
-        paras = [p for p, _ in plist]
-        idx = bisect.bisect_right(paras, pid) - 1
-        if idx >= 0 and plist[idx][1]:
-            slug = plist[idx][1].lower().replace(' ', '-') + '-' + str(plist[idx][0])
-        else:
-            slug = ''
-        slug_cache[key] = slug
-        return slug
+        return get_book_headings(conn, bid).slug_for(pid)
+
+    # ── Render every preview line in one batch ───────────────────────────
+    pali_html  = dict(zip(pali_map, markdown_to_html_batch(pali_map.values())))
+    trans_html = dict(zip(trans_map, markdown_to_html_batch(trans_map.values())))
 
     # ── Assemble result ──────────────────────────────────────────────────
     result = []
@@ -128,15 +104,14 @@ def load_section_book_links(conn, book_id, para_id, lang_code=None):
 
         preview = []
         for lid in range(max(0, dst_line - 1), dst_line + 2):
-            pali = pali_map.get((dst_book, dst_para, lid))
-            if pali is None:
+            key = (dst_book, dst_para, lid)
+            if key not in pali_map:
                 continue
-            trans = trans_map.get((dst_book, dst_para, lid)) or ''
             preview.append({
                 'para_id': dst_para,
                 'line_id': lid,
-                'pali': markdown_to_html(pali) if pali else '',
-                'translation': markdown_to_html(trans) if trans else '',
+                'pali': pali_html[key],
+                'translation': trans_html.get(key, ''),
                 'is_target': lid == dst_line,
             })
 
@@ -152,3 +127,117 @@ def load_section_book_links(conn, book_id, para_id, lang_code=None):
         })
 
     return result
+
+
+# ── Numbered-paragraph cross-references (ref_links) ──────────────────────────
+
+REF_TYPES = ('mula_ref', 'attha_ref', 'tika_ref')
+
+
+def compute_ref_links(conn, book_id, hierarchy):
+    """
+    Map each numbered paragraph (level=10 heading) of book_id to the
+    paragraphs with the same number in its related books.
+
+    Returns {src_num_para_id: {ref_type: [{book_id, book_name, para_id,
+    num_title, slug}]}}, where slug is that of the parent level<10 heading
+    in the related book.
+
+    Answered from the per-book heading indexes; still a full pass over the
+    book's numbered items, so the reader uses the prebuilt table
+    (load_ref_links) instead.
+    """
+    bookinfo = hierarchy.get(book_id, {})
+    ref_types = {rtype: bookinfo.get(rtype, []) for rtype in REF_TYPES}
+    ref_book_ids = sorted({bid for ids in ref_types.values() for bid in ids})
+    related = {bid: get_book_headings(conn, bid) for bid in ref_book_ids}
+    # title -> first para_id of a level-10 item, per related book
+    first_numbered = {bid: index.first_numbered() for bid, index in related.items()}
+
+    ref_links = {}
+    for num_pid, _, num_title, _ in get_book_headings(conn, book_id).numbered_rows():
+        if not num_title:
+            continue
+        entry = {}
+        for rtype, book_ids in ref_types.items():
+            refs = []
+            for bid in book_ids:
+                dst_pid = first_numbered[bid].get(num_title)
+                if dst_pid is None:
+                    continue
+                refs.append({
+                    'book_id':   bid,
+                    'book_name': hierarchy.get(bid, {}).get('book_name', bid),
+                    'para_id':   dst_pid,
+                    'num_title': num_title,
+                    'slug':      related[bid].slug_for(dst_pid),
+                })
+            if refs:
+                entry[rtype] = refs
+        if entry:
+            ref_links[num_pid] = entry
+    return ref_links
+
+
+def create_ref_links_table(conn):
+    """ref_links in webdata.db: one row per (numbered paragraph, related book)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ref_links (
+            src_book     TEXT    NOT NULL,
+            src_para_id  INTEGER NOT NULL,
+            ref_type     TEXT    NOT NULL,
+            ord          INTEGER NOT NULL,
+            num_title    TEXT    NOT NULL,
+            dst_book     TEXT    NOT NULL,
+            dst_para_id  INTEGER NOT NULL,
+            dst_slug     TEXT    NOT NULL,
+            PRIMARY KEY (src_book, src_para_id, ref_type, ord)
+        ) WITHOUT ROWID
+    ''')
+
+
+def ref_link_rows(book_id, ref_links):
+    """compute_ref_links() result → ref_links table rows."""
+    for src_pid, entry in ref_links.items():
+        for rtype, refs in entry.items():
+            for ord_, ref in enumerate(refs):
+                yield (book_id, src_pid, rtype, ord_, ref['num_title'],
+                       ref['book_id'], ref['para_id'], ref['slug'])
+
+
+def load_ref_links(conn, book_id, hierarchy, src_para_id=None):
+    """
+    Same result as compute_ref_links(), read from the prebuilt ref_links
+    table with one indexed lookup (optionally for a single numbered
+    paragraph). Falls back to computing live when the table hasn't been
+    built yet.
+    """
+    sql = ('SELECT src_para_id, ref_type, num_title, dst_book, dst_para_id, dst_slug '
+           'FROM ref_links WHERE src_book = ?')
+    params = [book_id]
+    if src_para_id is not None:
+        sql += ' AND src_para_id = ?'
+        params.append(src_para_id)
+    sql += ' ORDER BY src_para_id, ref_type, ord'
+    try:
+        with get_webdata_db() as wconn:
+            rows = wconn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        ref_links = compute_ref_links(conn, book_id, hierarchy)
+        if src_para_id is not None:
+            return {src_para_id: ref_links[src_para_id]} if src_para_id in ref_links else {}
+        return ref_links
+
+    ref_links = {}
+    for r in rows:
+        bid = r['dst_book']
+        ref_links.setdefault(r['src_para_id'], {}).setdefault(r['ref_type'], []).append({
+            'book_id':   bid,
+            'book_name': hierarchy.get(bid, {}).get('book_name', bid),
+            'para_id':   r['dst_para_id'],
+            'num_title': r['num_title'],
+            'slug':      r['dst_slug'],
+        })
+    # Keep the ref-type order of compute_ref_links (mūla, aṭṭhakathā, ṭīkā)
+    return {pid: {rt: entry[rt] for rt in REF_TYPES if rt in entry}
+            for pid, entry in ref_links.items()}
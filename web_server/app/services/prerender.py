@@ -0,0 +1,293 @@
+# app/services/prerender.py
+"""
+Static pre-render of the whole canon (`flask prerender`).
+
+Every book page, section JSON and outline is a pure function of the
+databases and the deployed code, so they can be rendered ahead of time into
+a directory nginx serves straight from disk (see deploy/nginx_epitaka.conf)
+and gunicorn only sees the long tail — search, dictionary, editor:
+
+    <lang>/book/<book_id>/index.html                 /<lang>/book/<book_id>
+    <lang>/book/<book_id>/<slug>/index.html          /<lang>/book/<book_id>/<slug>
+    en/book/<book_id>/outline/index.html             /en/book/<book_id>/outline
+    api/book/<book_id>/section/<pid>.json            /api/book/<book_id>/section/<pid>
+    api/book/<book_id>/section/<pid>.<lang>.json     ...?lang=<lang>
+
+each with a `.gz` (and `.br`, when brotli is installed) sibling for
+nginx's gzip_static / brotli_static.
+
+Pages are rendered through the live app (test client), so the files are
+byte-for-byte what gunicorn would send. The work is split into units — one
+(book, lang) pair, lang '' being the untranslated section JSON and the
+outline — and fanned out over a process pool.
+
+Incremental: `manifest.json` records a fingerprint of each unit's source
+rows (the book's headings / sentences / book_links / study summaries, plus
+its translation rows) and the files it wrote. A re-run only renders the
+units whose fingerprint changed; a new asset version, code deploy, search
+index generation or language set re-renders everything. Pages also embed a
+few lines of *other* books (book-link previews) — after a bulk edit of the
+Pāli text, run with --force.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import quote
+
+from flask import current_app
+
+from ..config import Config
+from ..utils.assets import get_asset_version
+from ..utils.compress import Precompressed
+from ..utils.db import get_db, get_translation_db, index_generation
+from ..utils.etag import _CODE_MTIME
+from .headings import get_book_headings, heading_slug
+from .summaries import get_all_summaries
+
+MANIFEST = 'manifest.json'
+_MANIFEST_VERSION = 1
+
+# Set in the parent before the pool forks; each worker renders through it.
+_APP = None
+
+
+# ── Fingerprints ──────────────────────────────────────────────────────────
+
+def _digest(*row_sets):
+    h = hashlib.blake2b(digest_size=16)
+    for rows in row_sets:
+        for row in rows:
+            h.update(repr(tuple(row)).encode('utf-8', 'surrogatepass'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _site_token(conn, langs):
+    """Inputs shared by every page: code, assets, search-index generation,
+    the books table (navigation / hierarchy) and the language menu."""
+    books = conn.execute('SELECT * FROM books ORDER BY id').fetchall()
+    return _digest(
+        [(get_asset_version(), repr(_CODE_MTIME), index_generation(),
+          Config.BASE_URL, Config.DEFAULT_LANG)],
+        [tuple(sorted(langs))],
+        books,
+    )
+
+
+def _book_fingerprint(conn, book_id):
+    return _digest(
+        conn.execute('SELECT para_id, level, title, parent FROM headings '
+                     'WHERE book_id = ? ORDER BY para_id, rowid', (book_id,)),
+        conn.execute('SELECT para_id, line_id, pali FROM sentences '
+                     'WHERE book_id = ? ORDER BY para_id, line_id', (book_id,)),
+        conn.execute('SELECT src_para, src_line, dst_book, dst_para, dst_line, word '
+                     'FROM book_links WHERE src_book = ? '
+                     'ORDER BY src_para, src_line, dst_book, dst_para, dst_line',
+                     (book_id,)),
+        (tuple(sorted(s.items())) for s in get_all_summaries(book_id)),
+    )
+
+
+def _translation_fingerprint(lang, book_id):
+    trans = get_translation_db(lang)
+    if trans is None:
+        return ''
+    return _digest(trans.execute(
+        'SELECT para_id, line_id, translation FROM sentences '
+        'WHERE book_id = ? ORDER BY para_id, line_id', (book_id,)))
+
+
+# ── Output files ──────────────────────────────────────────────────────────
+
+def page_file(url_path):
+    """Static file for a page URL: /en/book/x/slug → en/book/x/slug/index.html."""
+    return url_path.strip('/') + '/index.html'
+
+
+def section_file(book_id, para_id, lang=''):
+    suffix = f'.{lang}' if lang else ''
+    return f'api/book/{book_id}/section/{para_id}{suffix}.json'
+
+
+def _write(out_dir, rel, data, mimetype):
+    """Write rel (+ .gz / .br) atomically; returns the relative paths written."""
+    path = os.path.normpath(os.path.join(out_dir, rel))
+    if not path.startswith(out_dir + os.sep):
+        raise ValueError(f'refusing to write outside {out_dir}: {rel!r}')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    packed = Precompressed.from_bytes(data, mimetype)
+    written = []
+    for ext, body in (('', data), ('.gz', packed.gzip), ('.br', packed.br)):
+        if body is None:
+            continue
+        tmp = f'{path}{ext}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(body)
+        os.replace(tmp, path + ext)
+        written.append(rel + ext)
+    return written
+
+
+# ── Worker ────────────────────────────────────────────────────────────────
+
+def _unit_urls(book_id, lang):
+    """[(url, static file)] rendered for one (book, lang) unit."""
+    with _APP.app_context():
+        with get_db() as conn:
+            sections = get_book_headings(conn, book_id).toc_rows()
+    q_book = quote(book_id)
+    urls = []
+    if lang:
+        base = f'/{lang}/book/{book_id}'
+        urls.append((f'/{lang}/book/{q_book}', page_file(base)))
+        for para_id, _level, title, _parent in sections:
+            if title:
+                slug = heading_slug(title, para_id)
+                urls.append((f'/{lang}/book/{q_book}/{quote(slug)}', page_file(f'{base}/{slug}')))
+        query = f'?lang={quote(lang)}'
+    else:
+        if Config.DEFAULT_LANG in Config.detect_translations():
+            urls.append((f'/{Config.DEFAULT_LANG}/book/{q_book}/outline',
+                         page_file(f'/{Config.DEFAULT_LANG}/book/{book_id}/outline')))
+        query = ''
+    for para_id, *_ in sections:
+        urls.append((f'/api/book/{q_book}/section/{para_id}{query}',
+                     section_file(book_id, para_id, lang)))
+    return urls
+
+
+def _render_unit(out_dir, book_id, lang):
+    """Render one unit in a pool worker: (files written, [(url, status)])."""
+    client = _APP.test_client()
+    files, errors = [], []
+    for url, rel in _unit_urls(book_id, lang):
+        response = client.get(url)
+        if response.status_code != 200:
+            errors.append((url, response.status_code))
+            continue
+        files += _write(out_dir, rel, response.get_data(), response.mimetype)
+    return files, errors
+
+
+# ── Manifest ──────────────────────────────────────────────────────────────
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == _MANIFEST_VERSION else None
+
+
+def _save_manifest(out_dir, manifest):
+    manifest['generated'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    manifest['files'] = sum(len(u['files']) for u in manifest['units'].values())
+    path = os.path.join(out_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _remove(out_dir, rels):
+    for rel in rels:
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except OSError:
+            pass
+
+
+# ── Build ─────────────────────────────────────────────────────────────────
+
+def prerender(out_dir=None, langs=None, books=None, workers=None, force=False):
+    """
+    Render every stale (book, lang) unit into out_dir (default
+    Config.PRERENDER_DIR). Must run inside a Flask app context.
+    """
+    global _APP
+    out_dir = os.path.abspath(out_dir or Config.PRERENDER_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    all_langs = Config.get_available_languages()
+    langs = [l for l in (langs or all_langs) if l in all_langs]
+
+    print(f"=== Pre-rendering into {out_dir} ===")
+    with get_db() as conn:
+        book_ids = [r['book_id'] for r in conn.execute('SELECT book_id FROM books ORDER BY id')]
+        site = _site_token(conn, all_langs)
+
+        manifest = load_manifest(out_dir)
+        if manifest is None or manifest.get('site') != site:
+            if manifest is not None:
+                print("  → code / assets / index changed: every unit is stale")
+            old_units = manifest['units'] if manifest else {}
+            for unit in old_units.values():
+                unit['fingerprint'] = None
+            manifest = {'version': _MANIFEST_VERSION, 'units': old_units}
+        manifest['site'] = site
+        units = manifest['units']
+
+        # Books dropped from epitaka.db: delete their files.
+        if not books:
+            live = set(book_ids)
+            for key in [k for k in units if k.rsplit('|', 1)[0] not in live]:
+                _remove(out_dir, units.pop(key)['files'])
+
+        todo = []
+        considered = 0
+        for book_id in book_ids:
+            if books and book_id not in books:
+                continue
+            considered += len(langs) + 1
+            book_fp = _book_fingerprint(conn, book_id)
+            for lang in [''] + langs:
+                fp = book_fp if not lang else _digest(
+                    [(book_fp, _translation_fingerprint(lang, book_id))])
+                key = f'{book_id}|{lang}'
+                if force or units.get(key, {}).get('fingerprint') != fp:
+                    todo.append((key, book_id, lang, fp))
+
+    print(f"  → {len(todo):,} of {considered:,} (book, lang) units to render")
+    if not todo:
+        _save_manifest(out_dir, manifest)
+        print("=== Done: nothing changed ===")
+        return manifest
+
+    # Fork so the workers inherit the app; every pooled DB handle is
+    # per-process (keyed on the pid), so nothing is shared across the fork.
+    _APP = current_app._get_current_object()
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+    done = written = failed = 0
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('fork')) as pool:
+        futures = {pool.submit(_render_unit, out_dir, book_id, lang): (key, fp)
+                   for key, book_id, lang, fp in todo}
+        for future in as_completed(futures):
+            key, fp = futures[future]
+            try:
+                files, errors = future.result()
+            except Exception as exc:
+                print(f"     ✗ {key}: {exc!r}")
+                failed += 1
+                continue
+            old = units.get(key, {}).get('files', [])
+            _remove(out_dir, set(old) - set(files))
+            # A unit with failed URLs keeps a null fingerprint → retried next run.
+            units[key] = {'fingerprint': None if errors else fp, 'files': files,
+                          'errors': [f'{status} {url}' for url, status in errors]}
+            failed += bool(errors)
+            done += 1
+            written += len(files)
+            if done % 50 == 0 or done == len(todo):
+                _save_manifest(out_dir, manifest)
+                rate = done / max(time.monotonic() - started, 1e-6)
+                print(f"     {done:,}/{len(todo):,} units, {written:,} files ({rate:,.1f} units/s)")
+
+    _save_manifest(out_dir, manifest)
+    print(f"  → {written:,} files written, {failed:,} unit(s) with errors")
+    print("=== Done: pre-render ===")
+    return manifest
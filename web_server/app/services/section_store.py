@@ -0,0 +1,231 @@
+# app/services/section_store.py
+"""
+Pre-rendered section store (section_store.db).
+
+`get_section_sentences` runs a heading range query, a sentences query, a
+translation query and `markdown_to_html` per line on every cache miss, and
+the in-memory caches are lost on every restart / deploy. This module builds
+every TOC section (level <= 6 heading) of every book, for Pāli only and for
+each translation language, ONCE offline, and stores the finished section
+as a zlib-compressed JSON blob:
+
+    section_blobs(book_id, para_id, lang, body)    -- lang '' = Pāli only
+    store_meta(key, value)                          -- source DB mtimes
+
+At runtime a blob is only served while the source databases are unchanged
+since the build (epitaka.db, and epitaka_<lang>.db for translated
+sections). Any edit — e.g. a translator applying a fix in the editor
+console — makes that language stale and the reader falls back to live
+rendering until the store is rebuilt:
+
+    flask rebuild sections
+    python3 scripts/build_section_store.py
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from ..config import Config
+from ..utils.db import get_db, get_translation_db, get_translation_db_path
+
+_local = threading.local()
+
+# Source mtimes are re-checked at most this often (a stat() per request
+# is cheap, but not free under crawler load).
+_FRESHNESS_TTL = 5.0
+_freshness = {}          # lang -> (checked_at, is_fresh)
+_freshness_lock = threading.Lock()
+
+
+# ── Encoding ───────────────────────────────────────────────────────────────
+
+def encode_section(section):
+    """Section dict → compressed JSON blob (keys sorted, compact separators,
+    so the stored text can be spliced straight into an API response)."""
+    text = json.dumps(section, sort_keys=True, separators=(',', ':'))
+    return zlib.compress(text.encode('utf-8'), 9)
+
+
+def decode_section_json(blob):
+    """Compressed blob → JSON text of the section dict."""
+    return zlib.decompress(blob).decode('utf-8')
+
+
+# ── Source identity ───────────────────────────────────────────────────────
+
+def _source_mtime(path):
+    """Newest mtime of a SQLite file and its WAL (WAL-mode writes only touch
+    the -wal file until the next checkpoint). An empty WAL is ignored — the
+    first reader of a WAL database creates one without changing any data."""
+    if not path or not os.path.isfile(path):
+        return None
+    latest = os.path.getmtime(path)
+    try:
+        wal = os.stat(path + '-wal')
+    except OSError:
+        wal = None
+    if wal is not None and wal.st_size > 0:
+        latest = max(latest, wal.st_mtime)
+    return latest
+
+
+def _source_key(lang):
+    return f'mtime:{lang}' if lang else 'mtime:epitaka'
+
+
+def _source_path(lang):
+    return get_translation_db_path(lang) if lang else Config.DATABASE
+
+
+# ── Runtime read path ─────────────────────────────────────────────────────
+
+def _store_conn():
+    """Per-thread read-only connection, re-opened when the store file is
+    replaced (the builder swaps a finished file in with os.replace)."""
+    path = Config.SECTION_STORE_DB
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    ident = (st.st_ino, st.st_mtime)
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'ident', None) == ident:
+        return conn
+    if conn is not None:
+        conn.close()
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    _local.conn = conn
+    _local.ident = ident
+    return conn
+
+
+def _is_fresh(conn, lang):
+    """True while epitaka.db (and the language's DB) are unchanged since
+    the store was built."""
+    now = time.monotonic()
+    with _freshness_lock:
+        hit = _freshness.get(lang)
+        if hit is not None and now - hit[0] < _FRESHNESS_TTL:
+            return hit[1]
+
+    fresh = True
+    for src in ('', lang) if lang else ('',):
+        row = conn.execute('SELECT value FROM store_meta WHERE key = ?',
+                           (_source_key(src),)).fetchone()
+        current = _source_mtime(_source_path(src))
+        if row is None or current is None or float(row[0]) != current:
+            fresh = False
+            break
+
+    with _freshness_lock:
+        _freshness[lang] = (now, fresh)
+    return fresh
+
+
+def load_section_json(book_id, para_id, lang_code=None):
+    """Return the stored section as JSON text, or None when the blob is
+    missing or stale (caller renders live)."""
+    lang = lang_code or ''
+    try:
+        conn = _store_conn()
+        if conn is None or not _is_fresh(conn, lang):
+            return None
+        row = conn.execute(
+            'SELECT body FROM section_blobs WHERE book_id = ? AND para_id = ? AND lang = ?',
+            (book_id, para_id, lang),
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    return decode_section_json(row[0])
+
+
+def load_section(book_id, para_id, lang_code=None):
+    """Like load_section_json(), decoded into the section dict."""
+    text = load_section_json(book_id, para_id, lang_code)
+    return json.loads(text) if text is not None else None
+
+
+# ── Offline build ─────────────────────────────────────────────────────────
+
+def build_section_store(langs=None, batch_size=2000):
+    """
+    Render every TOC section of every book into a fresh section_store.db.
+
+    Must run inside a Flask app context (it reuses the live renderer so the
+    stored HTML is byte-for-byte what the reader would produce). The new
+    file is built beside the old one and swapped in atomically.
+    """
+    from .toc import render_section
+
+    if langs is None:
+        langs = Config.get_available_languages()
+    target = Config.SECTION_STORE_DB
+    tmp = target + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    print("=== Building: section_store.db ===")
+    # Open the translation DBs first: the first writable open switches a
+    # fresh DB to WAL, which touches the file and must not count as an edit.
+    for lang in langs:
+        get_translation_db(lang, writable=True)
+    # Record the source identities BEFORE reading, so an edit that lands
+    # mid-build leaves the store (conservatively) stale rather than wrong.
+    meta = {_source_key(''): _source_mtime(Config.DATABASE)}
+    for lang in langs:
+        meta[_source_key(lang)] = _source_mtime(get_translation_db_path(lang))
+
+    out = sqlite3.connect(tmp)
+    out.execute('PRAGMA journal_mode = OFF')
+    out.execute('PRAGMA synchronous = OFF')
+    out.execute('''
+        CREATE TABLE section_blobs (
+            book_id  TEXT    NOT NULL,
+            para_id  INTEGER NOT NULL,
+            lang     TEXT    NOT NULL,
+            body     BLOB    NOT NULL,
+            PRIMARY KEY (book_id, para_id, lang)
+        ) WITHOUT ROWID
+    ''')
+    out.execute('CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    with get_db() as conn:
+        sections = conn.execute('''
+            SELECT book_id, para_id FROM headings
+            WHERE level <= 6
+            ORDER BY book_id, para_id
+        ''').fetchall()
+        print(f"  → {len(sections):,} sections × {len(langs) + 1} variants")
+
+        buffer = []
+        written = 0
+        started = time.monotonic()
+        for row in sections:
+            book_id, para_id = row['book_id'], row['para_id']
+            for lang in [''] + list(langs):
+                section = render_section(book_id, para_id, conn, lang or None)
+                buffer.append((book_id, para_id, lang, encode_section(section)))
+            if len(buffer) >= batch_size:
+                out.executemany('INSERT OR REPLACE INTO section_blobs VALUES (?, ?, ?, ?)', buffer)
+                out.commit()
+                written += len(buffer)
+                buffer.clear()
+                rate = written / max(time.monotonic() - started, 1e-6)
+                print(f"     {written:,} blobs written ({rate:,.0f}/s)")
+        if buffer:
+            out.executemany('INSERT OR REPLACE INTO section_blobs VALUES (?, ?, ?, ?)', buffer)
+            written += len(buffer)
+
+    out.executemany('INSERT INTO store_meta VALUES (?, ?)',
+                    [(k, repr(v)) for k, v in meta.items() if v is not None])
+    out.commit()
+    out.execute('VACUUM')
+    out.close()
+    os.replace(tmp, target)
+    print(f"  → {written:,} blobs, {os.path.getsize(target):,} bytes")
+    print("=== Done: section_store.db ===")
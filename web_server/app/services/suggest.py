@@ -0,0 +1,208 @@
+# app/services/suggest.py
+"""
+In-memory autocomplete index for /api/suggest_word.
+
+Every suggestible word — dpd_lookup keys from dpd-dictionary.db plus the
+corpus `words` table in epitaka.db — is held in one sorted array keyed on
+its diacritic-folded form (ā → a, ṃ → m, …), ranked by corpus frequency.
+A lookup is a binary search for the prefix range and a top-k pick, with
+no SQLite involved:
+
+  - prefixes of up to _TOP_PREFIX_LEN characters (the huge ranges) have
+    their top-k precomputed at load time;
+  - longer prefixes cover a few hundred entries at most, ranked on the fly.
+
+To stay compact the keys are not kept as a million small str objects: the
+folded keys and the display forms are each one '\n'-joined string, with
+the start offsets and frequencies in flat arrays.
+
+The index is built in a background thread on the first suggestion a
+worker serves (suggest_words() falls back to SQL until it is ready) and
+rebuilt the same way when dpd-dictionary.db or epitaka.db is replaced or
+modified.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+from array import array
+
+from ..config import Config
+from ..utils.db import get_dpd_db, _pooled_conn
+from ..utils.text import normalize_pali
+
+_TOP_PREFIX_LEN = 3
+_CHECK_INTERVAL = 60  # seconds between source-file checks
+
+
+def fold_key(text):
+    """Diacritic- and case-folded form used for prefix matching."""
+    return normalize_pali(text).lower()
+
+
+class _Strings:
+    """Read-only sequence view of a '\n'-joined blob (bisect works on it)."""
+
+    __slots__ = ('blob', 'starts')
+
+    def __init__(self, items):
+        self.blob = '\n'.join(items) + '\n'
+        self.starts = array('L', [0])
+        pos = 0
+        for item in items:
+            pos += len(item) + 1
+            self.starts.append(pos)
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.starts[i]:self.starts[i + 1] - 1]
+
+
+class SuggestIndex:
+    """Sorted prefix array of (folded key, display form, frequency)."""
+
+    def __init__(self, entries, top_k):
+        """entries: {display form: (folded key, frequency)}."""
+        ordered = sorted(entries.items(), key=lambda e: (e[1][0], -e[1][1], e[0]))
+        self.top_k = top_k
+        self.keys = _Strings([folded for _, (folded, _) in ordered])
+        self.words = _Strings([display for display, _ in ordered])
+        self.freqs = array('q', [freq for _, (_, freq) in ordered])
+        self.top = self._precompute_top()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def _best(self, indices, k):
+        # nlargest is stable, so equal frequencies keep alphabetical order.
+        return heapq.nlargest(k, indices, key=self.freqs.__getitem__)
+
+    def _precompute_top(self):
+        """{prefix: (index, ...)} for every prefix of up to _TOP_PREFIX_LEN
+        characters, in one ordered pass per prefix length."""
+        top = {}
+        keys = self.keys
+        for length in range(1, _TOP_PREFIX_LEN + 1):
+            group, members = None, []
+            for i in range(len(keys)):
+                key = keys[i]
+                if len(key) < length:
+                    continue
+                prefix = key[:length]
+                if prefix != group:
+                    if members:
+                        top[group] = tuple(self._best(members, self.top_k))
+                    group, members = prefix, []
+                members.append(i)
+            if members:
+                top[group] = tuple(self._best(members, self.top_k))
+        return top
+
+    def lookup(self, query, limit):
+        """Up to ``limit`` display forms starting with ``query`` (folded),
+        most frequent first."""
+        prefix = fold_key(query)
+        if not prefix:
+            return []
+        if len(prefix) <= _TOP_PREFIX_LEN and limit <= self.top_k:
+            indices = self.top.get(prefix, ())[:limit]
+        else:
+            lo, hi = self._range(prefix)
+            indices = self._best(range(lo, hi), limit)
+        return [self.words[i] for i in indices]
+
+
+# ── Loading ───────────────────────────────────────────────────────────────
+
+def _load_entries():
+    """{display form: (folded key, corpus frequency)} from both sources."""
+    entries = {}
+    conn = _pooled_conn(Config.DATABASE, immutable=Config.DB_IMMUTABLE)
+    if conn is not None:
+        try:
+            for word, plain, freq in conn.execute(
+                    'SELECT word, plain, frequency FROM words'):
+                entries[word] = (plain.lower() if plain else fold_key(word), freq)
+        except Exception:
+            pass  # words not built yet (`flask rebuild words`)
+
+    dpd_db = get_dpd_db()
+    if dpd_db is not None:
+        try:
+            for (key,) in dpd_db.execute('SELECT lookup_key FROM dpd_lookup'):
+                if key and key not in entries:
+                    entries[key] = (fold_key(key), 0)
+        except Exception:
+            pass
+    return entries
+
+
+def _source_signature():
+    """Identity of the files the index is built from (rebuild on change)."""
+    signature = []
+    for path in (Config.DATABASE, Config.DPD_DICTIONARY_DB):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+_state = {'index': None, 'signature': None, 'checked': 0.0, 'loading': False, 'pid': None}
+_state_lock = threading.Lock()
+
+
+def _build(signature):
+    try:
+        started = time.monotonic()
+        index = SuggestIndex(_load_entries(), Config.MAX_SUGGESTIONS)
+        print(f'[suggest] {len(index):,} words indexed in '
+              f'{time.monotonic() - started:.1f}s')
+    except Exception as e:
+        print(f'[suggest] index build failed: {e!r}')
+        index = None
+    with _state_lock:
+        if index is not None:
+            _state['index'] = index
+        _state['signature'] = signature
+        _state['loading'] = False
+
+
+def get_suggest_index(wait=False):
+    """This worker's SuggestIndex, or None while the first build runs (or
+    after a failed one — retried once the check interval has passed).
+
+    Starts a background (re)build when the index is missing or its source
+    files changed; the previous index keeps serving in the meantime.
+    ``wait=True`` builds synchronously instead (CLI / tests).
+    """
+    now = time.monotonic()
+    with _state_lock:
+        if _state['pid'] != os.getpid():
+            # Forked from a process that had (or was building) an index.
+            _state.update(index=None, signature=None, checked=0.0, loading=False,
+                          pid=os.getpid())
+        index = _state['index']
+        built = _state['signature'] is not None
+        if _state['loading'] or (built and now - _state['checked'] < _CHECK_INTERVAL):
+            return index
+        _state['checked'] = now
+        signature = _source_signature()
+        if built and signature == _state['signature']:
+            return index
+        _state['loading'] = True
+    if wait:
+        _build(signature)
+        return _state['index']
+    threading.Thread(target=_build, args=(signature,), name='suggest-index',
+                     daemon=True).start()
+    return index
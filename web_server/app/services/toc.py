@@ -9,16 +9,23 @@ Works with the new epitaka.db schema where:
 import bisect
 from collections import defaultdict
 
-from ..utils.text import markdown_to_html
+from ..utils.text import markdown_to_html_batch
 from ..utils.db import get_db, get_translation_db
-from ..utils.cache import TTLCache
+from ..utils.cache import make_cache
+from .headings import get_book_headings
+from .section_store import load_section
 
 # TOC + section content are static per (book, lang) and are fetched by the
 # book page, the section API, AND the mobile app — bots + readers hit the
 # same sections over and over. Cache them so the expensive batched queries
-# run once per TTL instead of once per request.
-_SECTION_CACHE = TTLCache(max_size=512, ttl=300)
-_TOC_CACHE = TTLCache(max_size=256, ttl=300)
+# run once per TTL instead of once per request. Shared across workers so a
+# section rendered by one gunicorn worker is served by all of them.
+_SECTION_CACHE = make_cache('section', max_size=512, ttl=300, shared=True)
+_TOC_CACHE = make_cache('toc', max_size=256, ttl=300, shared=True)
+
+# Section ranges per batched sentences query (2 variables each, under
+# SQLite's 999-variable limit).
+_SQLITE_MAX_RANGES = 400
 
 
 def get_book_toc(book_id, conn):
@@ -35,18 +42,12 @@ def get_book_toc(book_id, conn):
     cached = _TOC_CACHE.get(book_id)
     if cached is not None:
         return cached
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT para_id, level, title
-        FROM headings
-        WHERE book_id = ? AND level <= 6
-        ORDER BY para_id
-    ''', (book_id,))
-    rows = cursor.fetchall()
-
+    rows = get_book_headings(conn, book_id).toc_rows()
     if not rows:
         return []
 
+    cursor = conn.cursor()
+
     # ── Batch: sentence count per para_id for the book's heading span ────
     # The original code ran a `LIMIT 2` query per heading; we instead count
     # sentences per para_id once and resolve each heading's section in Python.
@@ -58,7 +59,7 @@ def get_book_toc(book_id, conn):
         WHERE book_id = ? AND para_id >= ?
         GROUP BY para_id
         ORDER BY para_id
-    ''', (book_id, rows[0]['para_id']))
+    ''', (book_id, rows[0][0]))
     para_counts = cursor.fetchall()
 
     para_ids = [r['para_id'] for r in para_counts]
@@ -69,11 +70,11 @@ def get_book_toc(book_id, conn):
         prefix.append(prefix[-1] + c)
 
     toc_items = []
-    for i, h in enumerate(rows):
+    for i, (h_para, h_level, h_title, _) in enumerate(rows):
         # Next heading's para_id marks the end of this section
-        end_para = rows[i + 1]['para_id'] if i + 1 < len(rows) else 999999999
+        end_para = rows[i + 1][0] if i + 1 < len(rows) else 999999999
 
-        lo = bisect.bisect_left(para_ids, h['para_id'])
+        lo = bisect.bisect_left(para_ids, h_para)
         hi = bisect.bisect_left(para_ids, end_para)
         section_count = prefix[hi] - prefix[lo]
 
@@ -85,12 +86,12 @@ def get_book_toc(book_id, conn):
         elif section_count == 1 and lo < hi:
             # Single sentence — is it the heading itself or actual content?
             # If its para_id differs from the heading, it's content.
-            has_content = para_ids[lo] != h['para_id']
+            has_content = para_ids[lo] != h_para
 
         toc_items.append({
-            'para_id':     h['para_id'],
-            'level':       h['level'],
-            'title':       h['title'],
+            'para_id':     h_para,
+            'level':       h_level,
+            'title':       h_title,
             'has_content': has_content,
         })
 
@@ -104,7 +105,7 @@ def build_slug_map(conn, book_para_pairs):
     {(book_id, para_id): slug} where the slug is built from the nearest
     parent heading (level < 10) at or before para_id.
 
-    All lookups are batched into one query per book.
+    Answered from each book's heading index (services/headings.py).
     """
     if not book_para_pairs:
         return {}
@@ -113,26 +114,13 @@ def build_slug_map(conn, book_para_pairs):
     for bid, pid in book_para_pairs:
         by_book[bid].add(pid)
 
-    cursor = conn.cursor()
     slug_map = {}
     for bid, pids in by_book.items():
-        cursor.execute('''
-            SELECT para_id, title FROM headings
-            WHERE book_id = ? AND level < 10
-            ORDER BY para_id
-        ''', (bid,))
-        parents = cursor.fetchall()
-        if not parents:
+        index = get_book_headings(conn, bid)
+        if not index.parent.paras:
             continue
-        para_list = [r['para_id'] for r in parents]
         for pid in pids:
-            idx = bisect.bisect_right(para_list, pid) - 1
-            if idx >= 0 and parents[idx]['title']:
-                slug_map[(bid, pid)] = (
-                    parents[idx]['title'].lower().replace(' ', '-') + '-' + str(parents[idx]['para_id'])
-                )
-            else:
-                slug_map[(bid, pid)] = ''
+            slug_map[(bid, pid)] = index.slug_for(pid)
     return slug_map
 
 
@@ -156,41 +144,110 @@ def get_section_sentences(book_id, para_id, conn, lang_code=None):
     cached = _SECTION_CACHE.get(cache_key)
     if cached is not None:
         return cached
-    cursor = conn.cursor()
+    # Pre-rendered by `flask rebuild sections`; None when missing or stale.
+    section = load_section(book_id, para_id, lang_code)
+    if section is None:
+        section = render_section(book_id, para_id, conn, lang_code)
+    _SECTION_CACHE.set(cache_key, section)
+    return section
+
+
+def render_section(book_id, para_id, conn, lang_code=None):
+    """Live (uncached) rendering behind get_section_sentences — also used by
+    the offline section-store builder, so stored and live HTML never drift."""
+    # Section range from the book's heading index (headings is only in epitaka.db)
+    end_para = get_book_headings(conn, book_id).section_end(para_id)
+    rows, translation_map = _fetch_section_rows(conn, book_id, [(para_id, end_para)], lang_code)
+    return _assemble_section(para_id, rows, translation_map)
 
-    # Compute section range from headings ONCE (headings is only in epitaka.db)
-    cursor.execute('''
-        SELECT COALESCE(
-            (SELECT MIN(para_id) FROM headings
-             WHERE book_id = ? AND para_id > ? AND level <= 6),
-            999999
-        ) AS end_para
-    ''', (book_id, para_id))
-    end_para = cursor.fetchone()['end_para']
-
-    # Fetch Pāli sentences using the pre-computed range
-    cursor.execute('''
-        SELECT para_id, line_id, pali
-        FROM sentences
-        WHERE book_id = ? AND para_id >= ? AND para_id < ?
-        ORDER BY para_id, line_id
-    ''', (book_id, para_id, end_para))
-    rows = cursor.fetchall()
 
-    # Fetch translation if language is specified
+def iter_sections(book_id, para_ids, conn, lang_code=None):
+    """
+    Yield (para_id, section) for each distinct para_id, in request order —
+    the same dicts get_section_sentences() returns.
+
+    Sections not in the cache or the section store are fetched together:
+    one sentences query and one translation query over all their ranges,
+    split in Python. Each section's Markdown is rendered only when it is
+    yielded, so a streaming caller can send the first section before the
+    last one is assembled.
+    """
+    lang = lang_code or ''
+    ready = {}
+    missing = []
+    for pid in dict.fromkeys(para_ids):
+        section = _SECTION_CACHE.get((book_id, pid, lang))
+        if section is None:
+            section = load_section(book_id, pid, lang_code)
+            if section is not None:
+                _SECTION_CACHE.set((book_id, pid, lang), section)
+        if section is None:
+            missing.append(pid)
+        else:
+            ready[pid] = section
+
+    bounds = {}
+    rows, translation_map, row_paras = [], {}, []
+    if missing:
+        index = get_book_headings(conn, book_id)
+        bounds = {pid: (pid, index.section_end(pid)) for pid in missing}
+        rows, translation_map = _fetch_section_rows(conn, book_id, bounds.values(), lang_code)
+        row_paras = [r['para_id'] for r in rows]
+
+    for pid in dict.fromkeys(para_ids):
+        section = ready.get(pid)
+        if section is None:
+            start, end = bounds[pid]
+            lo = bisect.bisect_left(row_paras, start)
+            hi = bisect.bisect_left(row_paras, end)
+            section = _assemble_section(pid, rows[lo:hi], translation_map)
+            _SECTION_CACHE.set((book_id, pid, lang), section)
+        yield pid, section
+
+
+def _fetch_section_rows(conn, book_id, ranges, lang_code=None):
+    """
+    Pāli rows (ordered by para_id, line_id) and the {(para_id, line_id):
+    translation} map covering every [start, end) para range — one query
+    per database, however many ranges (overlapping ranges are merged).
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    rows = []
     translation_map = {}
-    if lang_code:
-        trans_db = get_translation_db(lang_code)
+    trans_db = get_translation_db(lang_code) if lang_code else None
+    for i in range(0, len(merged), _SQLITE_MAX_RANGES):
+        chunk = merged[i:i + _SQLITE_MAX_RANGES]
+        where = ' OR '.join(['(para_id >= ? AND para_id < ?)'] * len(chunk))
+        params = [book_id] + [v for rng in chunk for v in rng]
+        rows.extend(conn.execute(f'''
+            SELECT para_id, line_id, pali
+            FROM sentences
+            WHERE book_id = ? AND ({where})
+            ORDER BY para_id, line_id
+        ''', params).fetchall())
         if trans_db:
-            trans_cursor = trans_db.cursor()
-            trans_cursor.execute('''
+            for tr in trans_db.execute(f'''
                 SELECT para_id, line_id, translation
                 FROM sentences
-                WHERE book_id = ? AND para_id >= ? AND para_id < ?
+                WHERE book_id = ? AND ({where})
                 ORDER BY para_id, line_id
-            ''', (book_id, para_id, end_para))
-            for tr in trans_cursor.fetchall():
+            ''', params):
                 translation_map[(tr['para_id'], tr['line_id'])] = tr['translation']
+    return rows, translation_map
+
+
+def _assemble_section(para_id, rows, translation_map):
+    """Render one section from its Pāli rows and the translation map."""
+    # Render the whole section's Pāli + translation lines in one batch
+    translations = [translation_map.get((r['para_id'], r['line_id']), '') for r in rows]
+    pali_html  = markdown_to_html_batch([r['pali'] for r in rows])
+    trans_html = markdown_to_html_batch(translations)
 
     # Check if the first sentence is the heading itself (same para_id)
     heading_translation = None
@@ -198,27 +255,24 @@ def get_section_sentences(book_id, para_id, conn, lang_code=None):
     for i, r in enumerate(rows):
         pid = r['para_id']
         lid = r['line_id']
-        translation = translation_map.get((pid, lid), '')
 
         # Skip the first row if it has the same para_id as the heading
         if i == 0 and pid == para_id:
-            heading_translation = markdown_to_html(translation) if translation else None
+            heading_translation = trans_html[i] if translations[i] else None
             continue
 
         result.append({
             'para_id':     pid,
             'line_id':     lid,
-            'pali':        markdown_to_html(r['pali']) if r['pali'] else '',
-            'translation': markdown_to_html(translation) if translation else '',
+            'pali':        pali_html[i],
+            'translation': trans_html[i],
         })
 
-    section = {
+    return {
         'sentences': result,
         'heading_translation': heading_translation,
         'has_content': len(result) > 0,
     }
-    _SECTION_CACHE.set(cache_key, section)
-    return section
 
 
 def get_level10_sections(conn, book_id):
@@ -229,42 +283,13 @@ def get_level10_sections(conn, book_id):
 
     Returns [{'para_id', 'title', 'sutta_title', 'vagga_title'}, ...].
     """
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT para_id, level, title, parent
-        FROM headings
-        WHERE book_id = ? AND level = 10
-        ORDER BY para_id
-    ''', (book_id,))
-    items = cursor.fetchall()
-    if not items:
-        return []
-
-    cursor.execute('''
-        SELECT para_id, level, title, parent
-        FROM headings
-        WHERE book_id = ? AND level < 10
-    ''', (book_id,))
-    parents = {r['para_id']: r for r in cursor.fetchall()}
-
-    def _ancestor_titles(pid, target_levels):
-        """Walk the parent chain, collecting the title of each target level."""
-        found = {}
-        seen = set()
-        while pid and pid not in seen and pid in parents:
-            seen.add(pid)
-            h = parents[pid]
-            if h['level'] in target_levels:
-                found[h['level']] = h['title'] or ''
-            pid = h['parent']
-        return found
-
+    index = get_book_headings(conn, book_id)
     out = []
-    for it in items:
-        titles = _ancestor_titles(it['parent'], (2, 4))
+    for para_id, _, title, parent in index.numbered_rows():
+        titles = index.ancestor_titles(parent, (2, 4))
         out.append({
-            'para_id':     it['para_id'],
-            'title':       it['title'] or '',
+            'para_id':     para_id,
+            'title':       title or '',
             'sutta_title': titles.get(4, ''),
             'vagga_title': titles.get(2, ''),
         })
@@ -1,44 +1,90 @@
 # app/utils/cache.py
-"""Small in-process TTL cache with an LRU-ish size cap.
+"""Small in-process TTL cache with an LRU-ish size cap, plus an optional
+process-shared tier.
 
 Used for expensive *read-only* results (rendered book pages, section
-sentences, search responses, …). One instance exists per gunicorn worker
-process, which is fine for a read-heavy Flask app; Cloudflare / nginx sit
-in front for cross-process caching.
+sentences, search responses, …). A ``TTLCache`` lives inside one gunicorn
+worker process. The hottest caches (book/index pages, sections, TOCs) are
+built with ``make_cache(..., shared=True)`` instead, which puts a
+``SharedCache`` behind the in-process tier: a WAL-mode SQLite file under
+DATA_DIR that every worker reads and writes, so one worker's render serves
+all the others (and survives a worker restart).
 
 Only values that are safe to reuse across requests may be stored here —
 never per-user data.
+
+Every cache built with a ``name`` registers itself so ``cache_stats()`` can
+report hit / miss / eviction counters per cache.
 """
+import os
+import pickle
+import sqlite3
 import threading
 import time
 
+from ..config import Config
+
+# name -> cache instance, for cache_stats()
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _register(name, cache):
+    if name:
+        with _REGISTRY_LOCK:
+            _REGISTRY[name] = cache
+
+
+def cache_stats():
+    """Hit / miss / eviction counters for every named cache in this worker.
+
+    Counters are per process (each gunicorn worker counts its own traffic);
+    the shared tier additionally reports its on-disk entry count and size.
+    """
+    with _REGISTRY_LOCK:
+        caches = list(_REGISTRY.items())
+    return {name: cache.stats() for name, cache in sorted(caches)}
+
+
+def _ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else 0.0
+
 
 class TTLCache:
     """Thread-safe cache: entries expire after ``ttl`` seconds; when the
     cache exceeds ``max_size`` the oldest-accessed entries are evicted.
     """
 
-    def __init__(self, max_size=128, ttl=300.0):
+    def __init__(self, max_size=128, ttl=300.0, name=None):
         self._max_size = max_size
         self._ttl = ttl
         # key -> (expires_at, value); dict order doubles as recency order
         # (get/set re-insert so the dict stays roughly LRU-ordered).
         self._data = {}
         self._lock = threading.Lock()
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _register(name, self)
 
     def get(self, key):
         now = time.monotonic()
         with self._lock:
             item = self._data.get(key)
             if item is None:
+                self.misses += 1
                 return None
             expires_at, value = item
             if now >= expires_at:
                 del self._data[key]
+                self.misses += 1
                 return None
             # Refresh recency (move to the end) on a hit.
             self._data.pop(key)
             self._data[key] = (expires_at, value)
+            self.hits += 1
             return value
 
     def set(self, key, value, ttl=None):
@@ -51,11 +97,294 @@ class TTLCache:
             if over > 0:
                 for stale in list(self._data.keys())[:over]:
                     del self._data[stale]
+                self.evictions += over
 
     def clear(self):
         with self._lock:
             self._data.clear()
 
+    def items(self):
+        """Snapshot of the live (unexpired) entries as (key, value) pairs."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (exp, v) in self._data.items() if now < exp]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend':   'local',
+                'entries':   len(self._data),
+                'max_size':  self._max_size,
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'evictions': self.evictions,
+                'hit_rate':  _ratio(self.hits, self.misses),
+            }
+
     def __len__(self):
         with self._lock:
             return len(self._data)
+
+
+# ── Process-shared tier ────────────────────────────────────────────────────
+# One SQLite file for all shared caches (rows are namespaced by cache name).
+# WAL lets every worker read while another writes; writes are tiny
+# (one row) and synchronous=NORMAL keeps them off the fsync path. The file
+# is a pure cache — deleting it at any time is safe.
+
+_SHARED_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        name        TEXT    NOT NULL,
+        key         TEXT    NOT NULL,
+        value       BLOB    NOT NULL,
+        size        INTEGER NOT NULL,
+        stored_at   REAL    NOT NULL,
+        expires_at  REAL    NOT NULL,
+        PRIMARY KEY (name, key)
+    )
+'''
+_SHARED_INDEX = ('CREATE INDEX IF NOT EXISTS idx_cache_entries_age '
+                 'ON cache_entries (name, stored_at)')
+
+_shared_local = threading.local()
+
+
+def _shared_conn(path):
+    """Per-thread connection to the shared cache file (re-opened after a
+    fork, so gunicorn's preloaded parent never hands its handle to a worker)."""
+    conns = getattr(_shared_local, 'conns', None)
+    if conns is None or getattr(_shared_local, 'pid', None) != os.getpid():
+        conns = _shared_local.conns = {}
+        _shared_local.pid = os.getpid()
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=2, isolation_level=None,
+                           check_same_thread=False)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA busy_timeout = 2000')
+    conn.execute(_SHARED_SCHEMA)
+    conn.execute(_SHARED_INDEX)
+    conns[path] = conn
+    return conn
+
+
+class SharedCache:
+    """Cross-worker cache stored in a WAL-mode SQLite file.
+
+    Keys are ``repr()``-ed (they are tuples of str/int/None everywhere in
+    this app) and values are pickled. The total pickled size per cache name
+    is bounded by ``max_bytes``; the oldest-written entries are evicted
+    first. Any SQLite error (locked file, read-only DATA_DIR, …) is treated
+    as a miss — the shared tier must never fail a request.
+    """
+
+    # Size check + expiry sweep runs every N writes per worker, not on every
+    # set — SUM(size) over a few thousand rows is cheap but not free.
+    _SWEEP_EVERY = 32
+
+    def __init__(self, name, max_bytes=64 * 1024 * 1024, ttl=300.0, path=None):
+        self.name = name
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._path = path  # resolved lazily so tests/CLIs can repoint Config
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._disabled = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _conn(self):
+        if self._disabled:
+            return None
+        path = self._path or Config.SHARED_CACHE_DB
+        try:
+            return _shared_conn(path)
+        except (sqlite3.Error, OSError) as e:
+            # DATA_DIR not writable — run as a plain per-worker cache.
+            print(f'[cache] shared cache disabled ({path}): {e}')
+            self._disabled = True
+            return None
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key):
+        conn = self._conn()
+        if conn is None:
+            self._count('misses')
+            return None
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM cache_entries WHERE name = ? AND key = ?',
+                (self.name, repr(key)),
+            ).fetchone()
+        except sqlite3.Error:
+            self._count('errors')
+            row = None
+        if row is None or row[1] <= time.time():
+            self._count('misses')
+            return None
+        try:
+            value = pickle.loads(row[0])
+        except Exception:
+            self._count('errors')
+            return None
+        self._count('hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return  # unpicklable values simply stay in the local tier
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self._ttl)
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries '
+                '(name, key, value, size, stored_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (self.name, repr(key), blob, len(blob), now, expires_at),
+            )
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self._SWEEP_EVERY == 0
+        if sweep:
+            self._sweep(conn, now)
+
+    def _sweep(self, conn, now):
+        """Drop expired rows, then the oldest rows until under max_bytes."""
+        try:
+            expired = conn.execute(
+                'DELETE FROM cache_entries WHERE name = ? AND expires_at <= ?',
+                (self.name, now),
+            ).rowcount
+            total = conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE name = ?',
+                (self.name,),
+            ).fetchone()[0]
+            evicted = 0
+            if total > self._max_bytes:
+                excess = total - self._max_bytes
+                freed = 0
+                stale = []
+                for key, size in conn.execute(
+                    'SELECT key, size FROM cache_entries WHERE name = ? ORDER BY stored_at',
+                    (self.name,),
+                ):
+                    stale.append((self.name, key))
+                    freed += size
+                    if freed >= excess:
+                        break
+                conn.executemany(
+                    'DELETE FROM cache_entries WHERE name = ? AND key = ?', stale)
+                evicted = len(stale)
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        with self._lock:
+            self.evictions += expired + evicted
+
+    def clear(self):
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            conn.execute('DELETE FROM cache_entries WHERE name = ?', (self.name,))
+        except sqlite3.Error:
+            self._count('errors')
+
+    def stats(self):
+        entries, size = 0, 0
+        conn = self._conn()
+        if conn is not None:
+            try:
+                entries, size = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE name = ?',
+                    (self.name,),
+                ).fetchone()
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            return {
+                'backend':   'sqlite' if not self._disabled else 'disabled',
+                'entries':   entries,
+                'bytes':     size,
+                'max_bytes': self._max_bytes,
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'evictions': self.evictions,
+                'errors':    self.errors,
+                'hit_rate':  _ratio(self.hits, self.misses),
+            }
+
+
+class TieredCache:
+    """``TTLCache`` in front of a ``SharedCache``, with the same get/set API.
+
+    Reads try the in-process tier first (no I/O, no unpickling), then the
+    shared file; a shared hit is copied into the local tier. Writes go to
+    both, so the next request in *any* worker is served without rendering.
+    """
+
+    def __init__(self, name, max_size=128, ttl=300.0, max_bytes=64 * 1024 * 1024):
+        self.name = name
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+        self.shared = SharedCache(name, max_bytes=max_bytes, ttl=ttl)
+        _register(name, self)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl=ttl)
+        self.shared.set(key, value, ttl=ttl)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        local = self.local.stats()
+        shared = self.shared.stats()
+        hits = local['hits'] + shared['hits']
+        return {
+            'backend':   'tiered',
+            'hits':      hits,
+            'misses':    shared['misses'],
+            'evictions': local['evictions'] + shared['evictions'],
+            'hit_rate':  _ratio(hits, shared['misses']),
+            'local':     local,
+            'shared':    shared,
+        }
+
+    def __len__(self):
+        return len(self.local)
+
+
+def make_cache(name, max_size=128, ttl=300.0, shared=False, max_bytes=64 * 1024 * 1024):
+    """Build a named cache.
+
+    ``shared=True`` adds the cross-worker SQLite tier, unless the deployment
+    opts out with ``CACHE_BACKEND=local`` (e.g. a read-only DATA_DIR).
+    """
+    if shared and Config.CACHE_BACKEND == 'sqlite':
+        return TieredCache(name, max_size=max_size, ttl=ttl, max_bytes=max_bytes)
+    return TTLCache(max_size=max_size, ttl=ttl, name=name)
@@ -0,0 +1,79 @@
+# app/utils/compress.py
+"""Pre-compressed response bodies for the page / JSON caches.
+
+A cached page used to be stored as its HTML string and compressed again by
+nginx / Cloudflare on every origin hit; cached JSON was re-serialised by
+``jsonify`` on every request. ``Precompressed`` holds a finished body
+compressed ONCE, as gzip and (when the optional ``brotli`` package is
+installed) brotli — smaller in the cache, and a hit is a byte copy:
+
+    body = Precompressed.from_text(html)
+    _PAGE_CACHE.set(key, body)
+    return body.to_response()          # br / gzip / identity per Accept-Encoding
+
+The uncompressed text is not kept; the rare client that accepts neither
+encoding gets the gzip variant inflated on the fly.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional — gzip only
+    brotli = None
+
+_GZIP_LEVEL = 9
+_BROTLI_QUALITY = 9
+
+
+class Precompressed:
+    """A response body stored as gzip (+ brotli) bytes. Picklable, so it can
+    live in the shared cache tier."""
+
+    __slots__ = ('mimetype', 'gzip', 'br', 'size')
+
+    def __init__(self, mimetype, gzip_body, br_body, size):
+        self.mimetype = mimetype
+        self.gzip = gzip_body
+        self.br = br_body
+        self.size = size
+
+    def __getstate__(self):
+        return (self.mimetype, self.gzip, self.br, self.size)
+
+    def __setstate__(self, state):
+        self.mimetype, self.gzip, self.br, self.size = state
+
+    @classmethod
+    def from_bytes(cls, data, mimetype):
+        return cls(
+            mimetype,
+            gzip.compress(data, _GZIP_LEVEL, mtime=0),
+            brotli.compress(data, quality=_BROTLI_QUALITY) if brotli else None,
+            len(data),
+        )
+
+    @classmethod
+    def from_text(cls, text, mimetype='text/html'):
+        return cls.from_bytes(text.encode('utf-8'), mimetype)
+
+    @classmethod
+    def from_response(cls, response):
+        """Capture a finished (non-streamed) response, e.g. jsonify(...)."""
+        return cls.from_bytes(response.get_data(), response.mimetype)
+
+    def to_response(self):
+        """Response in the best encoding the client accepts."""
+        accept = request.accept_encodings
+        if self.br is not None and accept['br']:
+            body, encoding = self.br, 'br'
+        elif accept['gzip']:
+            body, encoding = self.gzip, 'gzip'
+        else:
+            body, encoding = gzip.decompress(self.gzip), None
+        response = current_app.response_class(body, mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
@@ -1,17 +1,20 @@
 # app/utils/db.py
+import json
 import os
 import sqlite3
 import threading
+import time
 import unicodedata
 from contextlib import contextmanager
 
-from flask import current_app, g
+from flask import current_app, g, has_request_context
 
 from ..config import Config
 
 
 # ── Connection tuning ──────────────────────────────────────────────────────
-# Applied once when a connection is created (per-request, per-thread).
+# Applied once when a connection is created (pooled per-thread, or per-request
+# for writers).
 def _configure(conn, *, writable=False):
     """Apply performance pragmas for a read-heavy workload."""
     try:
@@ -25,20 +28,75 @@ def _configure(conn, *, writable=False):
         pass  # pragmas are best-effort
 
 
+# ── Read-only connection pool ──────────────────────────────────────────────
+# Readers keep one long-lived connection per thread per database file, so the
+# 32 MB page cache and the mmap survive across requests. A connection is
+# re-opened when the file behind its path changes identity (a deploy swaps in
+# a new file → new inode) or, for immutable connections, when the file is
+# modified in place. Forked workers never inherit a parent's connection.
+
+_pool_local = threading.local()
+
+
+def _file_identity(path, *, strict):
+    """Identity of a database file: (dev, inode), plus mtime/size when
+    ``strict`` (immutable connections can't see in-place writes)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if strict:
+        return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+    return (st.st_dev, st.st_ino)
+
+
+def _pooled_conn(path, *, immutable=False):
+    """Per-thread read-only connection to ``path`` (None if it doesn't exist)."""
+    # A WAL-mode file may have committed pages only in its -wal, which an
+    # immutable connection would never read.
+    if immutable and os.path.exists(path + '-wal'):
+        immutable = False
+    ident = _file_identity(path, strict=immutable)
+    if ident is None:
+        return None
+    pid = os.getpid()
+    pool = getattr(_pool_local, 'conns', None)
+    if pool is None or getattr(_pool_local, 'pid', None) != pid:
+        pool = _pool_local.conns = {}
+        _pool_local.pid = pid
+    entry = pool.get(path)
+    if entry is not None:
+        conn, cached_ident = entry
+        if cached_ident == ident:
+            return conn
+        conn.close()
+    uri = f'file:{path}?mode=ro' + ('&immutable=1' if immutable else '')
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    _configure(conn)
+    pool[path] = (conn, ident)
+    return conn
+
+
 # ── Epitaka database (Pāli text, books, headings — shared with mobile) ────
 
 @contextmanager
-def get_db():
+def get_db(writable=False):
     """Connect to epitaka.db (Pāli text, books, headings, pali_definition, book_links).
 
-    One connection per request, cached on Flask's ``g``, closed by
-    ``teardown_db`` at the end of the request.
+    Readers get the thread's pooled read-only connection (see
+    ``_pooled_conn``); it is NOT closed at the end of the request. Pass
+    ``writable=True`` for index builds and other writes — that connection is
+    cached on Flask's ``g`` and closed by ``teardown_db``.
     """
-    if not hasattr(g, 'db') or g.db is None:
-        g.db = sqlite3.connect(current_app.config['DATABASE'])
-        g.db.row_factory = sqlite3.Row
-        _configure(g.db)
-    yield g.db
+    if writable:
+        if getattr(g, 'db_rw', None) is None:
+            g.db_rw = sqlite3.connect(current_app.config['DATABASE'])
+            g.db_rw.row_factory = sqlite3.Row
+            _configure(g.db_rw)
+        yield g.db_rw
+        return
+    yield _pooled_conn(current_app.config['DATABASE'], immutable=Config.DB_IMMUTABLE)
 
 
 # ── DPD dictionary database ────────────────────────────────────────────────
@@ -85,27 +143,113 @@ def get_webdata_db():
     yield g.webdata_db
 
 
+# ── Search index generations ───────────────────────────────────────────────
+# `flask rebuild fts` builds the FTS tables into a new file beside webdata.db
+# (webdata_fts_g<N>.db) and then flips a pointer in webdata.db's index_meta:
+#   fts_file        file name of the live generation
+#   fts_generation  token every search cache key includes
+# Workers re-read the pointer every few seconds and move to the new file
+# without a restart; old generations are deleted by the next build. Before
+# the first generation build the tables live in webdata.db itself.
+
+_FTS_POINTER_TTL = 5.0
+_fts_pointer = {'checked': None, 'value': ('', None)}
+_fts_pointer_lock = threading.Lock()
+
+
+def fts_generation_path(name):
+    """Absolute path of a generation file named in index_meta."""
+    return os.path.join(os.path.dirname(Config.WEBDATA_DB), name)
+
+
+def _read_fts_pointer():
+    conn = _pooled_conn(Config.WEBDATA_DB)
+    if conn is None:
+        return '', None
+    try:
+        meta = dict(conn.execute(
+            "SELECT key, value FROM index_meta WHERE key IN ('fts_generation', 'fts_file')"
+        ).fetchall())
+    except sqlite3.Error:
+        return '', None  # index built before index_meta existed
+    name = meta.get('fts_file')
+    return meta.get('fts_generation') or '', fts_generation_path(name) if name else None
+
+
+def fts_pointer():
+    """(generation token, generation file path or None) of the live search
+    index. Fixed for the duration of a request, so cached rowids and the
+    file they are looked up in always belong to the same generation."""
+    if has_request_context() and 'fts_pointer' in g:
+        return g.fts_pointer
+    now = time.monotonic()
+    with _fts_pointer_lock:
+        checked = _fts_pointer['checked']
+        if checked is not None and now - checked < _FTS_POINTER_TTL:
+            value = _fts_pointer['value']
+        else:
+            value = None
+    if value is None:
+        value = _read_fts_pointer()
+        with _fts_pointer_lock:
+            _fts_pointer.update(checked=now, value=value)
+    if has_request_context():
+        g.fts_pointer = value
+    return value
+
+
+def index_generation():
+    """Token of the live search index (part of every search cache key)."""
+    return fts_pointer()[0]
+
+
+@contextmanager
+def get_search_db():
+    """
+    Pooled read-only connection holding the live FTS tables (paragraphs_fts,
+    lines_fts, paragraphs_trigram): the current generation file, or
+    webdata.db for an index built before generations existed.
+    """
+    _, path = fts_pointer()
+    conn = _pooled_conn(path) if path else None
+    if conn is None:
+        path = Config.WEBDATA_DB
+        conn = _pooled_conn(path)
+    # Close this thread's connection to the previous generation.
+    previous = getattr(_pool_local, 'search_path', None)
+    if previous and previous not in (path, Config.WEBDATA_DB):
+        entry = getattr(_pool_local, 'conns', {}).pop(previous, None)
+        if entry is not None:
+            entry[0].close()
+    _pool_local.search_path = path
+    yield conn
+
+
 # ── Translation databases ──────────────────────────────────────────────────
 
-def get_translation_db(lang_code):
+def get_translation_db(lang_code, writable=False):
     """
     Connect to epitaka_{lang_code}.db (translation database).
     Falls back to _epitaka_{lang_code}.db if the standard name is not found.
-    Returns a flask-g-managed connection or None if not found.
+    Returns None if not found.
+
+    Readers get the thread's pooled read-only connection (never immutable —
+    the editor console writes to these files while the app is serving).
+    ``writable=True`` returns a flask-g-managed WAL connection for the editor.
     """
+    if not writable:
+        db_path = get_translation_db_path(lang_code)
+        return _pooled_conn(db_path) if db_path else None
+
     cache_key = f'trans_db_{lang_code}'
     # Flask g doesn't support item assignment in Python 3.14+ — use getattr/setattr
     cached = getattr(g, cache_key, None)
     if cached is not None:
         return cached
 
-    db_path = os.path.join(Config.DATA_DIR, f'epitaka_{lang_code}.db')
-    if not os.path.isfile(db_path):
-        # Try underscore-prefixed variant (temporary rename to avoid conflicts)
-        db_path = os.path.join(Config.DATA_DIR, f'_epitaka_{lang_code}.db')
-        if not os.path.isfile(db_path):
-            setattr(g, cache_key, None)
-            return None
+    db_path = get_translation_db_path(lang_code)
+    if not db_path:
+        return None
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
@@ -114,6 +258,36 @@ def get_translation_db(lang_code):
     return conn
 
 
+# ── Sentence lines by key ─────────────────────────────────────────────────
+# Keys are passed as one JSON array and joined through json_each() — unlike
+# an `OR (book_id = ? AND para_id = ?)` chain this stays an index lookup per
+# key at hundreds of keys, and needs a single bound parameter.
+
+_LINES_BY_KEY_SQL = '''
+    SELECT s.book_id, s.para_id, s.line_id, s.{col}
+    FROM json_each(?) AS k
+    CROSS JOIN sentences s
+      ON  s.book_id = json_extract(k.value, '$[0]')
+      AND s.para_id = json_extract(k.value, '$[1]')
+      AND s.line_id = json_extract(k.value, '$[2]')
+'''
+
+
+def lines_by_key(conn, keys, column='pali'):
+    """
+    Rows (book_id, para_id, line_id, <column>) of the `sentences` lines named
+    by ``keys`` — (book_id, para_id, line_id) triples — in epitaka.db
+    (column 'pali') or a translation DB (column 'translation'). Unordered;
+    keys without a row are skipped.
+    """
+    if column not in ('pali', 'translation'):
+        raise ValueError(f'unknown sentences column: {column!r}')
+    if not keys:
+        return []
+    return conn.execute(_LINES_BY_KEY_SQL.format(col=column),
+                        (json.dumps([list(k) for k in keys]),))
+
+
 # ── Translation discovery ─────────────────────────────────────────────────
 
 def get_available_translations():
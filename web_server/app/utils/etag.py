@@ -0,0 +1,98 @@
+# app/utils/etag.py
+"""Conditional GET (ETag / Last-Modified) for the public read-only endpoints.
+
+Every cacheable response is a pure function of the request URL, the source
+databases and the deployed code. ``content_generation()`` folds all of those
+into one token:
+
+  - mtime of epitaka.db, dpd-dictionary.db and every translation DB
+    (including a non-empty -wal — editor fixes land there first)
+  - the search-index generation stamped into webdata.db by `flask rebuild`
+    (webdata.db's own mtime moves with every comment / bookmark, so it is
+    not used)
+  - the asset version and the newest mtime of the app code and templates
+
+The token is re-derived at most every few seconds (a handful of stat()
+calls). A request's ETag is a hash of token + URL, so a revalidation is
+answered with 304 before the view touches any database.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from flask import request
+
+from ..config import Config
+from .assets import get_asset_version
+from .db import index_generation
+
+_TOKEN_TTL = 5.0
+_token = {'at': 0.0, 'value': '', 'mtime': 0.0}
+_token_lock = threading.Lock()
+
+# app/utils/etag.py → app/utils → app → web_server/
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _code_mtime():
+    """Newest mtime of the app code and templates (computed once per process;
+    a deploy restarts the workers)."""
+    latest = 0.0
+    for top in (os.path.join(_ROOT, 'app'), os.path.join(_ROOT, 'templates')):
+        for root, _, files in os.walk(top):
+            for name in files:
+                if name.endswith(('.py', '.html', '.txt', '.xml', '.json')):
+                    try:
+                        latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+                    except OSError:
+                        pass
+    return latest
+
+
+_CODE_MTIME = _code_mtime()
+
+
+def _db_mtime(path):
+    """mtime of a SQLite file, or of its -wal when that holds newer writes."""
+    if not path:
+        return 0.0
+    try:
+        latest = os.path.getmtime(path)
+    except OSError:
+        return 0.0
+    try:
+        wal = os.stat(path + '-wal')
+        if wal.st_size > 0:
+            latest = max(latest, wal.st_mtime)
+    except OSError:
+        pass
+    return latest
+
+
+def content_generation():
+    """(token, last_modified) describing every input of a cacheable response."""
+    now = time.monotonic()
+    with _token_lock:
+        if _token['value'] and now - _token['at'] < _TOKEN_TTL:
+            return _token['value'], _token['mtime']
+
+    mtimes = [_db_mtime(Config.DATABASE), _db_mtime(Config.DPD_DICTIONARY_DB)]
+    for fname in sorted(v['filename'] for info in Config.detect_translations().values()
+                        for v in info['versions']):
+        mtimes.append(_db_mtime(os.path.join(Config.DATA_DIR, fname)))
+    parts = [repr(m) for m in mtimes]
+    parts += [index_generation(), get_asset_version(), repr(_CODE_MTIME)]
+    value = hashlib.blake2b('|'.join(parts).encode(), digest_size=12).hexdigest()
+    last_modified = max(mtimes + [_CODE_MTIME])
+
+    with _token_lock:
+        _token.update(at=now, value=value, mtime=last_modified)
+    return value, last_modified
+
+
+def request_etag():
+    """(strong ETag value, last_modified) for the current request URL."""
+    token, last_modified = content_generation()
+    url = request.full_path.encode('utf-8', 'surrogateescape')
+    return hashlib.blake2b(url, digest_size=12, key=token.encode()).hexdigest(), last_modified
@@ -2,31 +2,48 @@
 """
 Builds / rebuilds the search-related tables in webdata.db:
   - paragraphs_fts  (FTS5 virtual table — paragraph level, newline-separated)
+  - paragraphs_trigram (FTS5 trigram index over diacritic-stripped paragraphs,
+                       answers the substring fallback search)
+  - lines_fts       (FTS5, one row per line — matched lines of a paragraph hit)
+  - headings_fts    (FTS5 over heading titles, 2–4 letter prefix indexes)
   - words           (frequency + plain-form index)
-  - pali_definition (bold-marked Pali terms with ending, stem, plain)
-  - book_links      (cross-references between mula↔attha/tika and attha↔tika)
+  - ref_links       (numbered paragraph → same number in related books, webdata.db)
+  - stem_usages / stem_usage_lines (usage concordance of pali_definition, webdata.db)
+  - bold_definitions (pali_definition in book order per plain form, webdata.db)
 
 Flask CLI usage (register once in create_app):
-    flask rebuild fts          # drop + recreate + populate paragraphs_fts & words
-    flask rebuild words        # drop + recreate + populate words only
-    flask rebuild palidef      # drop + recreate + populate pali_definition
-    flask rebuild booklink     # drop + recreate + populate book_links
-    flask rebuild all          # run all four in sequence
+    flask rebuild fts          # build paragraphs_fts, lines_fts, paragraphs_trigram, headings_fts & words, swap in
+    flask rebuild fts --incremental   # re-index only paragraphs changed since (cron-safe)
+    flask rebuild words        # build words only, swap in
+    flask rebuild headings     # rebuild headings_fts in the live index only
+    flask rebuild reflinks     # drop + recreate + populate ref_links
+    flask rebuild concordance  # stem → usages concordance (after a new pali_definition)
+    flask rebuild definitions  # bold_definitions (after a new pali_definition)
+    flask rebuild sections     # pre-render every section into section_store.db
 
     flask cleanup              # drop all tables and VACUUM the database
 
 Or call each function directly from Python.
 """
 
+import multiprocessing
+import os
 import re
+import sqlite3
+import time
 import unicodedata
-from collections import defaultdict
+from collections import deque
+from contextlib import contextmanager
+from itertools import groupby
 from typing import List, Optional, Set, Tuple
 
 import click
 from flask import Flask
 
-from ..utils.db import get_db
+from ..config import Config
+from ..utils.db import (_configure, _read_fts_pointer, fts_generation_path,
+                        get_db, get_webdata_db)
+from ..utils.text import normalize_pali
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -244,203 +261,939 @@ PATTERN_BOLD = re.compile(
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Per-table: drop → create → populate
+# Substring (trigram) index
 # ─────────────────────────────────────────────────────────────────────────────
+# SQLite 3.40 has no `trigram remove_diacritics`, so the text is stored
+# already stripped + lowercased and the search side strips its query words
+# the same way (normalize_pali().lower()).
 
-def rebuild_fts(batch_size: int = 5000) -> None:
+def trigram_text(paragraph_text: str) -> str:
+    """Paragraph text as stored in paragraphs_trigram."""
+    return normalize_pali(paragraph_text or "").lower()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Line-level index
+# ─────────────────────────────────────────────────────────────────────────────
+# One row per sentence line; rowid = paragraphs_fts.rowid * LINE_ROWID_STRIDE
+# + line position, so the search route finds the matched lines of a
+# paragraph hit with a single rowid-range MATCH (see routes/fts_search.py).
+
+LINE_ROWID_STRIDE = 1 << 16
+
+
+def create_lines_table(conn) -> None:
+    print("  → Creating lines_fts (line level, keyed by paragraph rowid)...")
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+            book_id              UNINDEXED,
+            para_id              UNINDEXED,
+            line_id              UNINDEXED,
+            line_text,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+
+
+def stamp_fts_generation(conn) -> None:
+    """Record a new index generation in index_meta. The search route keys
+    its caches on it, so cached hits / responses of the old index expire."""
+    conn.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute(
+        "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('fts_generation', ?)",
+        (repr(time.time()),),
+    )
+
+
+def create_trigram_table(conn) -> None:
+    print("  → Creating paragraphs_trigram (substring index, diacritics stripped)...")
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS paragraphs_trigram USING fts5(
+            book_id              UNINDEXED,
+            para_id              UNINDEXED,
+            plain_text,
+            tokenize = 'trigram'
+        )
+    """)
+
+
+def create_paragraphs_table(conn) -> None:
+    print("  → Creating paragraphs_fts (paragraph level, newline-separated lines)...")
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS paragraphs_fts USING fts5(
+            book_id              UNINDEXED,
+            para_id              UNINDEXED,
+            paragraph_text,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+
+
+def create_headings_table(conn) -> None:
+    print("  → Creating headings_fts (heading titles, 2–4 letter prefix indexes)...")
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS headings_fts USING fts5(
+            book_id              UNINDEXED,
+            para_id              UNINDEXED,
+            level                UNINDEXED,
+            title,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )
+    """)
+
+
+def _fill_headings_table(conn) -> int:
+    """Copy every titled heading from epitaka.db into headings_fts.
+
+    Rows are inserted ranked — heading level, then book order, then para_id
+    — so rowid order is result order and a prefix search can stop after
+    LIMIT hits instead of sorting every match.
     """
-    Drop, recreate, and populate:
-      - paragraphs_fts  (paragraph level — newline-separated lines)
-      - words
+    source = sqlite3.connect(f"file:{Config.DATABASE}?mode=ro", uri=True)
+    try:
+        rows = source.execute("""
+            SELECT h.book_id, h.para_id, h.level, h.title
+            FROM headings h
+            LEFT JOIN books b ON b.book_id = h.book_id
+            WHERE h.title IS NOT NULL AND h.title != ''
+            ORDER BY h.level IS NULL, h.level, b.id IS NULL, b.id, h.book_id, h.para_id
+        """).fetchall()
+    finally:
+        source.close()
+    conn.executemany(
+        "INSERT INTO headings_fts (book_id, para_id, level, title) VALUES (?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def create_rowid_map_table(conn) -> None:
+    """(book_id, para_id) → paragraphs_fts rowid (UNINDEXED columns cannot be
+    looked up without a scan); the incremental updater finds rows by it."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fts_paragraphs (
+            book_id     TEXT    NOT NULL,
+            para_id     INTEGER NOT NULL,
+            fts_rowid   INTEGER NOT NULL,
+            PRIMARY KEY (book_id, para_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def create_words_table(conn) -> None:
+    print("  → Creating words...")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS words (
+            word        TEXT COLLATE NOCASE NOT NULL,
+            plain       TEXT COLLATE NOCASE,
+            frequency   INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (word)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_words_plain ON words (plain)")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Search-index build engine
+# ─────────────────────────────────────────────────────────────────────────────
+# One engine behind `flask rebuild fts` / `flask rebuild words` and
+# scripts/rebuild_fts.py:
+#
+#   1. sentences are streamed from epitaka.db with a cursor (never fetchall)
+#      and cut into chunks of whole paragraphs;
+#   2. a process pool tokenises the chunks (paragraph / line / trigram text
+#      and per-chunk word counts); the parent assigns rowids in order;
+#   3. rows are bulk-inserted with executemany into a NEW generation file
+#      (webdata_fts_g<N>.db beside webdata.db) opened with
+#      journal_mode=OFF / synchronous=OFF — the live index is not touched;
+#   4. the finished generation is published by flipping the fts_file pointer
+#      in webdata.db's index_meta (one tiny transaction); workers move to it
+#      within a few seconds (utils/db.py get_search_db) and generations older
+#      than the previous one are deleted. words is swapped into epitaka.db
+#      in one transaction.
+
+FTS_TABLES = ("paragraphs_fts", "lines_fts", "paragraphs_trigram", "headings_fts")
+_LEGACY_FTS_TABLES = ("passages_fts", "sentences_fts_v2", "sentences_fts")
+_GENERATION_FILE_RE = re.compile(r"^webdata_fts_g(\d+)\.db$")
+
+_WORD_STRIP = '.,!?;:"()[]{}#*'
+
+
+def _open_scratch_db(path: str) -> sqlite3.Connection:
+    """A throw-away build file: no journal, no fsync, exclusive lock."""
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")   # 256 MB
+    return conn
+
+
+def _paragraph_chunks(cursor, chunk_size: int):
+    """Group the (book_id, para_id, line_id, pali) stream into lists of
+    chunk_size paragraphs: [(book_id, para_id, [(line_id, pali), ...]), ...]."""
+    chunk = []
+    for (book_id, para_id), rows in groupby(cursor, key=lambda r: (r[0], r[1])):
+        chunk.append((book_id, para_id, [(r[2], r[3]) for r in rows]))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _tokenise_chunk(chunk, with_fts: bool = True):
     """
-    print("=== Rebuilding: paragraphs_fts + words ===")
-
-    # ── Drop old tables ───────────────────────────────────────────────────────
-    with get_db() as conn:
-        print("  → Dropping old tables...")
-        conn.execute("DROP TABLE IF EXISTS passages_fts")
-        conn.execute("DROP TABLE IF EXISTS sentences_fts_v2")
-        conn.execute("DROP TABLE IF EXISTS sentences_fts")
-        conn.execute("DROP TABLE IF EXISTS paragraphs_fts")
-        conn.execute("DROP TABLE IF EXISTS words")
-        conn.commit()
+    Pool worker: index rows + word counts for one chunk of paragraphs.
 
-    # ── Create tables ─────────────────────────────────────────────────────────
-    with get_db() as conn:
-        print("  → Creating paragraphs_fts (paragraph level, newline-separated lines)...")
-        conn.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS paragraphs_fts USING fts5(
-                book_id              UNINDEXED,
-                para_id              UNINDEXED,
-                paragraph_text,
-                tokenize = 'unicode61 remove_diacritics 2'
-            )
-        """)
-
-        print("  → Creating words...")
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS words (
-                word        TEXT COLLATE NOCASE NOT NULL,
-                plain       TEXT COLLATE NOCASE,
-                frequency   INTEGER NOT NULL DEFAULT 0,
-                PRIMARY KEY (word)
-            )
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_words_plain ON words (plain)")
-        conn.commit()
+    Returns (paragraphs, words, line_count):
+      paragraphs  [(book_id, para_id, [line_id, ...], [line_text, ...],
+                    paragraph_text, trigram_text)]   (empty when not with_fts)
+      words       {word: [plain, frequency]}
+    """
+    paragraphs = []
+    words: dict = {}
+    line_count = 0
+    for book_id, para_id, lines in chunk:
+        line_count += len(lines)
+        texts = [(pali or '').replace('*', '') for _, pali in lines]
+        for text in texts:
+            for w in text.split():
+                w = w.strip(_WORD_STRIP).lower()
+                if not w:
+                    continue
+                entry = words.get(w)
+                if entry is None:
+                    words[w] = [strip_diacritics(w), 1]
+                else:
+                    entry[1] += 1
+        if with_fts:
+            para_text = '\n'.join(texts)
+            paragraphs.append((book_id, para_id, [line_id for line_id, _ in lines],
+                               texts, para_text, trigram_text(para_text)))
+    return paragraphs, words, line_count
+
+
+class _Throughput:
+    """rows/s progress lines for the long-running builds."""
+
+    def __init__(self, every: int):
+        self.every = every
+        self.started = time.monotonic()
+        self.rows = 0
+        self._next = every
+
+    def add(self, rows: int, label: str) -> None:
+        self.rows += rows
+        if self.rows >= self._next:
+            self._next += self.every
+            print(f"     {self.rows:,} {label} ({self.rate():,.0f} rows/s)")
+
+    def rate(self) -> float:
+        return self.rows / max(time.monotonic() - self.started, 1e-6)
+
+
+def build_search_index(
+    with_fts: bool = True,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    batch_size: int = 5000,
+) -> dict:
+    """
+    Build paragraphs_fts / lines_fts / paragraphs_trigram / headings_fts into
+    a new index generation and words (epitaka.db) from the sentences table, then
+    publish them.
 
-    # ── Query source data ─────────────────────────────────────────────────────
+    with_fts=False rebuilds words only. Returns counts and timings.
+    """
+    scratch = generation_name = None
+    if with_fts:
+        generation_name = f"webdata_fts_g{_next_generation_number()}.db"
+        print(f"  → Building generation {generation_name}...")
+        scratch = _open_scratch_db(fts_generation_path(generation_name))
+        create_paragraphs_table(scratch)
+        create_lines_table(scratch)
+        create_trigram_table(scratch)
+        create_headings_table(scratch)
+        create_rowid_map_table(scratch)
+
+    # Changes logged after this point are re-applied by update_search_index()
+    # (re-indexing a paragraph is idempotent, so overlap is harmless).
+    with get_db(writable=True) as conn:
+        install_change_tracking(conn)
+        changelog_seq = _changelog_head(conn)
+
+    source = sqlite3.connect(f"file:{Config.DATABASE}?mode=ro", uri=True)
+    cursor = source.execute("""
+        SELECT book_id, para_id, line_id, pali
+        FROM sentences
+        ORDER BY book_id, para_id, line_id
+    """)
+    cursor.arraysize = batch_size
+
+    workers = workers or os.cpu_count() or 1
+    print(f"  → Streaming sentences, tokenising on {workers} process(es)...")
+    progress = _Throughput(every=max(batch_size * 20, 1))
+    word_data: dict = {}
+    map_rows = []
+    para_rowid = 0
+
+    def store(result) -> None:
+        nonlocal para_rowid
+        paragraphs, words, line_count = result
+        para_rows, line_rows, trigram_rows = [], [], []
+        for book_id, para_id, line_ids, texts, para_text, plain_text in paragraphs:
+            # Explicit rowids: lines_fts rowids are derived from them.
+            para_rowid += 1
+            para_rows.append((para_rowid, book_id, para_id, para_text))
+            map_rows.append((book_id, para_id, para_rowid))
+            line_rows.extend(
+                (para_rowid * LINE_ROWID_STRIDE + pos, book_id, para_id, line_id, text)
+                for pos, (line_id, text) in enumerate(zip(line_ids, texts)))
+            trigram_rows.append((para_rowid, book_id, para_id, plain_text))
+        if scratch is not None:
+            scratch.executemany(
+                "INSERT INTO paragraphs_fts (rowid, book_id, para_id, paragraph_text) VALUES (?, ?, ?, ?)",
+                para_rows)
+            scratch.executemany(
+                "INSERT INTO lines_fts (rowid, book_id, para_id, line_id, line_text) VALUES (?, ?, ?, ?, ?)",
+                line_rows)
+            scratch.executemany(
+                "INSERT INTO paragraphs_trigram (rowid, book_id, para_id, plain_text) VALUES (?, ?, ?, ?)",
+                trigram_rows)
+            scratch.executemany("INSERT INTO fts_paragraphs VALUES (?, ?, ?)", map_rows)
+            map_rows.clear()
+        for w, (plain, freq) in words.items():
+            entry = word_data.get(w)
+            if entry is None:
+                word_data[w] = [plain, freq]
+            else:
+                entry[1] += freq
+        progress.add(line_count, "lines")
+
+    chunks = _paragraph_chunks(cursor, chunk_size)
+    if scratch is not None:
+        scratch.execute("BEGIN")
+    if workers <= 1:
+        for chunk in chunks:
+            store(_tokenise_chunk(chunk, with_fts))
+    else:
+        # apply_async in order with a bounded window: rowids stay in
+        # (book_id, para_id) order and at most 2×workers chunks are in memory.
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_tokenise_chunk, (chunk, with_fts)))
+                if len(pending) >= workers * 2:
+                    store(pending.popleft().get())
+            while pending:
+                store(pending.popleft().get())
+    source.close()
+
+    if scratch is not None:
+        print(f"  → {_fill_headings_table(scratch):,} headings indexed.")
+        scratch.commit()
+        print("  → Merging FTS segments (optimize)...")
+        for table in FTS_TABLES:
+            scratch.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+        _set_meta(scratch, "fts_changelog_seq", changelog_seq)
+        scratch.commit()
+        scratch.close()
+    build_secs = time.monotonic() - progress.started
+
+    if generation_name:
+        _publish_generation(generation_name)
+    print(f"  → Swapping in {len(word_data):,} words...")
+    _swap_words_table([(w, plain, freq) for w, (plain, freq) in word_data.items()],
+                      changelog_seq, batch_size)
+
+    stats = {
+        "paragraphs": para_rowid,
+        "lines": progress.rows,
+        "words": len(word_data),
+        "seconds": round(time.monotonic() - progress.started, 1),
+        "rows_per_sec": round(progress.rows / max(build_secs, 1e-6)),
+    }
+    print(f"  → {stats['lines']:,} rows in {build_secs:,.1f}s "
+          f"({stats['rows_per_sec']:,} rows/s), {stats['paragraphs']:,} paragraphs, "
+          f"{stats['words']:,} words.")
+    return stats
+
+
+def _next_generation_number() -> int:
+    numbers = [int(m.group(1)) for m in map(_GENERATION_FILE_RE.match,
+                                            os.listdir(os.path.dirname(Config.WEBDATA_DB))) if m]
+    return max(numbers, default=0) + 1
+
+
+def _publish_generation(name: str) -> None:
+    """Point webdata.db at generation `name` and delete old generations."""
+    # The finished file is opened by many readers: switch it to WAL so the
+    # incremental updater can write while they read.
+    conn = sqlite3.connect(fts_generation_path(name))
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    with get_webdata_db() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # FTS tables of an index built before generations (one-off).
+            for table in _LEGACY_FTS_TABLES + FTS_TABLES + ("fts_paragraphs",):
+                conn.execute(f"DROP TABLE IF EXISTS main.{table}")
+            _set_meta(conn, "fts_file", name)
+            conn.execute("DELETE FROM index_meta WHERE key = 'fts_changelog_seq'")
+            stamp_fts_generation(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    print(f"  → Published {name}.")
+
+    # Keep the previous generation: a worker may still be on it for up to
+    # the pointer TTL. Open connections survive the unlink in any case.
+    current = int(_GENERATION_FILE_RE.match(name).group(1))
+    folder = os.path.dirname(Config.WEBDATA_DB)
+    for fname in os.listdir(folder):
+        m = _GENERATION_FILE_RE.match(fname)
+        if m and int(m.group(1)) < current - 1:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(os.path.join(folder, fname + suffix))
+                except OSError:
+                    pass
+            print(f"  → Removed old generation {fname}.")
+
+
+def _swap_words_table(rows, changelog_seq: int, batch_size: int = 5000) -> None:
+    """Replace epitaka.db's words table in one transaction; it reflects the
+    sentences as of changelog_seq (word deltas up to it are not re-applied)."""
+    with get_db(writable=True) as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP TABLE IF EXISTS main.words")
+            create_words_table(conn)
+            for i in range(0, len(rows), batch_size):
+                conn.executemany("INSERT INTO words (word, plain, frequency) VALUES (?, ?, ?)",
+                                 rows[i:i + batch_size])
+            _set_meta(conn, "words_changelog_seq", changelog_seq)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+@contextmanager
+def _fts_connection():
+    """Writable connection to the live FTS tables: the current generation
+    file, or webdata.db for an index built before generations."""
+    _, path = _read_fts_pointer()
+    if path is None:
+        with get_webdata_db() as conn:
+            yield conn
+        return
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    _configure(conn, writable=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
 
-    print("  → Querying individual sentences (ordered)...")
-    with get_db() as conn:
-        sent_rows = conn.execute("""
-            SELECT book_id, para_id, line_id, pali
-            FROM sentences
-            ORDER BY book_id, para_id, line_id
-        """).fetchall()
-    print(f"  → {len(sent_rows):,} individual lines found.")
-
-    # Group into paragraphs
-    print("  → Building paragraphs (grouping lines by book_id, para_id)...")
-    paragraph_map = {}
-    for row in sent_rows:
-        key = (row['book_id'], row['para_id'])
-        if key not in paragraph_map:
-            paragraph_map[key] = []
-        paragraph_map[key].append({
-            'line_id': row['line_id'],
-            'pali': row['pali'],
-        })
-    print(f"  → {len(paragraph_map):,} paragraphs built.")
-
-    # ── Word extraction (from paragraphs) ────────────────────────────────────
-    word_data: dict = defaultdict(lambda: {"plain": "", "freq": 0})
-    for key, lines in paragraph_map.items():
-        for line in lines:
-            pali_para = (line['pali'] or '').replace('*', '')
-            for w in pali_para.split():
-                w = w.strip('.,!?;:"()[]{}#*').lower()
-                if w:
-                    if not word_data[w]["plain"]:
-                        word_data[w]["plain"] = strip_diacritics(w)
-                    word_data[w]["freq"] += 1
-    print(f"  → {len(word_data):,} unique words extracted.")
-
-    # ── Insert into paragraphs_fts ───────────────────────────────────────────
-    print("  → Inserting into paragraphs_fts (paragraph level)...")
-    with get_db() as conn:
-        inserted = 0
-        for (book_id, para_id), lines in paragraph_map.items():
-            para_text_parts = []
-            for line in lines:
-                pali = (line['pali'] or '').replace('*', '')
-                para_text_parts.append(pali)
-            para_text = '\n'.join(para_text_parts)
-
-            conn.execute(
-                "INSERT INTO paragraphs_fts (book_id, para_id, paragraph_text) VALUES (?, ?, ?)",
-                (book_id, para_id, para_text),
-            )
-            inserted += 1
-            if inserted % batch_size == 0:
-                conn.commit()
-                print(f"     {inserted:,}/{len(paragraph_map):,} paragraph FTS rows committed.")
-        conn.commit()
-    print(f"  → paragraphs_fts populated ({inserted:,} rows).")
 
-    # ── Insert into words ─────────────────────────────────────────────────────
-    print("  → Inserting into words...")
-    with get_db() as conn:
-        cursor = conn.cursor()
-        buffer = []
-        for word, data in word_data.items():
-            buffer.append((word, data["plain"], data["freq"]))
-            if len(buffer) >= batch_size:
-                cursor.executemany(
-                    "INSERT OR REPLACE INTO words (word, plain, frequency) VALUES (?, ?, ?)",
-                    buffer,
+# ─────────────────────────────────────────────────────────────────────────────
+# Incremental maintenance (sentences change tracking)
+# ─────────────────────────────────────────────────────────────────────────────
+# Triggers on epitaka.db's sentences append the (book_id, para_id) of every
+# inserted / updated / deleted line to sentences_changes. index_meta of the
+# live index (its generation file) keeps the high-water mark: the last
+# changelog seq already reflected in the FTS tables (set by every full
+# build, advanced by every update_search_index() in the same transaction as
+# the index rows). An
+# update re-indexes only the touched paragraphs and applies the word
+# frequency deltas, so `flask rebuild fts --incremental` can run from cron.
+
+_TRACKING_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS sentences_changes (
+        seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id  TEXT    NOT NULL,
+        para_id  INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sentences_track_insert AFTER INSERT ON sentences
+    BEGIN
+        INSERT INTO sentences_changes (book_id, para_id) VALUES (NEW.book_id, NEW.para_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sentences_track_update
+    AFTER UPDATE OF book_id, para_id, line_id, pali ON sentences
+    BEGIN
+        INSERT INTO sentences_changes (book_id, para_id) VALUES (OLD.book_id, OLD.para_id);
+        INSERT INTO sentences_changes (book_id, para_id)
+            SELECT NEW.book_id, NEW.para_id
+            WHERE NEW.book_id IS NOT OLD.book_id OR NEW.para_id IS NOT OLD.para_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sentences_track_delete AFTER DELETE ON sentences
+    BEGIN
+        INSERT INTO sentences_changes (book_id, para_id) VALUES (OLD.book_id, OLD.para_id);
+    END
+    """,
+)
+
+
+def install_change_tracking(conn) -> None:
+    """Create sentences_changes and its triggers in epitaka.db (idempotent)."""
+    for ddl in _TRACKING_DDL:
+        conn.execute(ddl)
+    conn.commit()
+
+
+def _changelog_head(conn) -> int:
+    row = conn.execute("SELECT MAX(seq) FROM sentences_changes").fetchone()
+    return row[0] or 0
+
+
+def _get_meta(conn, key: str) -> Optional[str]:
+    try:
+        row = conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _set_meta(conn, key: str, value) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _ensure_rowid_map(conn) -> None:
+    """Index built before fts_paragraphs existed: derive it once (one scan)."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'fts_paragraphs'").fetchone():
+        return
+    print("  → Building fts_paragraphs from paragraphs_fts (one-off)...")
+    create_rowid_map_table(conn)
+    conn.execute("""
+        INSERT OR REPLACE INTO fts_paragraphs (book_id, para_id, fts_rowid)
+        SELECT book_id, para_id, rowid FROM paragraphs_fts
+    """)
+
+
+def _apply_word_deltas() -> int:
+    """
+    Apply the word frequency deltas recorded in the index (word_deltas) to
+    epitaka.db's words, each batch once: epitaka.db's index_meta keeps the
+    changelog seq of the last batch applied, in the same transaction as the
+    deltas, so a run that died before (or after) this step is completed by
+    the next one. Returns the number of words adjusted.
+    """
+    with _fts_connection() as wconn:
+        try:
+            pending = wconn.execute(
+                "SELECT seq, word, plain, delta FROM word_deltas ORDER BY seq").fetchall()
+        except sqlite3.OperationalError:
+            return 0  # no incremental update has run on this index yet
+    if not pending:
+        return 0
+    last = pending[-1][0]
+
+    with get_db(writable=True) as econn:
+        try:
+            econn.execute("BEGIN IMMEDIATE")
+            applied = int(_get_meta(econn, "words_changelog_seq") or 0)
+            rows = [(word, plain, delta) for seq, word, plain, delta in pending if seq > applied]
+            econn.executemany("""
+                INSERT INTO words (word, plain, frequency) VALUES (?, ?, ?)
+                ON CONFLICT (word) DO UPDATE SET frequency = frequency + excluded.frequency
+            """, rows)
+            econn.execute("DELETE FROM words WHERE frequency <= 0")
+            _set_meta(econn, "words_changelog_seq", max(applied, last))
+            econn.execute("DELETE FROM sentences_changes WHERE seq <= ?", (last,))
+            econn.commit()
+        except Exception:
+            econn.rollback()
+            raise
+
+    with _fts_connection() as wconn:
+        wconn.execute("DELETE FROM word_deltas WHERE seq <= ?", (last,))
+        wconn.commit()
+    return len(rows)
+
+
+def update_search_index(max_changes: int = 50000) -> dict:
+    """
+    Re-index the paragraphs touched since the last build / update and adjust
+    words.frequency by the difference. Processes at most max_changes
+    changelog rows per call (the rest is picked up by the next run).
+    """
+    with get_db(writable=True) as econn:
+        install_change_tracking(econn)
+        head = _changelog_head(econn)
+    # Deltas a previous run recorded but did not get to apply.
+    _apply_word_deltas()
+    with _fts_connection() as wconn:
+        mark = _get_meta(wconn, "fts_changelog_seq")
+        if mark is None:
+            # Index built before change tracking existed: it is taken to be
+            # current as of now; edits made before this point need a full
+            # `flask rebuild fts`.
+            _set_meta(wconn, "fts_changelog_seq", head)
+            wconn.commit()
+            print(f"  → Change tracking started at seq {head:,}; "
+                  "run `flask rebuild fts` once if the index predates recent edits.")
+            return {"paragraphs": 0, "changes": 0}
+    mark = int(mark)
+
+    # Read through the writable connection: the pooled readers may be
+    # opened immutable and would not see the edits.
+    with get_db(writable=True) as econn:
+        changes = econn.execute("""
+            SELECT seq, book_id, para_id FROM sentences_changes
+            WHERE seq > ? ORDER BY seq LIMIT ?
+        """, (mark, max_changes)).fetchall()
+        if not changes:
+            return {"paragraphs": 0, "changes": 0}
+        new_mark = changes[-1][0]
+        touched = sorted({(r[1], r[2]) for r in changes})
+        current = []
+        for book_id, para_id in touched:
+            lines = econn.execute("""
+                SELECT line_id, pali FROM sentences
+                WHERE book_id = ? AND para_id = ?
+                ORDER BY line_id
+            """, (book_id, para_id)).fetchall()
+            if lines:
+                current.append((book_id, para_id, [tuple(l) for l in lines]))
+    paragraphs, new_words, _ = _tokenise_chunk(current, with_fts=True)
+    new_paragraphs = {(p[0], p[1]): p for p in paragraphs}
+
+    with _fts_connection() as wconn:
+        try:
+            wconn.execute("BEGIN IMMEDIATE")
+            _ensure_rowid_map(wconn)
+            row = wconn.execute("SELECT rowid FROM paragraphs_fts ORDER BY rowid DESC LIMIT 1").fetchone()
+            next_rowid = (row[0] if row else 0) + 1
+            old_texts = []
+            for book_id, para_id in touched:
+                row = wconn.execute(
+                    "SELECT fts_rowid FROM fts_paragraphs WHERE book_id = ? AND para_id = ?",
+                    (book_id, para_id)).fetchone()
+                rowid = row[0] if row else None
+                if rowid is not None:
+                    text = wconn.execute(
+                        "SELECT paragraph_text FROM paragraphs_fts WHERE rowid = ?", (rowid,)).fetchone()
+                    if text:
+                        old_texts.append((book_id, para_id, [(None, text[0])]))
+                    wconn.execute("DELETE FROM paragraphs_fts WHERE rowid = ?", (rowid,))
+                    wconn.execute("DELETE FROM lines_fts WHERE rowid >= ? AND rowid < ?",
+                                  (rowid * LINE_ROWID_STRIDE, (rowid + 1) * LINE_ROWID_STRIDE))
+                    if not wconn.execute(
+                            "DELETE FROM paragraphs_trigram WHERE rowid = ? AND book_id = ? AND para_id = ?",
+                            (rowid, book_id, para_id)).rowcount:
+                        # Trigram rowids of indexes built before they were aligned.
+                        wconn.execute("DELETE FROM paragraphs_trigram WHERE book_id = ? AND para_id = ?",
+                                      (book_id, para_id))
+
+                para = new_paragraphs.get((book_id, para_id))
+                if para is None:
+                    wconn.execute("DELETE FROM fts_paragraphs WHERE book_id = ? AND para_id = ?",
+                                  (book_id, para_id))
+                    continue
+                if rowid is None:
+                    rowid, next_rowid = next_rowid, next_rowid + 1
+                _, _, line_ids, texts, para_text, plain_text = para
+                wconn.execute(
+                    "INSERT INTO paragraphs_fts (rowid, book_id, para_id, paragraph_text) VALUES (?, ?, ?, ?)",
+                    (rowid, book_id, para_id, para_text))
+                wconn.executemany(
+                    "INSERT INTO lines_fts (rowid, book_id, para_id, line_id, line_text) VALUES (?, ?, ?, ?, ?)",
+                    [(rowid * LINE_ROWID_STRIDE + pos, book_id, para_id, line_id, text)
+                     for pos, (line_id, text) in enumerate(zip(line_ids, texts))])
+                wconn.execute(
+                    "INSERT INTO paragraphs_trigram (rowid, book_id, para_id, plain_text) VALUES (?, ?, ?, ?)",
+                    (rowid, book_id, para_id, plain_text))
+                wconn.execute("INSERT OR REPLACE INTO fts_paragraphs VALUES (?, ?, ?)",
+                              (book_id, para_id, rowid))
+
+            # Word frequency deltas: (new text) − (text the index held before),
+            # recorded with the mark so they can't be lost if the words update
+            # below fails (_apply_word_deltas applies them once).
+            _, old_words, _ = _tokenise_chunk(old_texts, with_fts=False)
+            deltas = [(w, plain, freq - old_words.get(w, (None, 0))[1])
+                      for w, (plain, freq) in new_words.items()]
+            deltas += [(w, plain, -freq) for w, (plain, freq) in old_words.items() if w not in new_words]
+            wconn.execute("""
+                CREATE TABLE IF NOT EXISTS word_deltas (
+                    seq   INTEGER NOT NULL,
+                    word  TEXT    NOT NULL,
+                    plain TEXT,
+                    delta INTEGER NOT NULL
                 )
-                conn.commit()
-                buffer.clear()
-        if buffer:
-            cursor.executemany(
-                "INSERT OR REPLACE INTO words (word, plain, frequency) VALUES (?, ?, ?)",
-                buffer,
-            )
+            """)
+            wconn.executemany("INSERT INTO word_deltas VALUES (?, ?, ?, ?)",
+                              [(new_mark, w, plain, d) for w, plain, d in deltas if d])
+            _set_meta(wconn, "fts_changelog_seq", new_mark)
+            wconn.commit()
+        except Exception:
+            wconn.rollback()
+            raise
+    with get_webdata_db() as conn:
+        stamp_fts_generation(conn)
+        conn.commit()
+
+    words_changed = _apply_word_deltas()
+
+    stats = {"paragraphs": len(touched), "changes": len(changes),
+             "words_changed": words_changed, "seq": new_mark, "pending": head > new_mark}
+    print(f"  → {stats['changes']:,} change(s): {stats['paragraphs']:,} paragraph(s) re-indexed, "
+          f"{stats['words_changed']:,} word frequencies adjusted (seq {new_mark:,}).")
+    return stats
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-table rebuilds
+# ─────────────────────────────────────────────────────────────────────────────
+
+def rebuild_fts(batch_size: int = 5000, workers: Optional[int] = None) -> None:
+    """
+    Rebuild and swap in:
+      - paragraphs_fts      (webdata.db — paragraph level, newline-separated lines)
+      - lines_fts           (webdata.db — line level, for the matched lines)
+      - paragraphs_trigram  (webdata.db — substring index for the fallback search)
+      - headings_fts        (webdata.db — heading titles for /api/search_headings)
+      - words               (epitaka.db — the suggest fallback reads it there)
+    """
+    print("=== Rebuilding: paragraphs_fts + lines_fts + paragraphs_trigram + headings_fts + words ===")
+    build_search_index(with_fts=True, workers=workers, batch_size=batch_size)
+    print("=== Done: paragraphs_fts + lines_fts + paragraphs_trigram + headings_fts + words ===")
+
+
+def rebuild_headings() -> None:
+    """Rebuild headings_fts inside the live index (headings are not covered
+    by the sentences changelog; run after editing them)."""
+    print("=== Rebuilding: headings_fts ===")
+    with _fts_connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP TABLE IF EXISTS headings_fts")
+            create_headings_table(conn)
+            count = _fill_headings_table(conn)
             conn.commit()
-    print(f"  → words populated ({len(word_data):,} entries).")
-    print("=== Done: paragraphs_fts + words ===")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.execute("INSERT INTO headings_fts (headings_fts) VALUES ('optimize')")
+        conn.commit()
+    with get_webdata_db() as wconn:
+        stamp_fts_generation(wconn)
+        wconn.commit()
+    print(f"  → {count:,} headings indexed.")
+    print("=== Done: headings_fts ===")
 
 
-def rebuild_words(batch_size: int = 5000) -> None:
-    """Drop, recreate, and populate only the words table."""
+def rebuild_words(batch_size: int = 5000, workers: Optional[int] = None) -> None:
+    """Rebuild and swap in only the words table."""
     print("=== Rebuilding: words ===")
+    # Bring the FTS tables up to the same snapshot first: incremental word
+    # deltas are diffed against the paragraph text the index holds.
+    with _fts_connection() as wconn:
+        tracked = _get_meta(wconn, "fts_changelog_seq") is not None
+    if tracked:
+        update_search_index()
+    build_search_index(with_fts=False, workers=workers, batch_size=batch_size)
+    print("=== Done: words ===")
 
-    with get_db() as conn:
-        print("  → Dropping words...")
-        conn.execute("DROP TABLE IF EXISTS words")
-        conn.commit()
 
-    with get_db() as conn:
-        print("  → Creating words...")
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS words (
-                word        TEXT COLLATE NOCASE NOT NULL,
-                plain       TEXT COLLATE NOCASE,
-                frequency   INTEGER NOT NULL DEFAULT 0,
-                PRIMARY KEY (word)
-            )
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_words_plain ON words (plain)")
-        conn.commit()
+# ─────────────────────────────────────────────────────────────────────────────
+# ref_links: numbered-paragraph cross-references (webdata.db)
+# ─────────────────────────────────────────────────────────────────────────────
 
-    print("  → Querying sentences for word extraction...")
-    with get_db() as conn:
-        rows = conn.execute("""
-            SELECT book_id, para_id,
-                   GROUP_CONCAT(pali, ' ') AS pali_paragraph
-            FROM sentences
-            GROUP BY book_id, para_id
-        """).fetchall()
+def rebuild_reflinks(batch_size: int = 5000) -> None:
+    """Drop, recreate, and populate ref_links for every book."""
+    from ..services.books import load_hierarchy
+    from ..services.links import compute_ref_links, create_ref_links_table, ref_link_rows
 
-    word_data: dict = defaultdict(lambda: {"plain": "", "freq": 0})
-    for row in rows:
-        pali_para = (row['pali_paragraph'] or '').replace('*', '')
-        for w in pali_para.split():
-            w = w.strip('.,!?;:"()[]{}#*').lower()
-            if w:
-                if not word_data[w]["plain"]:
-                    word_data[w]["plain"] = strip_diacritics(w)
-                word_data[w]["freq"] += 1
+    print("=== Rebuilding: ref_links ===")
+    hierarchy = load_hierarchy(force=True)
 
-    print(f"  → {len(word_data):,} unique words extracted.")
+    with get_webdata_db() as wconn:
+        print("  → Dropping ref_links...")
+        wconn.execute("DROP TABLE IF EXISTS ref_links")
+        create_ref_links_table(wconn)
+        wconn.commit()
 
-    with get_db() as conn:
-        cursor = conn.cursor()
+        inserted = 0
         buffer = []
-        for word, data in word_data.items():
-            buffer.append((word, data["plain"], data["freq"]))
-            if len(buffer) >= batch_size:
-                cursor.executemany(
-                    "INSERT OR REPLACE INTO words (word, plain, frequency) VALUES (?, ?, ?)",
-                    buffer,
-                )
-                conn.commit()
-                buffer.clear()
+        with get_db() as conn:
+            for book_id in hierarchy:
+                buffer.extend(ref_link_rows(book_id, compute_ref_links(conn, book_id, hierarchy)))
+                if len(buffer) >= batch_size:
+                    wconn.executemany("INSERT INTO ref_links VALUES (?, ?, ?, ?, ?, ?, ?, ?)", buffer)
+                    wconn.commit()
+                    inserted += len(buffer)
+                    buffer.clear()
         if buffer:
-            cursor.executemany(
-                "INSERT OR REPLACE INTO words (word, plain, frequency) VALUES (?, ?, ?)",
-                buffer,
-            )
-            conn.commit()
+            wconn.executemany("INSERT INTO ref_links VALUES (?, ?, ?, ?, ?, ?, ?, ?)", buffer)
+            wconn.commit()
+            inserted += len(buffer)
 
-    print(f"  → words populated ({len(word_data):,} entries).")
-    print("=== Done: words ===")
+        stamp_fts_generation(wconn)
+        wconn.commit()
+
+    print(f"  → ref_links populated ({inserted:,} rows, {len(hierarchy):,} books).")
+    print("=== Done: ref_links ===")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Usage concordance: stem → usages (webdata.db)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def rebuild_concordance(batch_size: int = 5000) -> None:
+    """
+    Build stem_usages / stem_usage_lines from pali_definition (+ sentences
+    and every translation DB) into side tables, then swap them in.
+    """
+    from ..services.books import hierarchy_snapshot
+    from ..services.dictionary import (_palidef_match_column, concordance_rows,
+                                       create_concordance_tables)
+
+    print("=== Rebuilding: usage concordance ===")
+    pitaka_of = hierarchy_snapshot(force=True).pitaka_of
+    langs = Config.get_available_languages()
+
+    source = sqlite3.connect(f"file:{Config.DATABASE}?mode=ro", uri=True)
+    source.row_factory = sqlite3.Row
+    column = _palidef_match_column(source)
+    # Same order as the live usage lookup (dictionary._get_usages_for_stems).
+    cursor = source.execute(f"""
+        SELECT pd.{column}, pd.book_id, pd.para_id, pd.line_id, pd.word, pd.ending, s.pali
+        FROM pali_definition pd
+        JOIN sentences s
+          ON  s.book_id = pd.book_id
+          AND s.para_id = pd.para_id
+          AND s.line_id = pd.line_id
+        WHERE pd.{column} IS NOT NULL AND pd.{column} != ''
+        ORDER BY pd.{column}, pd.book_id, pd.para_id, pd.line_id
+    """)
+    cursor.arraysize = batch_size
+
+    stems = usages = 0
+    with get_webdata_db() as wconn:
+        for table in ("stem_usages_new", "stem_usage_lines_new"):
+            wconn.execute(f"DROP TABLE IF EXISTS {table}")
+        create_concordance_tables(wconn, suffix="_new")
+        wconn.commit()
+
+        def flush(batch) -> None:
+            head_rows, line_rows = concordance_rows(batch, pitaka_of, langs)
+            wconn.executemany("INSERT INTO stem_usages_new VALUES (?, ?, ?, ?, ?, ?)", head_rows)
+            wconn.executemany("INSERT INTO stem_usage_lines_new VALUES (?, ?, ?, ?, ?, ?, ?)", line_rows)
+            wconn.commit()
+
+        batch, batch_lines = [], 0
+        for stem, rows in groupby(cursor, key=lambda r: r[0]):
+            lines = [tuple(r)[1:] for r in rows]
+            batch.append((stem, lines))
+            batch_lines += len(lines)
+            stems += 1
+            usages += len(lines)
+            if batch_lines >= batch_size:
+                flush(batch)
+                batch, batch_lines = [], 0
+        if batch:
+            flush(batch)
+        source.close()
+
+        try:
+            wconn.execute("BEGIN IMMEDIATE")
+            for table in ("stem_usages", "stem_usage_lines"):
+                wconn.execute(f"DROP TABLE IF EXISTS {table}")
+                wconn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+            stamp_fts_generation(wconn)
+            wconn.commit()
+        except Exception:
+            wconn.rollback()
+            raise
+
+    print(f"  → {stems:,} stems, {usages:,} usages, translations: {', '.join(langs) or 'none'}.")
+    print("=== Done: usage concordance ===")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# bold_definitions: pali_definition in book order, per plain form (webdata.db)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def create_bold_definitions_table(conn, suffix: str = "") -> None:
+    """One row per pali_definition row that has its sentence, keyed so that
+    /api/bold_definition's keyset page is an index range: plain form
+    (NOCASE, like the LIKE it replaces), then book order."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS bold_definitions{suffix} (
+            plain      TEXT    NOT NULL COLLATE NOCASE,
+            book_order INTEGER NOT NULL,   -- books.id
+            para_id    INTEGER NOT NULL,
+            line_id    INTEGER NOT NULL,
+            def_rowid  INTEGER NOT NULL,   -- pali_definition.rowid (tie-break)
+            book_id    TEXT    NOT NULL,
+            word       TEXT,
+            PRIMARY KEY (plain, book_order, para_id, line_id, def_rowid)
+        ) WITHOUT ROWID
+    """)
+
+
+def rebuild_bold_definitions(batch_size: int = 5000) -> None:
+    """Build bold_definitions from pali_definition into a side table, then
+    swap it in."""
+    print("=== Rebuilding: bold_definitions ===")
+    source = sqlite3.connect(f"file:{Config.DATABASE}?mode=ro", uri=True)
+    cursor = source.execute("""
+        SELECT d.plain, b.id, d.para_id, d.line_id, d.rowid, d.book_id, d.word
+        FROM pali_definition d
+        JOIN books     b ON d.book_id = b.book_id
+        JOIN sentences s ON d.book_id = s.book_id
+                         AND d.para_id = s.para_id
+                         AND d.line_id = s.line_id
+        WHERE d.plain IS NOT NULL
+        ORDER BY d.plain COLLATE NOCASE, b.id, d.para_id, d.line_id, d.rowid
+    """)
+
+    inserted = 0
+    with get_webdata_db() as wconn:
+        wconn.execute("DROP TABLE IF EXISTS bold_definitions_new")
+        create_bold_definitions_table(wconn, suffix="_new")
+        wconn.commit()
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            wconn.executemany("INSERT INTO bold_definitions_new VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            wconn.commit()
+            inserted += len(rows)
+        source.close()
+
+        try:
+            wconn.execute("BEGIN IMMEDIATE")
+            wconn.execute("DROP TABLE IF EXISTS bold_definitions")
+            wconn.execute("ALTER TABLE bold_definitions_new RENAME TO bold_definitions")
+            wconn.commit()
+        except Exception:
+            wconn.rollback()
+            raise
+
+    print(f"  → bold_definitions populated ({inserted:,} rows).")
+    print("=== Done: bold_definitions ===")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# rebuild_palidef and rebuild_booklink are unchanged — omitted here for brevity.
-# Keep them exactly as they are in the original file.
+# pali_definition and book_links ship inside epitaka.db, built by the tooling
+# that produces it; this module has no rebuild for them (only the stem /
+# normalisation helpers above).
 # ─────────────────────────────────────────────────────────────────────────────
 
 
@@ -470,7 +1223,7 @@ def cleanup_tables() -> None:
         "words",
     ]
 
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         for table in tables:
             print(f"  → Dropping {table}...")
             conn.execute(f"DROP TABLE IF EXISTS {table}")
@@ -478,7 +1231,7 @@ def cleanup_tables() -> None:
         print("  → All tables dropped.")
 
     print("  → Running VACUUM (this may take a moment)...")
-    with get_db() as conn:
+    with get_db(writable=True) as conn:
         conn.execute("VACUUM")
     print("  → VACUUM complete.")
     print("=== Done: cleanup ===")
@@ -494,13 +1247,18 @@ def register_cli(app: Flask) -> None:
     command groups.
 
     Usage:
-        flask rebuild fts        # paragraphs_fts + words
+        flask rebuild fts        # paragraphs_fts + lines_fts + paragraphs_trigram + headings_fts + words
+        flask rebuild fts --incremental   # changed paragraphs only (periodic job)
         flask rebuild words      # words only
-        flask rebuild palidef    # pali_definition
-        flask rebuild booklink   # book_links
-        flask rebuild all        # all four in sequence
+        flask rebuild headings   # headings_fts only (after editing headings)
+        flask rebuild reflinks   # ref_links (webdata.db)
+        flask rebuild concordance   # stem_usages + stem_usage_lines (webdata.db)
+        flask rebuild definitions   # bold_definitions (webdata.db)
+        flask rebuild sections   # section_store.db (pre-rendered sections)
 
         flask cleanup            # drop all tables + VACUUM
+        flask prerender          # static pages for nginx (PRERENDER_DIR)
+        flask warm-dictionary --log access.log   # preload hot dictionary words
     """
 
     @app.cli.group("rebuild")
@@ -508,32 +1266,81 @@ def register_cli(app: Flask) -> None:
         """Rebuild search / definition tables (drop → create → populate)."""
 
     @rebuild_cli.command("fts")
-    def rebuild_fts_cmd():
-        """Drop, recreate, and populate paragraphs_fts and words."""
-        rebuild_fts()
+    @click.option("--workers", type=int, default=None,
+                  help="Tokeniser processes (default: CPU count).")
+    @click.option("--incremental", is_flag=True,
+                  help="Only re-index paragraphs changed since the last build / update.")
+    def rebuild_fts_cmd(workers, incremental):
+        """Rebuild paragraphs_fts, lines_fts, paragraphs_trigram, headings_fts and words, then swap them in."""
+        if incremental:
+            print("=== Updating: search index (changed paragraphs only) ===")
+            update_search_index()
+            print("=== Done: search index update ===")
+        else:
+            rebuild_fts(workers=workers)
 
     @rebuild_cli.command("words")
-    def rebuild_words_cmd():
-        """Drop, recreate, and populate the words table only."""
-        rebuild_words()
-
-    @rebuild_cli.command("palidef")
-    def rebuild_palidef_cmd():
-        """Drop, recreate, and populate pali_definition."""
-        rebuild_palidef()
-
-    @rebuild_cli.command("booklink")
-    def rebuild_booklink_cmd():
-        """Drop, recreate, and populate book_links."""
-        rebuild_booklink()
-
-    @rebuild_cli.command("all")
-    def rebuild_all_cmd():
-        """Run all four rebuilds in sequence: fts → words → palidef → booklink."""
-        rebuild_fts()
-        rebuild_words()
-        rebuild_palidef()
-        rebuild_booklink()
+    @click.option("--workers", type=int, default=None,
+                  help="Tokeniser processes (default: CPU count).")
+    def rebuild_words_cmd(workers):
+        """Rebuild the words table only, then swap it in."""
+        rebuild_words(workers=workers)
+
+    @rebuild_cli.command("headings")
+    def rebuild_headings_cmd():
+        """Rebuild headings_fts (heading-title search) in the live index."""
+        rebuild_headings()
+
+    @rebuild_cli.command("reflinks")
+    def rebuild_reflinks_cmd():
+        """Drop, recreate, and populate ref_links (numbered-paragraph cross-references)."""
+        rebuild_reflinks()
+
+    @rebuild_cli.command("concordance")
+    def rebuild_concordance_cmd():
+        """Rebuild the stem → usages concordance from pali_definition."""
+        rebuild_concordance()
+
+    @rebuild_cli.command("definitions")
+    def rebuild_definitions_cmd():
+        """Rebuild bold_definitions (/api/bold_definition) from pali_definition."""
+        rebuild_bold_definitions()
+
+    @rebuild_cli.command("sections")
+    @click.option("--lang", "langs", multiple=True,
+                  help="Translation language(s) to render (default: all installed).")
+    def rebuild_sections_cmd(langs):
+        """Pre-render every TOC section into section_store.db."""
+        from ..services.section_store import build_section_store
+        build_section_store(list(langs) or None)
+
+    @app.cli.command("prerender")
+    @click.option("--out", "out_dir", default=None,
+                  help="Output directory (default: PRERENDER_DIR).")
+    @click.option("--lang", "langs", multiple=True,
+                  help="Translation language(s) to render (default: all installed).")
+    @click.option("--book", "books", multiple=True, help="Only these book_id(s).")
+    @click.option("--workers", type=int, default=None,
+                  help="Worker processes (default: CPU count).")
+    @click.option("--force", is_flag=True, help="Re-render every unit, changed or not.")
+    def prerender_cmd(out_dir, langs, books, workers, force):
+        """Render book pages, section JSON and outlines to static files."""
+        from ..services.prerender import prerender
+        prerender(out_dir, list(langs) or None, list(books) or None, workers, force)
+
+    @app.cli.command("warm-dictionary")
+    @click.option("--log", "logs", multiple=True, required=True,
+                  help="Access log(s) to count /api/dictionary words in (.gz ok).")
+    @click.option("--top", type=int, default=500, show_default=True,
+                  help="How many of the most requested words to preload.")
+    def warm_dictionary_cmd(logs, top):
+        """Preload the dictionary lookup cache with the most requested words."""
+        from ..services.dictionary import warm_dictionary_cache
+        print(f"=== Warming dictionary cache from {len(logs)} log(s) ===")
+        started = time.monotonic()
+        count = warm_dictionary_cache(list(logs), top)
+        print(f"  → {count:,} words looked up in {time.monotonic() - started:,.1f}s")
+        print("=== Done: dictionary warm-up ===")
 
     @app.cli.command("cleanup")
     def cleanup_cmd():
@@ -14,9 +14,13 @@ def remove_stars_inside_brackets(text):
     return PATTERN.sub(repl, text)
 
 
-@lru_cache(maxsize=8192)
-def markdown_to_html(text):
-    """Convert lightweight markdown to HTML (cached — pure function)."""
+def markdown_to_html_legacy(text):
+    """Reference regex cascade — the definition of the markup.
+
+    ``markdown_to_html`` renders the same HTML in one pass for ordinary
+    lines and delegates here for anything unusual; scripts/check_markdown.py
+    compares the two over the whole corpus.
+    """
     if not text:
         return ''
     if isinstance(text, int):
@@ -36,16 +40,159 @@ def markdown_to_html(text):
     return text
 
 
+# ── Single-pass renderer ──────────────────────────────────────────────────
+# One scan per line over the four inline constructs. It is only used when
+# the constructs cannot interact (the cascade's order then does not matter):
+# no backslashes or raw HTML, no '***', and every marker is consumed by a
+# well-formed token whose content holds no other markers. Anything else —
+# nested / unbalanced markup — goes to markdown_to_html_legacy.
+_INLINE_TOKEN = re.compile(
+    r'\*\*([^*`\[\]\n]*)\*\*(?!\*)'         # **bold**
+    r'|(?<!\*)\*([^*`\[\]\n]+)\*(?!\*)'      # *italic*
+    r'|`([^*`\[\]\n]*)`'                     # `code`
+    r'| *\[([^*`\[\]\n]*)\]'                 # [note] (eats leading spaces)
+)
+_MARKERS = re.compile(r'[*`\[\]]')
+_HEADING_HASHES = re.compile(r'#+')
+
+
+def _render_inline(line):
+    """Render one line's inline markup, or None if it needs the cascade."""
+    out = []
+    pos = 0
+    for m in _INLINE_TOKEN.finditer(line):
+        plain = line[pos:m.start()]
+        if _MARKERS.search(plain):
+            return None
+        out.append(plain)
+        kind, body = m.lastindex, m.group(m.lastindex)
+        if kind == 1:
+            out.append(f' <strong>{body}</strong>')
+        elif kind == 2:
+            out.append(f'<i>{body}</i>')
+        elif kind == 3:
+            out.append(f'<code>{body}</code>')
+        else:
+            out.append(f'<sup title="{body}">*</sup>')
+        pos = m.end()
+    tail = line[pos:]
+    if _MARKERS.search(tail):
+        return None
+    out.append(tail)
+    return ''.join(out)
+
+
+def _render_line(line):
+    if line.startswith('#'):
+        hashes = len(_HEADING_HASHES.match(line).group())
+        rest = line[hashes:]
+        if hashes <= 6 and rest.startswith(' '):
+            body = _render_inline(rest[1:])
+            return None if body is None else f'<h{hashes}>{body}</h{hashes}>'
+        body = _render_inline(rest)
+        if body is None:
+            return None
+        if hashes <= 6 and body.startswith(' <strong>'):
+            # The cascade matches headings after bold rendering, so
+            # '#**x**' ('# <strong>…') is a heading too.
+            return f'<h{hashes}>{body[1:]}</h{hashes}>'
+        return line[:hashes] + body
+    return _render_inline(line)
+
+
+def _render_markdown(text):
+    if not text:
+        return ''
+    if not isinstance(text, str) or '\\' in text or '<' in text or '***' in text:
+        return markdown_to_html_legacy(text)
+    if not _MARKERS.search(text) and '#' not in text:
+        return text  # plain line — by far the most common case
+    lines = []
+    for line in text.split('\n'):
+        html = _render_line(line)
+        if html is None:
+            return markdown_to_html_legacy(text)
+        lines.append(html)
+    return '\n'.join(lines)
+
+
+@lru_cache(maxsize=8192)
+def markdown_to_html(text):
+    """Convert lightweight markdown to HTML (cached — pure function)."""
+    return _render_markdown(text)
+
+
+def markdown_to_html_batch(texts):
+    """Render a section's worth of lines at once; falsy entries → ''.
+
+    Repeated lines within the batch are rendered once."""
+    rendered = {}
+    out = []
+    for text in texts:
+        if not text:
+            out.append('')
+            continue
+        html = rendered.get(text)
+        if html is None:
+            html = rendered[text] = markdown_to_html(text)
+        out.append(html)
+    return out
+
+
+# Pāli letters that the search treats as equal to their plain form.
+_PALI_FOLD = {
+    'a': '[aā]', 'i': '[iī]', 'u': '[uū]',
+    'n': '[nṅñṇ]', 't': '[tṭ]', 'd': '[dḍ]',
+    'l': '[lḷ]', 'm': '[mṃ]'
+}
+
+
+class Highlighter:
+    """Wraps every occurrence of any query word in ``<mark>``, matching Pāli
+    diacritics-insensitively.
+
+    All words are compiled into ONE alternation (longest first), so a line is
+    highlighted in a single regex pass instead of one ``re.sub`` per word —
+    and a later word can no longer match inside an earlier ``<mark>``.
+    Build it through ``get_highlighter`` (memoised per word tuple).
+    """
+
+    __slots__ = ('_text_re', '_html_re')
+
+    def __init__(self, words):
+        alternatives = sorted({w for w in words if w}, key=len, reverse=True)
+        if not alternatives:
+            self._text_re = self._html_re = None
+            return
+        body = '|'.join(''.join(_PALI_FOLD.get(c, re.escape(c)) for c in w) for w in alternatives)
+        self._text_re = re.compile(f'({body})', re.IGNORECASE)
+        # HTML variant: tags are matched (and kept) first so words inside
+        # tag names / attributes are never marked.
+        self._html_re = re.compile(f'(<[^>]+>)|({body})', re.IGNORECASE)
+
+    def text(self, text):
+        if not text or self._text_re is None:
+            return text
+        return self._text_re.sub(r'<mark>\1</mark>', text)
+
+    def html(self, html):
+        if not html or self._html_re is None:
+            return html
+        return self._html_re.sub(_mark_outside_tags, html)
+
+
+def _mark_outside_tags(m):
+    return m.group(1) or f'<mark>{m.group(2)}</mark>'
+
+
+@lru_cache(maxsize=512)
+def get_highlighter(words):
+    """Compiled Highlighter for a tuple of query words (memoised)."""
+    return Highlighter(words)
+
+
 def highlight_text(text, query_words):
-    pali_map = {
-        'a': '[aā]', 'i': '[iī]', 'u': '[uū]',
-        'n': '[nṅñṇ]', 't': '[tṭ]', 'd': '[dḍ]',
-        'l': '[lḷ]', 'm': '[mṃ]'
-    }
-    for word in query_words:
-        pattern = ''.join(pali_map.get(c, re.escape(c)) for c in word)
-        text = re.sub(f'({pattern})', r'<mark>\1</mark>', text, flags=re.IGNORECASE)
-    return text
+    return get_highlighter(tuple(query_words)).text(text)
 
 
 def trim_text(text, query_words):
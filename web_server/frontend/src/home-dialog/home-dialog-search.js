@@ -167,6 +167,10 @@ export class HomeDialogSearch {
     this._lastQuery     = '';
     this._lastType      = null;
 
+    // Pāli-definition paging
+    this._dictCursor    = null;   // X-Next-Cursor of the last page (null: no more)
+    this._dictLoading   = false;
+
     // FTS state
     this._ftsData            = null;   // last full response from API
     this._ftsPage            = 1;
@@ -578,10 +582,9 @@ export class HomeDialogSearch {
 
     } else if (type.id === 'pali-def') {
       this._showResultsLoading();
-      const data = await this._apiFetch(
-        `${this.baseUrl}/api/bold_definition?q=${encodeURIComponent(q)}&lang=${this.lang}&limit=80`
-      );
-      this._lastResults = data || [];
+      const page = await this._fetchDictPage(q, '');
+      this._lastResults = page.items;
+      this._dictCursor  = page.next;
       this._lastQuery   = q;
       this._lastType    = 'pali-def';
       this._renderDictResults(this.bookFilter.filterResults(this._lastResults), q);
@@ -658,7 +661,8 @@ export class HomeDialogSearch {
 
     const totalBooks   = groups.size;
     const totalResults = data.length;
-    let html = `<div class="dict-results-summary">${totalResults} result${totalResults !== 1 ? 's' : ''} in ${totalBooks} book${totalBooks !== 1 ? 's' : ''}</div>`;
+    const more         = this._dictCursor ? '+' : '';
+    let html = `<div class="dict-results-summary">${totalResults}${more} result${totalResults !== 1 ? 's' : ''} in ${totalBooks} book${totalBooks !== 1 ? 's' : ''}</div>`;
 
     let groupIndex = 0;
     for (const [, group] of groups) {
@@ -688,8 +692,15 @@ export class HomeDialogSearch {
         </div>`;
     }
 
+    if (this._dictCursor) {
+      html += `<button class="fts-page-btn dict-load-more">Load more</button>`;
+    }
+
     this.resultsPanel.innerHTML = html;
 
+    this.resultsPanel.querySelector('.dict-load-more')
+      ?.addEventListener('click', () => this._loadMoreDict());
+
     this.resultsPanel.querySelectorAll('.dict-book-header').forEach(btn => {
       btn.addEventListener('click', () => {
         const groupEl = document.getElementById(btn.dataset.group);
@@ -708,6 +719,34 @@ export class HomeDialogSearch {
     });
   }
 
+  /**
+   * One page of /api/bold_definition. Paging is keyset-based: the cursor
+   * of the next page comes back in X-Next-Cursor ('' asks for the first).
+   * Returns { items, next } — next is null on the last page.
+   */
+  async _fetchDictPage(q, cursor) {
+    const params = new URLSearchParams({ q, lang: this.lang, limit: 80, cursor });
+    try {
+      const res = await fetch(`${this.baseUrl}/api/bold_definition?${params}`);
+      if (!res.ok) return { items: [], next: null };
+      return { items: await res.json(), next: res.headers.get('X-Next-Cursor') };
+    } catch {
+      return { items: [], next: null };
+    }
+  }
+
+  async _loadMoreDict() {
+    if (this._dictLoading || !this._dictCursor) return;
+    this._dictLoading = true;
+    const q    = this._lastQuery;
+    const page = await this._fetchDictPage(q, this._dictCursor);
+    this._dictLoading = false;
+    if (this._lastType !== 'pali-def' || this._lastQuery !== q) return;  // a new search started
+    this._lastResults = this._lastResults.concat(page.items);
+    this._dictCursor  = page.next;
+    this._renderDictResults(this.bookFilter.filterResults(this._lastResults), q);
+  }
+
   /* ── FTS search ─────────────────────────────────────────── */
 
   async _executeFtsSearch(q, page = null) {
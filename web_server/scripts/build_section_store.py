@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Pre-render every TOC section of every book into data/section_store.db.
+
+Same as `flask rebuild sections`. The store is only served while epitaka.db
+(and the translation DB of the requested language) are unchanged since the
+build — re-run this after importing new data or applying editor fixes.
+
+Usage:
+    python3 scripts/build_section_store.py            # Pāli + all languages
+    python3 scripts/build_section_store.py en my      # Pāli + en + my only
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run import app
+from app.services.section_store import build_section_store
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        build_section_store(sys.argv[1:] or None)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Golden-output check for the single-pass Markdown renderer.
+
+Renders every Pāli line of epitaka.db and every translation line of each
+epitaka_<lang>.db with both markdown_to_html (single pass) and
+markdown_to_html_legacy (the reference regex cascade) and reports any line
+where the HTML differs. Run it after touching app/utils/text.py or after
+importing new text.
+
+Usage:
+    python3 scripts/check_markdown.py            # exit status 1 on mismatch
+"""
+import glob
+import os
+import sqlite3
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR   = os.path.join(SCRIPT_DIR, 'data')
+sys.path.insert(0, SCRIPT_DIR)
+
+from app.utils.text import _render_markdown, markdown_to_html_legacy
+
+
+def check(db_path, column):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    checked = mismatched = 0
+    t_fast = t_legacy = 0.0
+    for book_id, para_id, line_id, text in conn.execute(
+        f'SELECT book_id, para_id, line_id, {column} FROM sentences'
+    ):
+        t0 = time.perf_counter()
+        fast = _render_markdown(text)
+        t1 = time.perf_counter()
+        legacy = markdown_to_html_legacy(text)
+        t2 = time.perf_counter()
+        t_fast += t1 - t0
+        t_legacy += t2 - t1
+        checked += 1
+        if fast != legacy:
+            mismatched += 1
+            if mismatched <= 20:
+                print(f'  ✗ {book_id} {para_id}/{line_id}: {text!r}')
+                print(f'      single-pass: {fast!r}')
+                print(f'      legacy:      {legacy!r}')
+    conn.close()
+    print(f'  {os.path.basename(db_path)}: {checked:,} lines, {mismatched:,} mismatches '
+          f'(single-pass {t_fast:.2f}s, legacy {t_legacy:.2f}s)')
+    return mismatched
+
+
+if __name__ == '__main__':
+    total = check(os.path.join(DATA_DIR, 'epitaka.db'), 'pali')
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, 'epitaka_*.db'))):
+        total += check(path, 'translation')
+    sys.exit(1 if total else 0)